@@ -1,33 +1,140 @@
-from .ifee_dbus import CModemTechs, CModemStates, CModemPowerStates, CModemManager, CSystemdService, CModemFailedReason, CNetworkManager, CConnection, CModem
-from .ifee_adsb import get_icao_from_ground, parse_adsb, CMessageADSB
-from .ifee_common import CSyncObj, CCacheICAO, CBattery, CPosition, CSyncADSB, CSyncControl, CSyncMonitoring, CTemperature 
-from .ifee_watchdog import watch_dog 
-from .ifee_monitoring import CAircraftCollector, CMetricCollector, collect_aircraft, collect_metrics
+from importlib import import_module
 
-__all__ = (
-    'CModemTechs',
-    'CModemStates',
-    'CModemPowerStates',
-    'CModemManager',
-    'CSystemdService',
-    'CModemFailedReason',
-    'CNetworkManager',
-    'CConnection',
-    'CModem',
-    'CMessageADSB',
-    'get_icao_from_ground',
-    'parse_adsb',
-    'CSyncObj',
-    'CCacheICAO',
-    'CBattery',
-    'CPosition',
-    'CSyncADSB',
-    'CSyncControl',
-    'CSyncMonitoring',
-    'CTemperature',
-    'watch_dog',
-    'CAircraftCollector',
-    'CMetricCollector',
-    'collect_aircraft',
-    'collect_metrics'
-)
+_SUBMODULES = {
+    'ifee_dbus': (
+        'CModemTechs',
+        'CModemStates',
+        'CModemPowerStates',
+        'CModemManager',
+        'CSystemdService',
+        'CSystemdServices',
+        'CModemFailedReason',
+        'CNetworkManager',
+        'CConnection',
+        'CModem'
+    ),
+    'ifee_adsb': (
+        'CMessageADSB',
+        'get_icao_from_ground',
+        'parse_adsb',
+        'CDecoderADSB',
+        'update_adsb',
+        'mlat_ns'
+    ),
+    'ifee_common': (
+        'CSyncObj',
+        'CCacheICAO',
+        'CBattery',
+        'CPosition',
+        'CSyncADSB',
+        'CSyncControl',
+        'CSyncMonitoring',
+        'CTemperature'
+    ),
+    'ifee_watchdog': (
+        'watch_dog',
+    ),
+    'ifee_monitoring': (
+        'CAircraftCollector',
+        'CFrameCollector',
+        'CLatencyCollector',
+        'CMetricCollector',
+        'collect_aircraft',
+        'collect_metrics',
+        'CProfileCollector',
+        'collect_profile',
+        'CSignalCollector',
+        'collect_signal',
+        'CHealthCollector',
+        'CUplinkCollector'
+    ),
+    'ifee_profiler': (
+        'CProfiler',
+        'monitor_loop'
+    ),
+    'ifee_ground': (
+        'CGroundClient',
+        'get_ground_client',
+        'route_ground_clients',
+        'CResolverICAO'
+    ),
+    'ifee_decoder': (
+        'CDecoderProcess',
+        'CDecoderPool',
+        'filter_icao',
+        'CTrafficTable',
+        'parse_adsb_process'
+    ),
+    'ifee_frames': (
+        'CFrameStats',
+        'CFrameValidator',
+        'CFrameDedup',
+        'CLatencyTrace'
+    ),
+    'ifee_shm': (
+        'CSharedSyncObj',
+        'attach_shared_state'
+    ),
+    'ifee_snapshot': (
+        'restore_state',
+        'save_state',
+        'snapshot_state'
+    ),
+    'ifee_supervisor': (
+        'CSupervisor',
+        'CSupervisorConfig'
+    ),
+    'ifee_fakebus': (
+        'CFakeBus',
+    ),
+    'ifee_signal': (
+        'CSignalSampler',
+        'sample_signal'
+    ),
+    'ifee_health': (
+        'CModemHealth',
+    ),
+    'ifee_uplink': (
+        'CUplink',
+        'manage_uplink',
+        'probe_link'
+    ),
+    'ifee_forward': (
+        'CForwardQueue',
+        'forward_telemetry'
+    ),
+    'ifee_sensors': (
+        'CSensorSampler',
+        'sample_sensors'
+    ),
+    'ifee_geofence': (
+        'CGeoIndex',
+        'CLteGate',
+        'build_gate'
+    ),
+    'ifee_track': (
+        'CTrackFilter',
+    ),
+    'ifee_logging': (
+        'CRateLimitFilter',
+        'setup_logging',
+        'stop_logging'
+    )
+}
+
+_ATTRS = {name: module for module, names in _SUBMODULES.items() for name in names}
+
+__all__ = tuple(_ATTRS)
+
+
+def __getattr__(p_name: str):
+    module = _ATTRS.get(p_name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {p_name!r}")
+    value = getattr(import_module(f".{module}", __name__), p_name)
+    globals()[p_name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
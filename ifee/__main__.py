@@ -0,0 +1,28 @@
+import asyncio
+from argparse import ArgumentParser
+from ifee.ifee_supervisor import CSupervisor, CSupervisorConfig
+from ifee.ifee_logging import setup_logging, stop_logging
+
+
+def main() -> None:
+    parser = ArgumentParser(prog='python -m ifee', description='S7 IFEE supervisor')
+    parser.add_argument('-c', '--config', help='path to json config')
+    parser.add_argument('--icao')
+    parser.add_argument('--decode-process', dest='decode_process', action='store_true', default=None)
+    parser.add_argument('--decode-workers', dest='decode_workers', type=int)
+    parser.add_argument('--decode-all', dest='decode_all', action='store_true', default=None)
+    parser.add_argument('--profile', action='store_true', default=None)
+    parser.add_argument('--log-level', dest='log_level')
+    args = vars(parser.parse_args())
+
+    config = CSupervisorConfig.load(args.pop('config'), **args)
+    setup_logging(config.log_level, p_rate=config.log_rate, p_period=config.log_period)
+
+    try:
+        asyncio.run(CSupervisor(config).run())
+    finally:
+        stop_logging()
+
+
+if __name__ == '__main__':
+    main()
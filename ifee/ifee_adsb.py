@@ -1,17 +1,29 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Union
-import json
+from time import monotonic_ns
 import asyncio
 from logging import getLogger
-import requests
 import pyModeS as pms
 from ifee.ifee_common import CSyncObj, CPosition
+from ifee.ifee_ground import get_ground_client
+from ifee.ifee_frames import CFrameValidator, CFrameDedup, CFrameStats, CLatencyTrace, DEDUP_WINDOW
+from ifee.ifee_geofence import CLteGate
+
+
+MLAT_HZ = 12000000
+CPR_FRESH = 10 * 1000000000
+
+
+def mlat_ns(p_ticks: int, p_hz: int = MLAT_HZ) -> int:
+    return p_ticks * 1000000000 // p_hz
 
 
 @dataclass
 class CMessageADSB():
     __msg: str
     __ts: int
+    __mlat: Union[int, None] = None
+    __rx: int = field(default_factory=monotonic_ns)
 
     @property
     def msg(self) -> str:
@@ -21,46 +33,119 @@ class CMessageADSB():
     def time(self) -> int:
         return self.__ts
 
+    @property
+    def ticks(self) -> Union[int, None]:
+        return self.__mlat
+
+    @property
+    def mlat(self) -> Union[int, None]:
+        return None if self.__mlat is None else mlat_ns(self.__mlat)
+
+    @property
+    def rx(self) -> int:
+        return self.__rx
+
+    @property
+    def frame(self) -> tuple:
+        return self.__msg, self.__ts, self.__rx, self.mlat
+
 
 def get_icao_from_ground(p_box_id: str, p_url: str, p_user: str, p_pass: str) -> Union[str, None]:
-    url = '/'.join([p_url, 'api/authenticate'])
-    headers = {'Content-Type': 'application/json'}
-    data = f'{{"username": "{p_user}", "password": "{p_pass}"}}'
-    try:
-        res = requests.post(url=url, data=data, headers=headers, timeout=10)
-        if res.ok:
-            token = res.json()['token']
-        else:
+    return get_ground_client(p_url, p_user, p_pass).icao(p_box_id)
+
+
+class CDecoderADSB():
+    def __init__(self, p_icao: Union[str, None] = None, p_fresh: int = CPR_FRESH) -> None:
+        self.__icao = p_icao
+        self.__fresh = p_fresh
+        self.__pairs = {}
+        self.__stale = 0
+        self.__stats = CFrameStats()
+
+    @property
+    def icao(self) -> Union[str, None]:
+        return self.__icao
+
+    @property
+    def stale(self) -> int:
+        return self.__stale
+
+    def decode(self, p_msg: str, p_ts: int, p_rx: Union[int, None] = None,
+               p_mlat: Union[int, None] = None) -> Union[dict, None]:
+        icao = pms.adsb.icao(p_msg)
+        if self.__icao and icao != self.__icao:
             return None
-    except(requests.exceptions.RequestException, json.decoder.JSONDecodeError) as error:
-        raise RuntimeError(f"[get_icao_from_ground] {str(error)}") from error
 
-    url = '/'.join([p_url, 'api/admin/box/serial', p_box_id])
-    headers = {'Content-Type': 'application/json', 'Authorization': ' '.join(['Bearer', token])}
-    try:
-        res = requests.get(url=url, headers=headers, timeout=10)
-        if res.ok:
-            ret = res.json()['hex']
-        else:
+        typecode = pms.adsb.typecode(p_msg)
+        if typecode is None:
             return None
-    except(requests.exceptions.RequestException, json.decoder.JSONDecodeError) as error:
-        raise RuntimeError(f"[get_icao_from_ground] {str(error)}") from error
 
-    return ret
+        if typecode == 19 or (4 < typecode < 9):
+            velocity = pms.adsb.velocity(p_msg)[0]
+            if velocity is None:
+                return None
+            return {'time': p_ts, 'rx': p_rx, 'icao': icao, 'msg': p_msg, 'velocity': velocity}
+
+        if (9 <= typecode <= 18) or (20 <= typecode <= 22):
+            pair = self.__pairs.setdefault(icao, [None, None])
+            pair[pms.adsb.oe_flag(p_msg)] = (p_msg, p_ts * 1000000000 if p_rx is None else p_rx, p_mlat)
+
+            even, odd = pair
+            if even and odd:
+                clock = 2 if even[2] is not None and odd[2] is not None else 1
+                if abs(even[clock] - odd[clock]) > self.__fresh:
+                    pair[0 if even[clock] < odd[clock] else 1] = None
+                    self.__stale += 1
+                    self.__stats.add('stale_pair')
+                    return None
+                position = pms.bds.bds05.airborne_position(even[0], odd[0], even[clock], odd[clock])
+                altitude = pms.adsb.altitude(p_msg)
+                del self.__pairs[icao]
+                if position is None or altitude is None:
+                    return None
+                return {'time': p_ts, 'rx': p_rx, 'icao': icao, 'msg': p_msg, 'position': position, 'altitude': altitude}
+
+        return None
+
+
+def update_adsb(p_result: dict) -> None:
+    status = CSyncObj()
+    logger = getLogger("[ads-b]")
+
+    if 'velocity' in p_result:
+        velocity = p_result['velocity']
+        status.monitoring.vel = velocity
+        logger.debug("ts: %i -- msg: %s -- icao: %s -- vel: %i", p_result['time'], p_result['msg'], p_result['icao'], velocity)
+
+    if 'position' in p_result:
+        position = p_result['position']
+        altitude = p_result['altitude']
+        status.monitoring.pos = CPosition(position[0], position[1])
+        status.monitoring.alt = altitude
+        logger.debug("ts: %i -- msg: %s -- icao: %s -- pos: %s -- alt: %d", p_result['time'], p_result['msg'], p_result['icao'], position, altitude)
+
+    gate = CLteGate()
+    now = p_result['time'] if p_result.get('rx') is None else p_result['rx'] / 1e9
+    active = gate.update(status.adsb.active, now, p_result.get('velocity'), p_result.get('altitude'), p_result.get('position'))
+    if active != status.adsb.active:
+        status.adsb.active = active
+        logger.info("%s -- set lte status to watchdog: %s", gate.reason, 'enabled' if active else 'disabled')
 
 
-async def parse_adsb() -> None:
+async def parse_adsb(p_correct: bool = True, p_dedup: float = DEDUP_WINDOW) -> None:
     status = CSyncObj()
 
     logger = getLogger("[ads-b]")
     logger.debug("started")
 
-    msg0 = None
-    msg1 = None
-
     if not status.adsb.icao:
         return None
 
+    decoder = CDecoderADSB(status.adsb.icao)
+    validator = CFrameValidator(p_correct)
+    dedup = CFrameDedup(p_dedup) if p_dedup > 0 else None
+    trace = CLatencyTrace()
+
     try:
         while True:
             if status.adsb.msg.qsize() == 0:
@@ -68,54 +153,23 @@ async def parse_adsb() -> None:
                 continue
 
             msg = status.adsb.msg.get_nowait()
+            dequeued = monotonic_ns()
             logger.debug("parse new ads-b message: %s", msg.msg)
 
-            velocity = 0
-            altitude = 0
-            position = None
-            typecode = None
-
-            time_stamp = msg.time
-            message = msg.msg
-
-            icao = pms.adsb.icao(message)
-            typecode = pms.adsb.typecode(message)
+            message = validator.check(msg.msg)
+            if message is None:
+                logger.debug("drop invalid ads-b message: %s", msg.msg)
+                continue
 
-            if icao != status.adsb.icao:
-                await asyncio.sleep(1)
+            if dedup and dedup.seen(message, msg.rx):
+                logger.debug("drop duplicate ads-b message: %s", message)
                 continue
 
-            if typecode == 19 or (4 < typecode < 9):
-                velocity = pms.adsb.velocity(message)[0]
-                status.monitoring.vel = velocity
-                logger.info("ts: %i -- msg: %s -- icao: %s -- vel: %i", time_stamp, message, icao, velocity)
-
-                match (bool(velocity >= 160), status.adsb.active):
-                    case (True, True):
-                        status.adsb.active = False
-                        logger.info("speed >= 160kt -- set lte status to watchdog: disabled")
-                    case (False, False):
-                        status.adsb.active = True
-                        logger.info("speed < 160kt  -- set lte status to watchdog: enabled")
-                    case _:
-                        pass
-
-            elif (9 <= typecode <= 18) or (20 <= typecode <= 22):
-                if pms.adsb.oe_flag(message):
-                    msg1 = message
-                    time_stamp_1 = time_stamp
-                else:
-                    msg0 = message
-                    time_stamp_0 = time_stamp
-
-                if msg0 and msg1:
-                    position = pms.bds.bds05.airborne_position(msg0, msg1, time_stamp_0, time_stamp_1)
-                    altitude = pms.adsb.altitude(message)
-                    msg0 = None
-                    msg1 = None
-                    status.monitoring.pos = CPosition(position[0],position[1])
-                    status.monitoring.alt = altitude
-                    logger.info("ts: %i -- msg: %s -- icao: %s -- pos: %s -- alt: %i", time_stamp, message, icao, str(position), int(altitude))
+            result = decoder.decode(message, msg.time, msg.rx, msg.mlat)
+            if result:
+                decoded = monotonic_ns()
+                update_adsb(result)
+                trace.record(msg.rx, dequeued, decoded, monotonic_ns())
 
             await asyncio.sleep(1)
     except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
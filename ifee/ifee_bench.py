@@ -0,0 +1,368 @@
+import asyncio
+import json
+import subprocess
+import sys
+from os import path as m_path
+from time import perf_counter
+from argparse import ArgumentParser
+from statistics import median
+from typing import Union, List, Tuple, Callable
+
+
+MODULES = (
+    'ifee',
+    'ifee.ifee_common',
+    'ifee.ifee_profiler',
+    'ifee.ifee_ground',
+    'ifee.ifee_monitoring',
+    'ifee.ifee_adsb',
+    'ifee.ifee_frames',
+    'ifee.ifee_shm',
+    'ifee.ifee_snapshot',
+    'ifee.ifee_decoder',
+    'ifee.ifee_supervisor',
+    'ifee.ifee_dbus',
+    'ifee.ifee_fakebus',
+    'ifee.ifee_signal',
+    'ifee.ifee_health',
+    'ifee.ifee_uplink',
+    'ifee.ifee_forward',
+    'ifee.ifee_sensors',
+    'ifee.ifee_track',
+    'ifee.ifee_geofence',
+    'ifee.ifee_logging',
+    'ifee.ifee_watchdog'
+)
+
+SECTIONS = ('import_us', 'decode_fps', 'bus', 'collect_us', 'sync_us', 'gate', 'log_us')
+HIGHER_BETTER = ('decode_fps',)
+HIGHER_BETTER_SUFFIX = ('_lead',)
+THRESHOLD = 0.25
+
+SAMPLE_FRAMES = (
+    '8D40621D58C382D690C8AC2863A7',
+    '8D40621D58C386435CC412692AD6',
+    '8D485020994409940838175B284F',
+    '8DA05F219B06B6AF189400CBC33F',
+    '8D4840D6202CC371C32CE0576098'
+)
+
+
+def load_frames(p_path: Union[str, None] = None, p_count: int = 20000, p_aircraft: int = 256) -> List[Tuple[str, int]]:
+    from ifee.ifee_frames import syndrome
+
+    if p_path:
+        frames = []
+        with open(p_path, 'r', encoding='UTF8') as replay:
+            for num, line in enumerate(replay):
+                cols = line.split()
+                match len(cols):
+                    case 1:
+                        frames.append((cols[0], num))
+                    case 2:
+                        frames.append((cols[1], int(float(cols[0]))))
+                    case _:
+                        continue
+        return frames
+
+    frames = []
+    for num in range(p_count):
+        frame = SAMPLE_FRAMES[num % len(SAMPLE_FRAMES)]
+        icao = f"{(num // len(SAMPLE_FRAMES)) % p_aircraft:06X}"
+        data = int(frame[:2] + icao + frame[8:-6], 16) << 24
+        frames.append((f"{data | syndrome(data):028X}", num))
+    return frames
+
+
+def bench_decode(p_frames: List[Tuple[str, int]], p_workers: Tuple[int, ...] = (1, 2, 4), p_batch: int = 1024) -> dict:
+    from ifee.ifee_adsb import CDecoderADSB
+    from ifee.ifee_decoder import CDecoderPool
+    from ifee.ifee_frames import CFrameValidator
+
+    ret = {}
+    validator = CFrameValidator()
+    start = perf_counter()
+    validator.validate(p_frames)
+    ret['crc'] = round(len(p_frames) / (perf_counter() - start))
+
+    decoder = CDecoderADSB()
+    start = perf_counter()
+    for msg, time_stamp in p_frames:
+        decoder.decode(msg, time_stamp)
+    ret['inline'] = round(len(p_frames) / (perf_counter() - start))
+
+    async def replay(p_pool: CDecoderPool) -> None:
+        for i in range(0, len(p_frames), p_batch):
+            await p_pool.decode(p_frames[i:i + p_batch])
+
+    for workers in p_workers:
+        with CDecoderPool(None, workers) as pool:
+            asyncio.run(replay(pool))
+            start = perf_counter()
+            asyncio.run(replay(pool))
+            ret[f"workers_{workers}"] = round(len(p_frames) / (perf_counter() - start))
+    return ret
+
+
+def import_time(p_module: str) -> Union[int, None]:
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {p_module}"],
+                          capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        return None
+    for line in proc.stderr.splitlines():
+        try:
+            _, self_us, cumulative_us, name = [col.strip() for col in line.replace(':', '|', 1).split('|')]
+            int(self_us)
+        except ValueError:
+            continue
+        if name == p_module:
+            return int(cumulative_us)
+    return None
+
+
+def bench_import(p_modules: Union[List[str], None] = None, p_runs: int = 5) -> dict:
+    ret = {}
+    for module in p_modules or MODULES:
+        runs = [import_time(module) for _ in range(p_runs)]
+        runs = [run for run in runs if run is not None]
+        ret[module] = median(runs) if runs else None
+    return ret
+
+
+def flight_profile(p_lat: float = 52.31, p_lon: float = 4.76, p_seed: int = 1) -> List[dict]:
+    import random
+
+    rnd = random.Random(p_seed)
+    phases = ((300, 0, 25, 0), (40, 25, 175, 0), (600, 175, 250, 30000), (900, 250, 250, 30000),
+              (600, 250, 150, 0), (60, 150, 20, 0), (300, 20, 0, 0))
+    ret = []
+    now = 0
+    alt = 0.0
+    for duration, vel_from, vel_to, alt_to in phases:
+        alt_from = alt
+        for step in range(duration):
+            ratio = step / duration
+            vel = vel_from + (vel_to - vel_from) * ratio + rnd.gauss(0, 6)
+            alt = alt_from + (alt_to - alt_from) * ratio if alt_to or alt_from else 0.0
+            ret.append({'time': now, 'velocity': max(int(vel), 0)})
+            if step % 2 == 0:
+                ret.append({'time': now, 'altitude': int(alt), 'position': (p_lat + alt / 30000, p_lon)})
+            now += 1
+    return ret
+
+
+def decode_results(p_frames: List[Tuple[str, int]]) -> List[dict]:
+    from ifee.ifee_adsb import CDecoderADSB
+
+    decoder = CDecoderADSB()
+    return [result for result in (decoder.decode(msg, ts) for msg, ts in p_frames) if result]
+
+
+def bench_gate(p_results: List[dict], p_zones: Union[str, None] = None) -> dict:
+    from ifee.ifee_geofence import CGeoIndex, CLteGate, GATE_LEAD, load_zones
+
+    legacy = 0
+    legacy_off = None
+    active = True
+    for result in p_results:
+        if 'velocity' in result and (result['velocity'] >= 160) == active:
+            active = not active
+            legacy += 1
+            if legacy_off is None:
+                legacy_off = result['time']
+
+    zones = load_zones(p_zones) if p_zones else [{'name': 'home', 'lat': 52.31, 'lon': 4.76, 'radius': 8000, 'elevation': 0}]
+    ret = {'legacy': legacy}
+    for name, index, lead in (('hysteresis', None, 0), ('predictive', None, GATE_LEAD), ('geofence', CGeoIndex(zones), GATE_LEAD)):
+        gate = CLteGate()
+        gate.reset()
+        gate.setup(index, p_lead=lead)
+        before = gate.transitions
+        active = True
+        off = None
+        start = perf_counter()
+        for result in p_results:
+            active = gate.update(active, result['time'], result.get('velocity'), result.get('altitude'), result.get('position'))
+            if not active and off is None:
+                off = result['time']
+        ret[name] = gate.transitions - before
+        ret[f"{name}_us"] = round((perf_counter() - start) / max(len(p_results), 1) * 1e6, 3)
+        if off is not None and legacy_off is not None:
+            ret[f"{name}_lead"] = legacy_off - off
+    return ret
+
+
+def time_us(p_func: Callable, p_number: int = 1000, p_repeat: int = 5) -> float:
+    runs = []
+    for _ in range(p_repeat):
+        start = perf_counter()
+        for _ in range(p_number):
+            p_func()
+        runs.append((perf_counter() - start) / p_number)
+    return round(median(runs) * 1e6, 3)
+
+
+def bench_bus(p_number: int = 20) -> Union[dict, None]:
+    try:
+        from ifee.ifee_fakebus import CFakeBus
+        from ifee.ifee_dbus import CModemManager, CNetworkManager
+    except ImportError:
+        return None
+
+    ret = {}
+    with CFakeBus() as fake:
+        modem = CModemManager().modems[0]
+        conn = CNetworkManager().get('lte')
+
+        def toggle() -> None:
+            conn.connect = True
+            conn.connect = False
+
+        for name, func in (('properties', lambda: modem.properties),
+                           ('network_get', lambda: CNetworkManager().get('lte')),
+                           ('connect', lambda: conn.connect),
+                           ('connect_toggle', toggle)):
+            fake.reset()
+            latency = time_us(func, p_number, 1)
+            ret[name] = {'calls': sum(fake.stats.values()) // p_number, 'latency_us': latency}
+    return ret
+
+
+def bench_collect(p_number: int = 1000) -> dict:
+    from prometheus_client import CollectorRegistry, generate_latest
+    from ifee.ifee_common import CSyncObj, CBattery, CTemperature, CPosition
+    from ifee.ifee_monitoring import CAircraftCollector, CMetricCollector
+
+    status = CSyncObj()
+    status.adsb.icao = status.adsb.icao or '40621D'
+    status.monitoring.pos = CPosition(52.25, 3.91)
+    status.monitoring.bat = [CBattery(i, True, 90) for i in range(4)]
+    status.monitoring.tmp = [CTemperature(f"core{i}", 45.0) for i in range(8)]
+
+    ret = {}
+    for collector in (CAircraftCollector, CMetricCollector):
+        registry = CollectorRegistry()
+        registry.register(collector())
+        ret[collector.__name__] = time_us(lambda: generate_latest(registry), p_number)
+    return ret
+
+
+def bench_sync(p_number: int = 10000) -> dict:
+    from ifee.ifee_common import CSyncMonitoring, CPosition
+
+    monitoring = CSyncMonitoring()
+    pos = CPosition(52.25, 3.91)
+
+    def setters() -> None:
+        monitoring.vel = 250
+        monitoring.alt = 30000
+        monitoring.pos = pos
+        monitoring.pwr = True
+
+    return {'setters': time_us(setters, p_number), 'as_dict': time_us(monitoring.as_dict, p_number)}
+
+
+def bench_log(p_number: int = 10000) -> dict:
+    import logging
+    from ifee.ifee_logging import setup_logging, stop_logging
+
+    logger = logging.getLogger("[bench]")
+    result = {'time': 1700000000, 'msg': SAMPLE_FRAMES[0], 'icao': '40621D'}
+
+    def eager() -> None:
+        msg = f"ts: {result['time']} -- msg: {result['msg']} -- icao: {result['icao']}"
+        logger.debug(msg)
+
+    def lazy() -> None:
+        logger.debug("ts: %i -- msg: %s -- icao: %s", result['time'], result['msg'], result['icao'])
+
+    def limited() -> None:
+        logger.info("ts: %i -- msg: %s -- icao: %s", result['time'], result['msg'], result['icao'])
+
+    setup_logging('INFO', p_handlers=[logging.NullHandler()])
+    try:
+        return {'eager': time_us(eager, p_number), 'lazy': time_us(lazy, p_number),
+                'limited': time_us(limited, p_number)}
+    finally:
+        stop_logging()
+
+
+def flatten(p_result: dict, p_prefix: str = '') -> dict:
+    ret = {}
+    for key, val in p_result.items():
+        name = f"{p_prefix}.{key}" if p_prefix else str(key)
+        if isinstance(val, dict):
+            ret.update(flatten(val, name))
+        elif isinstance(val, (int, float)) and not isinstance(val, bool):
+            ret[name] = val
+    return ret
+
+
+def higher_better(p_name: str) -> bool:
+    return p_name.split('.')[0] in HIGHER_BETTER or p_name.endswith(HIGHER_BETTER_SUFFIX)
+
+
+def compare(p_result: dict, p_baseline: dict, p_threshold: float = THRESHOLD) -> List[str]:
+    ret = []
+    current = flatten(p_result)
+    for name, base in flatten(p_baseline).items():
+        val = current.get(name)
+        if val is None or not base:
+            continue
+        if higher_better(name):
+            change = (base - val) / base
+        else:
+            change = (val - base) / base
+        if change > p_threshold:
+            ret.append(f"{name}: {base} -> {val} ({change:+.0%})")
+    return ret
+
+
+def run(p_sections: Tuple[str, ...] = SECTIONS, p_modules: Union[List[str], None] = None, p_runs: int = 5,
+        p_replay: Union[str, None] = None, p_workers: Tuple[int, ...] = (1, 2, 4)) -> dict:
+    ret = {}
+    for section in p_sections:
+        match section:
+            case 'import_us':
+                ret[section] = bench_import(p_modules, p_runs)
+            case 'decode_fps':
+                ret[section] = bench_decode(load_frames(p_replay), p_workers)
+            case 'bus':
+                bus = bench_bus()
+                if bus is not None:
+                    ret[section] = bus
+            case 'collect_us':
+                ret[section] = bench_collect()
+            case 'sync_us':
+                ret[section] = bench_sync()
+            case 'gate':
+                ret[section] = bench_gate(decode_results(load_frames(p_replay)) if p_replay else flight_profile())
+            case 'log_us':
+                ret[section] = bench_log()
+    return ret
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m ifee.ifee_bench')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--replay', help='recorded frames, one "[ts] hex" per line')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4])
+    parser.add_argument('--sections', nargs='*', choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument('--baseline', help='baseline json, compared against when present')
+    parser.add_argument('--save', action='store_true', help='write results to the baseline file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed relative regression')
+    parser.add_argument('modules', nargs='*')
+    args = parser.parse_args()
+
+    result = run(tuple(args.sections), args.modules, args.runs, args.replay, tuple(args.workers))
+    print(json.dumps(result, indent=2))
+
+    if args.baseline and args.save:
+        with open(args.baseline, 'w', encoding='UTF8') as file:
+            file.write(json.dumps(result, indent=2) + '\n')
+    elif args.baseline and m_path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='UTF8') as file:
+            regressions = compare(result, json.loads(file.read()), args.threshold)
+        for regression in regressions:
+            print(f"regression {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -1,4 +1,4 @@
-from os import makedirs as m_mkdir, path as m_path
+from os import makedirs as m_mkdir, path as m_path, replace as m_replace, fsync as m_fsync
 from typing import Union, List
 from datetime import datetime as m_dt
 from dataclasses import dataclass, field
@@ -15,6 +15,7 @@ class CCacheICAO():
         self.__path = p_path
         self.__time = 0
         self.__icao = None
+        self.__entries = {}
 
         try:
             if m_path.isfile(self.__path):
@@ -22,16 +23,18 @@ class CCacheICAO():
                     data = json.loads(cache.read())
                     self.__icao = data['icao']
                     self.__time = int(data['time'])
-        except(json.decoder.JSONDecodeError, KeyError) as err:
+                    for box, entry in data.get('entries', {}).items():
+                        self.__entries[str(box)] = {'icao': entry['icao'], 'time': int(entry['time'])}
+        except(json.decoder.JSONDecodeError, KeyError, TypeError, ValueError) as err:
             raise RuntimeError(COULD_NOT_GET.format(module='icao', unit='icao', aux='from cache')) from err
 
     def __str__(self) -> str:
-        return ','.join([f"path:{self.__path}", f"time:{self.__time}", f"icao:{self.__icao}"])
+        return ','.join([f"path:{self.__path}", f"time:{self.__time}", f"icao:{self.__icao}", f"entries:{len(self.__entries)}"])
 
     def as_dict(self) -> dict:
-        return {'path': self.__path, 'time': self.__time, 'icao': self.__icao}
+        return {'path': self.__path, 'time': self.__time, 'icao': self.__icao, 'entries': dict(self.__entries)}
 
-    def __getattr__(self, p_key: str) -> Union[int, str, None]:
+    def __getattr__(self, p_key: str) -> Union[int, str, dict, None]:
         match p_key:
             case "path":
                 return self.__path
@@ -39,16 +42,33 @@ class CCacheICAO():
                 return self.__time
             case "icao":
                 return self.__icao
+            case "entries":
+                return dict(self.__entries)
             case _:
                 return None
 
-    def save(self, p_icao: str) -> None:
+    def get(self, p_box: str) -> Union[dict, None]:
+        entry = self.__entries.get(p_box)
+        return dict(entry) if entry else None
+
+    def save(self, p_icao: str, p_box: Union[str, None] = None) -> None:
         self.__time = int(m_dt.now().timestamp())
         self.__icao = p_icao
+        if p_box is not None:
+            self.__entries[p_box] = {'icao': p_icao, 'time': self.__time}
+
+        data = {'time': self.__time, 'icao': self.__icao}
+        if self.__entries:
+            data['entries'] = self.__entries
+
+        tmp = self.__path + '.tmp'
         try:
             m_mkdir(m_path.dirname(self.__path), mode=493, exist_ok=True)
-            with open(self.__path, 'w', encoding='UTF8') as cache:
-                cache.write(json.dumps({'time': self.__time, 'icao': self.__icao}))
+            with open(tmp, 'w', encoding='UTF8') as cache:
+                cache.write(json.dumps(data))
+                cache.flush()
+                m_fsync(cache.fileno())
+            m_replace(tmp, self.__path)
         except OSError as err:
             raise RuntimeError(COULD_NOT_SET.format(module='icao', unit='icao', aux='to cache')) from err
 
@@ -69,7 +89,7 @@ class CBattery():
             assert isinstance(p_val, Union[int, float])
             self.__power = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='power')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='power', aux='')) from err
 
     @property
     def level(self) -> int:
@@ -81,7 +101,7 @@ class CBattery():
             assert isinstance(p_val, int)
             self.__level = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='level')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='level', aux='')) from err
 
     def __str__(self) -> str:
         return ','.join([f"name:{self.__index}", f"power:{self.__power}", f"level:{self.__level}"])
@@ -105,7 +125,7 @@ class CTemperature():
             assert isinstance(p_val, (float, int))
             self.__value = float(p_val)
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='temperature', unit='value')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='temperature', unit='value', aux='')) from err
 
     def __str__(self) -> str:
         return ','.join([f"name:{self.__name}", f"value:{self.__value}"])
@@ -129,7 +149,7 @@ class CPosition():
             assert isinstance(p_val, float)
             self.__lat = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='latitude', unit='value')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='latitude', unit='value', aux='')) from err
 
     @property
     def lon(self) -> Union[float, None]:
@@ -141,7 +161,7 @@ class CPosition():
             assert isinstance(p_val, float)
             self.__lon = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='longitude', unit='value')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='longitude', unit='value', aux='')) from err
 
     def __str__(self) -> str:
         return ','.join([f"lat:{self.__lat}", f"lon:{self.__lon}"])
@@ -169,7 +189,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, bool)
             self.__pwr = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='power unit', unit='state')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='power unit', unit='state', aux='')) from err
 
     @property
     def bat(self) -> List[CBattery]:
@@ -181,7 +201,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, list)
             self.__bat = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='batteries', unit='states')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='batteries', unit='states', aux='')) from err
 
     @property
     def tmp(self) -> List[CTemperature]:
@@ -193,7 +213,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, list)
             self.__tmp = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='temperatures', unit='values')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='temperatures', unit='values', aux='')) from err
 
     @property
     def vel(self) -> int:
@@ -205,7 +225,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, int)
             self.__vel = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='velocity', unit='speed')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='velocity', unit='speed', aux='')) from err
 
     @property
     def alt(self) -> int:
@@ -217,7 +237,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, int)
             self.__alt = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='altitude', unit='value')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='altitude', unit='value', aux='')) from err
 
     @property
     def pos(self) -> CPosition:
@@ -229,7 +249,7 @@ class CSyncMonitoring():
             assert isinstance(p_val, CPosition)
             self.__pos = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='position', unit='lotitude, longitude')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='position', unit='lotitude, longitude', aux='')) from err
 
     def as_dict(self) -> dict:
         ret = {}
@@ -261,7 +281,7 @@ class CSyncADSB():
             assert isinstance(p_val, Union[str, None])
             self.__icao = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='value')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='value', aux='')) from err
 
     @property
     def active(self) -> bool:
@@ -273,7 +293,7 @@ class CSyncADSB():
             assert isinstance(p_val, bool)
             self.__active = p_val
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='status')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='status', aux='')) from err
 
 
 @dataclass
@@ -295,7 +315,7 @@ class CSyncControl():
             assert isinstance(p_state, Union[bool, None])
             self.__wifi = p_state
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='wifi', unit='state')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='wifi', unit='state', aux='')) from err
 
     @modem.setter
     def modem(self, p_state: Union[bool, None]) -> None:
@@ -303,7 +323,7 @@ class CSyncControl():
             assert isinstance(p_state, Union[bool, None])
             self.__modem = p_state
         except AssertionError as err:
-            raise RuntimeError(COULD_NOT_SET.format(module='modem', unit='state')) from err
+            raise RuntimeError(COULD_NOT_SET.format(module='modem', unit='state', aux='')) from err
 
     def __str__(self) -> str:
         ret = {}
@@ -1,11 +1,18 @@
-from typing import Union, List
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Union, List, Dict
 from enum import Enum
+from os import environ
 from logging import getLogger
 from dbus import SystemBus, Interface, DBusException
+from dbus.bus import BusConnection
 
 
-SERVICE_SUCCESS = "service {0} {1} successfully"
-SERVICE_FAILED  = "{0} service {1} failed: {2}"
+DBUS_ADDRESS_ENV = 'IFEE_DBUS_ADDRESS'
+
+SERVICE_SUCCESS = "service %s %s successfully"
+SERVICE_FAILED  = "%s service %s failed: %s"
 
 
 MM_DBUS_PATH = '/org/freedesktop/ModemManager1'
@@ -20,6 +27,7 @@ SYSTEMD_DBUS_PROXY = 'org.freedesktop.systemd1'
 SYSTEMD_DBUS_SERVICE = 'org.freedesktop.systemd1'
 SYSTEMD_DBUS_INTERFACE  = 'org.freedesktop.systemd1.Manager'
 SYSTEMD_DBUS_INTERFACE_UNIT = 'org.freedesktop.systemd1.Unit'
+SYSTEMD_REMOVED = 256
 NM_DBUS_PATH =  '/org/freedesktop/NetworkManager'
 NM_DBUS_PATH_SETTINGS = '/org/freedesktop/NetworkManager/Settings'
 NM_DBUS_PROXY = 'org.freedesktop.NetworkManager'
@@ -27,6 +35,7 @@ NM_DBUS_SERVICE = 'org.freedesktop.NetworkManager'
 NM_DBUS_SERVICE_SETTINGS = 'org.freedesktop.NetworkManager.Settings'
 NM_DBUS_SERVICE_CONNECTION = 'org.freedesktop.NetworkManager.Settings.Connection'
 NM_DBUS_CONNECTION_ACTIVE  = 'org.freedesktop.NetworkManager.Connection.Active'
+NM_DBUS_DEVICE = 'org.freedesktop.NetworkManager.Device'
 
 
 class CModemTechs(Enum):
@@ -71,6 +80,8 @@ class CModemFailedReason(Enum):
     UNKNOWN = 1
     SIM_MISSING = 2
     SIM_ERROR = 3
+    UNKNOWN_CAPABILITIES = 4
+    ESIM_WITHOUT_PROFILES = 5
 
 
 class CModemPowerStates(Enum):
@@ -80,6 +91,69 @@ class CModemPowerStates(Enum):
     ON  = 3
 
 
+def enum_name(p_enum, p_val: int) -> str:
+    try:
+        return p_enum(int(p_val)).name
+    except ValueError:
+        return 'UNKNOWN'
+
+
+def parse_modem(p_props: dict) -> dict:
+    ret = {}
+    if 'State' in p_props:
+        ret['State'] = enum_name(CModemStates, p_props['State'])
+    if 'StateFailedReason' in p_props:
+        ret['FailedReason'] = enum_name(CModemFailedReason, p_props['StateFailedReason'])
+    if 'SignalQuality' in p_props:
+        ret['SignalQuality'] = int(p_props['SignalQuality'][0])
+    if 'PowerState' in p_props:
+        ret['PowerState'] = enum_name(CModemPowerStates, p_props['PowerState'])
+    return ret
+
+
+_buses = {}
+_signal_buses = {}
+_signal_lock = threading.Lock()
+
+
+def get_bus() -> BusConnection:
+    address = environ.get(DBUS_ADDRESS_ENV)
+    if not address:
+        return SystemBus()
+    if address not in _buses:
+        try:
+            _buses[address] = BusConnection(address)
+        except DBusException as err:
+            raise RuntimeError(f"[dbus] {address}: {str(err)}") from err
+    return _buses[address]
+
+
+def get_signal_bus() -> BusConnection:
+    address = environ.get(DBUS_ADDRESS_ENV)
+    with _signal_lock:
+        if address in _signal_buses:
+            return _signal_buses[address]
+        try:
+            from gi.repository import GLib
+            from dbus.mainloop.glib import DBusGMainLoop, threads_init
+        except ImportError as err:
+            raise RuntimeError(f"[dbus] signals need GLib: {str(err)}") from err
+
+        if not _signal_buses:
+            threads_init()
+            threading.Thread(target=GLib.MainLoop().run, name='dbus-signals', daemon=True).start()
+        try:
+            mainloop = DBusGMainLoop()
+            if address:
+                bus = BusConnection(address, mainloop=mainloop)
+            else:
+                bus = SystemBus(private=True, mainloop=mainloop)
+        except DBusException as err:
+            raise RuntimeError(f"[dbus] {address or 'system'}: {str(err)}") from err
+        _signal_buses[address] = bus
+        return bus
+
+
 def find_access_tech(p_value: int) -> List[str]:
     if p_value == CModemTechs.UNKNOWN.value:
         return [CModemTechs.UNKNOWN.name]
@@ -98,7 +172,7 @@ class CSystemdService():
         self.__name = p_service + '.service'
         self.__log  = getLogger('[systemd]')
 
-        bus = SystemBus()
+        bus = get_bus()
 
         self.__systemd = bus.get_object(SYSTEMD_DBUS_PROXY, SYSTEMD_DBUS_PATH)
         self.__manager = Interface(self.__systemd, SYSTEMD_DBUS_INTERFACE)
@@ -122,43 +196,202 @@ class CSystemdService():
         if self.state() == 'running':
             try:
                 self.__manager.StopUnit(self.__name, 'replace')
-                msg = SERVICE_SUCCESS.format(self.__name, 'stopped')
-                self.__log.debug(msg)
+                self.__log.debug(SERVICE_SUCCESS, self.__name, 'stopped')
             except DBusException as err:
-                msg = SERVICE_FAILED.format(self.__name, 'stopping', str(err))
-                self.__log.error(msg)
+                self.__log.error(SERVICE_FAILED, 'stopping', self.__name, err)
 
     def start(self) -> None:
         if self.state() != 'running':
             try:
                 self.__manager.StartUnit(self.__name, 'replace')
-                msg = SERVICE_SUCCESS.format(self.__name, 'started')
-                self.__log.debug(msg)
+                self.__log.debug(SERVICE_SUCCESS, self.__name, 'started')
             except DBusException as err:
-                msg = SERVICE_FAILED.format('starting', self.__name, str(err))
-                self.__log.error(msg)
+                self.__log.error(SERVICE_FAILED, 'starting', self.__name, err)
 
     def enable(self) -> None:
         if not self.enabled():
             try:
                 self.__manager.EnableUnitFiles([self.__name], False, True)
                 self.__manager.Reload()
-                msg = SERVICE_SUCCESS.format(self.__name, 'enabled')
-                self.__log.debug(msg)
+                self.__log.debug(SERVICE_SUCCESS, self.__name, 'enabled')
             except DBusException as err:
-                msg = SERVICE_FAILED.format('enabling', self.__name, str(err))
-                self.__log.error(msg)
+                self.__log.error(SERVICE_FAILED, 'enabling', self.__name, err)
 
     def disable(self) -> None:
         if self.enabled():
             try:
                 self.__manager.DisableUnitFiles([self.__name], False)
                 self.__manager.Reload()
-                msg = SERVICE_SUCCESS.format(self.__name, 'disabled')
-                self.__log.debug(msg)
+                self.__log.debug(SERVICE_SUCCESS, self.__name, 'disabled')
+            except DBusException as err:
+                self.__log.error(SERVICE_FAILED, 'disabling', self.__name, err)
+
+
+class CSystemdServices():
+    def __init__(self, p_services: List[str]) -> None:
+        self.__names = [s if '.' in s else s + '.service' for s in p_services]
+        self.__log = getLogger('[systemd]')
+        self.__lock = threading.Lock()
+        self.__paths = {}
+        self.__states = {}
+        self.__jobs = {}
+        self.__removed = OrderedDict()
+
+        self.__bus = get_signal_bus()
+        try:
+            self.__manager = Interface(self.__bus.get_object(SYSTEMD_DBUS_PROXY, SYSTEMD_DBUS_PATH), SYSTEMD_DBUS_INTERFACE)
+            self.__manager.Subscribe()
+            self.__bus.add_signal_receiver(self.__job_removed, 'JobRemoved', SYSTEMD_DBUS_INTERFACE,
+                                           SYSTEMD_DBUS_SERVICE, SYSTEMD_DBUS_PATH)
+            self.__bus.add_signal_receiver(self.__changed, 'PropertiesChanged', DBUS_INTERFACE_PROPERTIES,
+                                           SYSTEMD_DBUS_SERVICE, path_keyword='path')
+            for name in self.__names:
+                self.__load(name)
+        except DBusException as err:
+            raise RuntimeError(f"[systemd] {str(err)}") from err
+
+    def __str__(self) -> str:
+        return str(self.states)
+
+    def __load(self, p_name: str) -> dict:
+        path = str(self.__manager.LoadUnit(p_name))
+        props = Interface(self.__bus.get_object(SYSTEMD_DBUS_SERVICE, path), DBUS_INTERFACE_PROPERTIES)
+        state = {str(k): str(v) for k, v in props.GetAll(SYSTEMD_DBUS_INTERFACE_UNIT).items()
+                 if k in ('SubState', 'ActiveState', 'UnitFileState')}
+        with self.__lock:
+            self.__paths[path] = p_name
+            self.__states[p_name] = state
+        return dict(state)
+
+    def __job_removed(self, p_id, p_job, p_unit, p_result) -> None:
+        with self.__lock:
+            pending = self.__jobs.pop(str(p_job), None)
+            if pending is None:
+                if str(p_unit) in self.__states:
+                    self.__removed[str(p_job)] = str(p_result)
+                    while len(self.__removed) > SYSTEMD_REMOVED:
+                        self.__removed.popitem(last=False)
+                return
+        loop, future = pending
+        loop.call_soon_threadsafe(self.__resolve, future, str(p_result))
+
+    def __changed(self, p_interface, p_changed, p_invalidated, path=None) -> None:
+        name = self.__paths.get(str(path))
+        if name is None or str(p_interface) != SYSTEMD_DBUS_INTERFACE_UNIT:
+            return
+        with self.__lock:
+            self.__states[name].update({str(k): str(v) for k, v in p_changed.items()
+                                        if k in ('SubState', 'ActiveState', 'UnitFileState')})
+
+    @staticmethod
+    def __resolve(p_future: asyncio.Future, p_result: str) -> None:
+        if not p_future.done():
+            p_future.set_result(p_result)
+
+    @property
+    def states(self) -> Dict[str, dict]:
+        with self.__lock:
+            return {name: dict(state) for name, state in self.__states.items()}
+
+    def __state(self, p_name: str) -> Union[dict, None]:
+        name = p_name if '.' in p_name else p_name + '.service'
+        with self.__lock:
+            state = self.__states.get(name)
+            if state is not None:
+                return dict(state)
+        try:
+            return self.__load(name)
+        except DBusException as err:
+            self.__log.error("could not load unit %s: %s", name, err)
+            return None
+
+    def state(self, p_name: str) -> Union[str, None]:
+        state = self.__state(p_name)
+        return state.get('SubState') if state else None
+
+    def enabled(self, p_name: str) -> Union[bool, None]:
+        state = self.__state(p_name)
+        return state.get('UnitFileState') == 'enabled' if state else None
+
+    def __select(self, p_names: Union[List[str], None], p_check) -> List[str]:
+        names = self.__names if p_names is None else [s if '.' in s else s + '.service' for s in p_names]
+        return [name for name in names if p_check(name)]
+
+    def __unit_files(self, p_names: List[str], p_enable: bool) -> List[str]:
+        action, verb = ('enabled', 'enabling') if p_enable else ('disabled', 'disabling')
+        if not p_names:
+            return p_names
+        try:
+            if p_enable:
+                self.__manager.EnableUnitFiles(p_names, False, True)
+            else:
+                self.__manager.DisableUnitFiles(p_names, False)
+            self.__manager.Reload()
+        except DBusException as err:
+            self.__log.error(SERVICE_FAILED, verb, ','.join(p_names), err)
+            return []
+        with self.__lock:
+            for name in p_names:
+                self.__states.setdefault(name, {})['UnitFileState'] = action
+        self.__log.debug(SERVICE_SUCCESS, ','.join(p_names), action)
+        return p_names
+
+    def enable(self, p_names: Union[List[str], None] = None) -> List[str]:
+        return self.__unit_files(self.__select(p_names, lambda n: self.enabled(n) is False), True)
+
+    def disable(self, p_names: Union[List[str], None] = None) -> List[str]:
+        return self.__unit_files(self.__select(p_names, self.enabled), False)
+
+    def __submit(self, p_method: str, p_names: List[str]) -> Dict[str, Union[str, DBusException]]:
+        ret = {}
+        for name in p_names:
+            try:
+                ret[name] = str(getattr(self.__manager, p_method)(name, 'replace'))
             except DBusException as err:
-                msg = SERVICE_FAILED.format('disabling', self.__name, str(err))
-                self.__log.error(msg)
+                ret[name] = err
+        return ret
+
+    async def __run_jobs(self, p_method: str, p_action: str, p_verb: str, p_names: List[str], p_timeout: float) -> Dict[str, str]:
+        if not p_names:
+            return {}
+        loop = asyncio.get_running_loop()
+        ret = {}
+        futures = {}
+        for name, job in (await asyncio.to_thread(self.__submit, p_method, p_names)).items():
+            if isinstance(job, DBusException):
+                self.__log.error(SERVICE_FAILED, p_verb, name, job)
+                ret[name] = 'failed'
+                continue
+            future = loop.create_future()
+            with self.__lock:
+                if job in self.__removed:
+                    future.set_result(self.__removed.pop(job))
+                else:
+                    self.__jobs[job] = (loop, future)
+            futures[name] = (job, future)
+
+        if futures:
+            await asyncio.wait([f for _, f in futures.values()], timeout=p_timeout)
+        for name, (job, future) in futures.items():
+            if future.done():
+                ret[name] = future.result()
+            else:
+                with self.__lock:
+                    self.__jobs.pop(job, None)
+                ret[name] = 'timeout'
+            if ret[name] == 'done':
+                self.__log.debug(SERVICE_SUCCESS, name, p_action)
+            else:
+                self.__log.error(SERVICE_FAILED, p_verb, name, ret[name])
+        return ret
+
+    async def start(self, p_names: Union[List[str], None] = None, p_timeout: float = 30) -> Dict[str, str]:
+        names = self.__select(p_names, lambda n: self.state(n) not in ('running', None))
+        return await self.__run_jobs('StartUnit', 'started', 'starting', names, p_timeout)
+
+    async def stop(self, p_names: Union[List[str], None] = None, p_timeout: float = 30) -> Dict[str, str]:
+        names = self.__select(p_names, lambda n: self.state(n) == 'running')
+        return await self.__run_jobs('StopUnit', 'stopped', 'stopping', names, p_timeout)
 
 
 class CConnection():
@@ -170,7 +403,7 @@ class CConnection():
             raise RuntimeError(f"[connection] init: incorrect format {str(err)}") from err
 
         self.__path_active = None
-        self.__bus = SystemBus()
+        self.__bus = get_bus()
 
         try:
             proxy = self.__bus.get_object(NM_DBUS_SERVICE, self.__path)
@@ -202,8 +435,7 @@ class CConnection():
             settings = self.__iface.GetSettings()
             settings['connection']['autoconnect'] = p_val
             self.__iface.Update(settings)
-            msg = f"autoconnect - {p_val}"
-            self.__log.debug(msg)
+            self.__log.debug("autoconnect - %s", p_val)
         except (AssertionError, DBusException) as err:
             raise RuntimeError(f"[{self.__id}] could not set autoconnect to {p_val}") from err
 
@@ -248,10 +480,24 @@ class CConnection():
         except (AssertionError, DBusException) as err:
             raise RuntimeError(f"[{self.__id}] {str(err)}") from err
 
+    @property
+    def interface(self) -> Union[str, None]:
+        if not self.connect:
+            return None
+        try:
+            a_props = Interface(self.__bus.get_object(NM_DBUS_PROXY, self.__path_active), DBUS_INTERFACE_PROPERTIES)
+            devices = list(a_props.Get(NM_DBUS_CONNECTION_ACTIVE, 'Devices'))
+            if not devices:
+                return None
+            d_props = Interface(self.__bus.get_object(NM_DBUS_PROXY, devices[0]), DBUS_INTERFACE_PROPERTIES)
+            return str(d_props.Get(NM_DBUS_DEVICE, 'IpInterface') or d_props.Get(NM_DBUS_DEVICE, 'Interface'))
+        except DBusException as err:
+            raise RuntimeError(f"[{self.__id}] interface: {str(err)}") from err
+
 
 class CNetworkManager():
     def __init__(self) -> None:
-        self.__bus = SystemBus()
+        self.__bus = get_bus()
 
     def get(self, p_id: str) -> Union[CConnection, None]:
         try:
@@ -274,7 +520,7 @@ class CModem():
     def __init__(self, p_path: str) -> None:
         self.__conn = None
         self.__path = p_path
-        self.__bus = SystemBus()
+        self.__bus = get_bus()
         self.__proxy = self.__bus.get_object(MM_DBUS_PROXY, self.__path)
         self.__iface = Interface(self.__proxy, dbus_interface=DBUS_INTERFACE_PROPERTIES)
         self.__log = getLogger(f"[modem {p_path.split('/')[-1]}]")
@@ -291,6 +537,10 @@ class CModem():
     def index(self) -> int:
         return int(self.__path.split('/')[-1])
 
+    @property
+    def path(self) -> str:
+        return self.__path
+
     @property
     def properties(self) -> dict:
         property_dict = {}
@@ -327,22 +577,22 @@ class CModem():
                     MM_DBUS_INTERFACE_MODEM, \
                     'EquipmentIdentifier'\
                     ))
-            property_dict['State'] = CModemStates(int(self.__iface.Get(\
+            property_dict['State'] = enum_name(CModemStates, self.__iface.Get(\
                     MM_DBUS_INTERFACE_MODEM, \
                     'State'\
-                    ))).name
-            property_dict['FailedReason'] = CModemFailedReason(int(self.__iface.Get(\
+                    ))
+            property_dict['FailedReason'] = enum_name(CModemFailedReason, self.__iface.Get(\
                     MM_DBUS_INTERFACE_MODEM, \
                     'StateFailedReason'\
-                    ))).name
+                    ))
             property_dict['SignalQuality'] = int(self.__iface.Get(\
                     MM_DBUS_INTERFACE_MODEM, \
                     'SignalQuality'\
                     )[0])
-            property_dict['PowerState'] = CModemPowerStates(int(self.__iface.Get(\
+            property_dict['PowerState'] = enum_name(CModemPowerStates, self.__iface.Get(\
                     MM_DBUS_INTERFACE_MODEM, \
                     'PowerState'\
-                    ))).name
+                    ))
             property_dict['AccessTechnologies'] = ','.join(find_access_tech(\
                     int(self.__iface.Get(\
                             MM_DBUS_INTERFACE_MODEM, \
@@ -350,8 +600,7 @@ class CModem():
                             ))\
                     ))
         except(DBusException, IndexError) as err:
-            msg = f"error ocured when tring to get properties: {str(err)}"
-            self.__log.error(msg)
+            self.__log.error("error ocured when tring to get properties: %s", err)
 
         return property_dict
 
@@ -359,8 +608,9 @@ class CModem():
     def signal(self) -> dict:
         try:
             prop_iface = Interface(self.__proxy, dbus_interface=DBUS_INTERFACE_PROPERTIES)
-            signal_iface = Interface(self.__proxy, dbus_interface=MM_DBUS_INTERFACE_SIGNAL)
-            signal_iface.Setup(1)
+            if not int(prop_iface.Get(MM_DBUS_INTERFACE_SIGNAL, 'Rate')):
+                signal_iface = Interface(self.__proxy, dbus_interface=MM_DBUS_INTERFACE_SIGNAL)
+                signal_iface.Setup(1)
 
             for mode in ['Gsm', 'Umts', 'Lte', 'Cdma', 'Evdo']:
                 signal_raw = dict(prop_iface.Get(MM_DBUS_INTERFACE_SIGNAL, mode)).items()
@@ -370,8 +620,7 @@ class CModem():
                         signal_ret[str(item[0])] = float(item[1])
                     return signal_ret
         except(DBusException, IndexError) as err:
-            msg = f"error ocured when tring to get modem signal: {str(err)}"
-            self.__log.error(msg)
+            self.__log.error("error ocured when tring to get modem signal: %s", err)
 
         return {}
 
@@ -381,8 +630,7 @@ class CModem():
         try:
             iface.Reset()
         except DBusException as err:
-            msg = f"reset failed: {str(err)}"
-            self.__log.error(msg)
+            self.__log.error("reset failed: %s", err)
 
     def enable(self) -> bool:
         iface = Interface(self.__proxy, dbus_interface=MM_DBUS_INTERFACE_MODEM)
@@ -401,32 +649,26 @@ class CModem():
             case _:
                 try:
                     iface.SetPowerState(CModemPowerStates.ON.value)
-                    msg = "powered on successfully"
-                    self.__log.info(msg)
+                    self.__log.info("powered on successfully")
                 except DBusException as err:
-                    msg = f"powered on failed: {str(err)}"
-                    self.__log.error(msg)
+                    self.__log.error("powered on failed: %s", err)
                     return False
 
         match properties['State']:
             case CModemStates.FAILED.name:
-                msg = f"enabling connection {self.__conn} failed: {properties['FailedReason']}"
-                self.__log.error(msg)
+                self.__log.error("enabling connection %s failed: %s", self.__conn, properties['FailedReason'])
                 return False
             case CModemStates.ENABLING.name|CModemStates.ENABLED.name|CModemStates.CONNECTING.name|CModemStates.CONNECTED.name|CModemStates.REGISTERED.name:
                 return True
             case _:
                 try:
                     iface.Enable(True)
-                    msg = f"connection {self.__conn} enabled successfully"
-                    self.__log.info(msg)
+                    self.__log.info("connection %s enabled successfully", self.__conn)
                     conn.autoconnect = True
-                    msg = f"autoconnect on for {self.__conn}"
-                    self.__log.info(msg)
+                    self.__log.info("autoconnect on for %s", self.__conn)
                     return True
                 except DBusException as err:
-                    msg = f"enabling connection {self.__conn} failed: {str(err)}"
-                    self.__log.error(msg)
+                    self.__log.error("enabling connection %s failed: %s", self.__conn, err)
                     return False
 
     def disable(self) -> bool:
@@ -441,22 +683,18 @@ class CModem():
 
         match properties['State']:
             case CModemStates.FAILED.name:
-                msg = f"disabling connection {self.__conn} failed: {properties['FailedReason']}"
-                self.__log.error(msg)
+                self.__log.error("disabling connection %s failed: %s", self.__conn, properties['FailedReason'])
                 return False
             case CModemStates.DISABLING.name|CModemStates.DISABLED.name:
                 pass
             case _:
                 try:
                     conn.autoconnect = False
-                    msg = f"autoconnect off for {self.__conn}"
-                    self.__log.info(msg)
+                    self.__log.info("autoconnect off for %s", self.__conn)
                     iface.Enable(False)
-                    msg = f"connection {self.__conn} disabled successfuly"
-                    self.__log.info(msg)
+                    self.__log.info("connection %s disabled successfuly", self.__conn)
                 except DBusException as err:
-                    msg = f"disabling connection {self.__conn} failed: {str(err)}"
-                    self.__log.error(msg)
+                    self.__log.error("disabling connection %s failed: %s", self.__conn, err)
                     return False
 
         match properties['PowerState']:
@@ -465,18 +703,16 @@ class CModem():
             case _:
                 try:
                     iface.SetPowerState(CModemPowerStates.LOW.value)
-                    msg = "powered off successfully"
-                    self.__log.info(msg)
+                    self.__log.info("powered off successfully")
                     return True
                 except DBusException as err:
-                    msg = f"powered off failed: {str(err)}"
-                    self.__log.error(msg)
+                    self.__log.error("powered off failed: %s", err)
                     return False
 
 
 class CModemManager():
     def __init__(self) -> None:
-        self.__bus = SystemBus()
+        self.__bus = get_bus()
 
         try:
             proxy = self.__bus.get_object(MM_DBUS_PROXY, MM_DBUS_PATH)
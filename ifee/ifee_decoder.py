@@ -0,0 +1,225 @@
+import asyncio
+import threading
+from os import cpu_count
+from time import time, monotonic_ns
+from queue import Empty
+from logging import getLogger
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from typing import Union, List, Dict
+from ifee.ifee_common import CSyncObj, CSingleton
+from ifee.ifee_adsb import CDecoderADSB, update_adsb
+from ifee.ifee_frames import CFrameValidator, CFrameDedup, CFrameStats, CLatencyTrace, DEDUP_WINDOW
+
+
+TRAFFIC_AGE = 60
+
+logger = getLogger("[decoder]")
+
+
+def decode_worker(p_conn: Connection, p_icao: Union[str, None]) -> None:
+    decoder = CDecoderADSB(p_icao)
+    while True:
+        try:
+            batch = p_conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if batch is None:
+            break
+
+        results = []
+        stale = decoder.stale
+        for frame in batch:
+            try:
+                result = decoder.decode(*frame)
+            except (ValueError, TypeError, IndexError, ZeroDivisionError):
+                continue
+            if result:
+                results.append(result)
+        p_conn.send((results, decoder.stale - stale))
+
+
+class CDecoderProcess():
+    def __init__(self, p_icao: Union[str, None]) -> None:
+        ctx = get_context('spawn')
+        self.__conn, child = ctx.Pipe()
+        self.__proc = ctx.Process(target=decode_worker, args=(child, p_icao), name='ifee-decoder', daemon=True)
+
+    def __str__(self) -> str:
+        return ','.join([f"pid:{self.__proc.pid}", f"alive:{self.__proc.is_alive()}"])
+
+    def start(self) -> None:
+        self.__proc.start()
+
+    def stop(self, p_timeout: float = 5) -> None:
+        try:
+            self.__conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.__proc.join(p_timeout)
+        if self.__proc.is_alive():
+            self.__proc.terminate()
+        self.__conn.close()
+
+    async def decode(self, p_batch: List[tuple]) -> List[dict]:
+        if not self.__proc.is_alive():
+            raise RuntimeError(f"[decoder] worker exited with code {self.__proc.exitcode}")
+        self.__conn.send(p_batch)
+        results, stale = await asyncio.to_thread(self.__conn.recv)
+        if stale:
+            CFrameStats().add('stale_pair', stale)
+        return results
+
+
+def shard_of(p_msg: str, p_shards: int) -> int:
+    try:
+        return int(p_msg[2:8], 16) % p_shards
+    except ValueError:
+        return 0
+
+
+def filter_icao(p_batch: List[tuple], p_icao: Union[str, None]) -> List[tuple]:
+    if not p_icao:
+        return p_batch
+    icao = p_icao.upper()
+    return [frame for frame in p_batch if frame[0][2:8].upper() == icao]
+
+
+class CDecoderPool():
+    def __init__(self, p_icao: Union[str, None], p_workers: Union[int, None] = None) -> None:
+        self.__workers = max(1, p_workers or cpu_count() or 1)
+        if p_icao and self.__workers > 1:
+            logger.warning("icao %s filter leaves one shard, using 1 decoder worker instead of %d", p_icao, self.__workers)
+            self.__workers = 1
+        self.__procs = [CDecoderProcess(p_icao) for _ in range(self.__workers)]
+
+    def __str__(self) -> str:
+        return ';'.join([str(proc) for proc in self.__procs])
+
+    def __enter__(self) -> 'CDecoderPool':
+        self.start()
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.stop()
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def start(self) -> None:
+        for proc in self.__procs:
+            proc.start()
+
+    def stop(self, p_timeout: float = 5) -> None:
+        for proc in self.__procs:
+            proc.stop(p_timeout)
+
+    async def decode(self, p_batch: List[tuple]) -> List[dict]:
+        if self.__workers == 1:
+            return await self.__procs[0].decode(p_batch)
+
+        shards = [[] for _ in range(self.__workers)]
+        for frame in p_batch:
+            shards[shard_of(frame[0], self.__workers)].append(frame)
+
+        jobs = [self.__procs[i].decode(shard) for i, shard in enumerate(shards) if shard]
+        results = [result for shard in await asyncio.gather(*jobs) for result in shard]
+        results.sort(key=lambda result: result['time'] * 1000000000 if result.get('rx') is None else result['rx'])
+        return results
+
+
+class CTrafficTable(CSingleton):
+    def __init__(self) -> None:
+        if '_CTrafficTable__aircraft' in self.__dict__:
+            return
+        self.__lock = threading.Lock()
+        self.__aircraft = {}
+
+    def __str__(self) -> str:
+        return f"aircraft:{len(self)}"
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__aircraft)
+
+    def update(self, p_result: dict) -> None:
+        with self.__lock:
+            entry = self.__aircraft.setdefault(p_result['icao'], {})
+            entry['time'] = p_result['time']
+            for key in ('velocity', 'altitude', 'position'):
+                if key in p_result:
+                    entry[key] = p_result[key]
+
+    def expire(self, p_age: float = TRAFFIC_AGE) -> int:
+        limit = time() - p_age
+        with self.__lock:
+            stale = [icao for icao, entry in self.__aircraft.items() if entry['time'] < limit]
+            for icao in stale:
+                del self.__aircraft[icao]
+        return len(stale)
+
+    def as_dict(self) -> Dict[str, dict]:
+        with self.__lock:
+            return {icao: dict(entry) for icao, entry in self.__aircraft.items()}
+
+
+def drain_adsb(p_limit: int) -> List[tuple]:
+    status = CSyncObj()
+    batch = []
+    try:
+        while len(batch) < p_limit:
+            msg = status.adsb.msg.get_nowait()
+            batch.append(msg.frame)
+    except Empty:
+        pass
+    return batch
+
+
+async def parse_adsb_process(p_workers: int = 1, p_batch: int = 256, p_delay: float = 0.1,
+                             p_correct: bool = True, p_dedup: float = DEDUP_WINDOW, p_all: bool = False) -> None:
+    status = CSyncObj()
+    logger.debug("started")
+
+    if not status.adsb.icao and not p_all:
+        return None
+
+    validator = CFrameValidator(p_correct)
+    dedup = CFrameDedup(p_dedup) if p_dedup > 0 else None
+    decoder = CDecoderPool(None if p_all else status.adsb.icao, p_workers)
+    decoder.start()
+    trace = CLatencyTrace()
+    traffic = CTrafficTable() if p_all else None
+
+    try:
+        while True:
+            batch = drain_adsb(p_batch)
+            dequeued = monotonic_ns()
+            if not batch:
+                await asyncio.sleep(p_delay)
+                continue
+
+            batch = validator.validate(batch)
+            if dedup:
+                batch = dedup.filter(batch)
+            if not p_all:
+                batch = filter_icao(batch, status.adsb.icao)
+            if not batch:
+                continue
+
+            logger.debug("decode batch of %i ads-b messages", len(batch))
+            results = await decoder.decode(batch)
+            decoded = monotonic_ns()
+            own = (status.adsb.icao or '').upper()
+            for result in results:
+                if traffic:
+                    traffic.update(result)
+                if not traffic or result['icao'].upper() == own:
+                    update_adsb(result)
+                trace.record(result.get('rx'), dequeued, decoded, monotonic_ns())
+            if traffic:
+                traffic.expire()
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        logger.info("stopped")
+    finally:
+        decoder.stop()
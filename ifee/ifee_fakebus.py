@@ -0,0 +1,589 @@
+import json
+import random
+import subprocess
+import sys
+import threading
+from os import environ
+from queue import Queue, Empty
+from time import sleep, monotonic
+from argparse import ArgumentParser
+from logging import getLogger
+from typing import Union, Callable
+import dbus
+import dbus.service
+from dbus.mainloop.glib import DBusGMainLoop
+from ifee.ifee_dbus import DBUS_ADDRESS_ENV, DBUS_INTERFACE_PROPERTIES, MM_DBUS_PATH, MM_DBUS_SERVICE, \
+    MM_DBUS_INTERFACE, MM_DBUS_INTERFACE_MODEM, MM_DBUS_INTERFACE_SIGNAL, NM_DBUS_PATH, NM_DBUS_PATH_SETTINGS, \
+    NM_DBUS_SERVICE, NM_DBUS_SERVICE_SETTINGS, NM_DBUS_SERVICE_CONNECTION, NM_DBUS_CONNECTION_ACTIVE, NM_DBUS_DEVICE, \
+    SYSTEMD_DBUS_PATH, SYSTEMD_DBUS_SERVICE, SYSTEMD_DBUS_INTERFACE, SYSTEMD_DBUS_INTERFACE_UNIT, \
+    CModemStates, CModemPowerStates, CModemTechs
+
+
+FAKE_DBUS_SERVICE = 'org.ifee.FakeBus'
+FAKE_DBUS_PATH = '/org/ifee/FakeBus'
+FAKE_DBUS_INTERFACE = 'org.ifee.FakeBus'
+FAKE_READY = 'ready'
+
+DEFAULT_CONFIG = {
+    'latency': {},
+    'fail': {},
+    'modems': [{'index': 0}],
+    'connections': [{'id': 'lte', 'type': 'gsm'}, {'id': 'vpn', 'type': 'vpn'}],
+    'units': []
+}
+
+logger = getLogger("[fakebus]")
+
+
+class CFakeCore():
+    def __init__(self, p_config: dict) -> None:
+        self.__latency = dict(p_config.get('latency', {}))
+        self.__fail = dict(p_config.get('fail', {}))
+        self.__stats = {}
+        self.speedup = float(p_config.get('speedup', 1))
+
+    def call(self, p_method: str, p_reply: Callable, p_error: Callable, p_func: Union[Callable, None] = None,
+             *p_args) -> None:
+        from gi.repository import GLib
+
+        self.__stats[p_method] = self.__stats.get(p_method, 0) + 1
+
+        def run() -> bool:
+            if self.__fail.get(p_method, 0) > 0:
+                self.__fail[p_method] -= 1
+                p_error(dbus.exceptions.DBusException(f"injected failure in {p_method}",
+                                                      name='org.ifee.FakeBus.Error.Injected'))
+                return False
+            try:
+                ret = p_func(*p_args) if p_func else ()
+            except dbus.exceptions.DBusException as err:
+                p_error(err)
+                return False
+            p_reply(*ret)
+            return False
+
+        delay = self.__latency.get(p_method, self.__latency.get('default', 0))
+        if delay:
+            GLib.timeout_add(int(delay * 1000), run)
+        else:
+            run()
+
+    @property
+    def stats(self) -> dict:
+        return dict(self.__stats)
+
+    def reset(self) -> None:
+        self.__stats = {}
+
+    def latency(self, p_method: str, p_delay: float) -> None:
+        self.__latency[p_method] = p_delay
+
+    def fail(self, p_method: str, p_count: int) -> None:
+        self.__fail[p_method] = p_count
+
+
+class CFakeObject(dbus.service.Object):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_path: str, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, p_path)
+        self.path = p_path
+        self.core = p_core
+        self.props = {}
+
+    def changed(self, p_interface: str, p_props: dict) -> None:
+        self.props.setdefault(p_interface, {}).update(p_props)
+        self.PropertiesChanged(p_interface, p_props, [])
+
+    def __get(self, p_interface: str, p_prop: str) -> tuple:
+        try:
+            return (self.props[str(p_interface)][str(p_prop)],)
+        except KeyError as err:
+            raise dbus.exceptions.DBusException(f"no property {p_interface}.{p_prop}",
+                                                name='org.freedesktop.DBus.Error.UnknownProperty') from err
+
+    @dbus.service.method(DBUS_INTERFACE_PROPERTIES, in_signature='ss', out_signature='v', async_callbacks=('reply', 'error'))
+    def Get(self, p_interface, p_prop, reply, error):
+        self.core.call('Get', reply, error, self.__get, p_interface, p_prop)
+
+    @dbus.service.method(DBUS_INTERFACE_PROPERTIES, in_signature='s', out_signature='a{sv}', async_callbacks=('reply', 'error'))
+    def GetAll(self, p_interface, reply, error):
+        self.core.call('GetAll', reply, error, lambda: (dbus.Dictionary(self.props.get(str(p_interface), {}), signature='sv'),))
+
+    @dbus.service.signal(DBUS_INTERFACE_PROPERTIES, signature='sa{sv}as')
+    def PropertiesChanged(self, p_interface, p_changed, p_invalidated):
+        pass
+
+
+class CFakeModem(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_config: dict, p_core: CFakeCore) -> None:
+        index = int(p_config.get('index', 0))
+        super().__init__(p_bus, f"{MM_DBUS_PATH}/Modem/{index}", p_core)
+        self.props[MM_DBUS_INTERFACE_MODEM] = {
+            'Sim': dbus.ObjectPath(f"{MM_DBUS_PATH}/SIM/{index}"),
+            'Manufacturer': dbus.String(p_config.get('manufacturer', 'ifee')),
+            'Model': dbus.String(p_config.get('model', 'fake')),
+            'Revision': dbus.String('1.0'),
+            'Device': dbus.String(f"/sys/devices/fake/modem{index}"),
+            'PrimaryPort': dbus.String(f"cdc-wdm{index}"),
+            'Ports': dbus.Array([dbus.Struct((f"cdc-wdm{index}", dbus.UInt32(6)), signature='su')], signature='(su)'),
+            'EquipmentIdentifier': dbus.String(p_config.get('imei', f"35000000000000{index}")),
+            'State': dbus.Int32(p_config.get('state', CModemStates.DISABLED.value)),
+            'StateFailedReason': dbus.UInt32(p_config.get('failed', 0)),
+            'SignalQuality': dbus.Struct((dbus.UInt32(p_config.get('signal', 70)), True), signature='ub'),
+            'PowerState': dbus.UInt32(p_config.get('power', CModemPowerStates.LOW.value)),
+            'AccessTechnologies': dbus.UInt32(p_config.get('tech', CModemTechs.LTE.value))
+        }
+        empty = dbus.Dictionary({}, signature='sv')
+        lte = dbus.Dictionary({k: dbus.Double(v) for k, v in p_config.get('lte', {
+            'rssi': -65.0, 'rsrp': -95.0, 'rsrq': -10.0, 'snr': 12.0}).items()}, signature='sv')
+        self.props[MM_DBUS_INTERFACE_SIGNAL] = {
+            'Rate': dbus.UInt32(0), 'Gsm': empty, 'Umts': empty, 'Lte': lte, 'Cdma': empty, 'Evdo': empty
+        }
+
+    def state(self, p_state: CModemStates) -> None:
+        self.changed(MM_DBUS_INTERFACE_MODEM, {'State': dbus.Int32(p_state.value)})
+
+    def __enable(self, p_enable: bool) -> tuple:
+        props = self.props[MM_DBUS_INTERFACE_MODEM]
+        if int(props['State']) == CModemStates.FAILED.value:
+            raise dbus.exceptions.DBusException("modem in failed state", name='org.freedesktop.ModemManager1.Error.Core.WrongState')
+        if p_enable and int(props['PowerState']) != CModemPowerStates.ON.value:
+            raise dbus.exceptions.DBusException("modem powered off", name='org.freedesktop.ModemManager1.Error.Core.WrongState')
+        self.state(CModemStates.REGISTERED if p_enable else CModemStates.DISABLED)
+        return ()
+
+    @dbus.service.method(MM_DBUS_INTERFACE_MODEM, in_signature='b', out_signature='', async_callbacks=('reply', 'error'))
+    def Enable(self, p_enable, reply, error):
+        self.core.call('Enable', reply, error, self.__enable, p_enable)
+
+    @dbus.service.method(MM_DBUS_INTERFACE_MODEM, in_signature='u', out_signature='', async_callbacks=('reply', 'error'))
+    def SetPowerState(self, p_state, reply, error):
+        self.core.call('SetPowerState', reply, error,
+                       lambda: self.changed(MM_DBUS_INTERFACE_MODEM, {'PowerState': dbus.UInt32(p_state)}) or ())
+
+    @dbus.service.method(MM_DBUS_INTERFACE_MODEM, in_signature='', out_signature='', async_callbacks=('reply', 'error'))
+    def Reset(self, reply, error):
+        self.core.call('Reset', reply, error, lambda: self.state(CModemStates.DISABLED) or ())
+
+    def __sample(self, p_rate: int) -> bool:
+        if int(self.props[MM_DBUS_INTERFACE_SIGNAL]['Rate']) != p_rate:
+            return False
+        lte = self.props[MM_DBUS_INTERFACE_SIGNAL]['Lte']
+        lte = dbus.Dictionary({k: dbus.Double(float(v) + random.uniform(-1, 1)) for k, v in lte.items()}, signature='sv')
+        self.changed(MM_DBUS_INTERFACE_SIGNAL, {'Lte': lte})
+        return True
+
+    def __setup(self, p_rate: int) -> tuple:
+        from gi.repository import GLib
+
+        self.changed(MM_DBUS_INTERFACE_SIGNAL, {'Rate': dbus.UInt32(p_rate)})
+        if p_rate:
+            GLib.timeout_add(int(p_rate * 1000 / self.core.speedup), self.__sample, int(p_rate))
+        return ()
+
+    @dbus.service.method(MM_DBUS_INTERFACE_SIGNAL, in_signature='u', out_signature='', async_callbacks=('reply', 'error'))
+    def Setup(self, p_rate, reply, error):
+        self.core.call('Setup', reply, error, self.__setup, p_rate)
+
+
+class CFakeModemManager(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_config: dict, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, MM_DBUS_PATH, p_core)
+        self.modems = [CFakeModem(p_bus, modem, p_core) for modem in p_config.get('modems', [])]
+
+    def __objects(self) -> tuple:
+        return ({dbus.ObjectPath(m.path): {i: dbus.Dictionary(p, signature='sv') for i, p in m.props.items()}
+                 for m in self.modems},)
+
+    @dbus.service.method(MM_DBUS_INTERFACE, in_signature='', out_signature='a{oa{sa{sv}}}', async_callbacks=('reply', 'error'))
+    def GetManagedObjects(self, reply, error):
+        self.core.call('GetManagedObjects', reply, error, self.__objects)
+
+
+class CFakeDevice(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_index: int, p_interface: str, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, f"{NM_DBUS_PATH}/Devices/{p_index}", p_core)
+        self.props[NM_DBUS_DEVICE] = {'Interface': dbus.String(p_interface), 'IpInterface': dbus.String(p_interface)}
+
+
+class CFakeConnection(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_index: int, p_config: dict, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, f"{NM_DBUS_PATH_SETTINGS}/{p_index}", p_core)
+        self.settings = {
+            'connection': {
+                'id': p_config['id'],
+                'uuid': p_config.get('uuid', f"00000000-0000-0000-0000-{p_index:012d}"),
+                'type': p_config.get('type', 'gsm'),
+                'autoconnect': bool(p_config.get('autoconnect', False))
+            }
+        }
+        self.device = None
+        if 'interface' in p_config:
+            self.settings['connection']['interface-name'] = p_config['interface']
+            self.device = CFakeDevice(p_bus, p_index, p_config['interface'], p_core)
+
+    def __update(self, p_settings: dict) -> tuple:
+        for group, values in p_settings.items():
+            self.settings.setdefault(str(group), {}).update({str(k): v for k, v in values.items()})
+        return ()
+
+    @dbus.service.method(NM_DBUS_SERVICE_CONNECTION, in_signature='', out_signature='a{sa{sv}}', async_callbacks=('reply', 'error'))
+    def GetSettings(self, reply, error):
+        self.core.call('GetSettings', reply, error,
+                       lambda: ({k: dbus.Dictionary(v, signature='sv') for k, v in self.settings.items()},))
+
+    @dbus.service.method(NM_DBUS_SERVICE_CONNECTION, in_signature='a{sa{sv}}', out_signature='', async_callbacks=('reply', 'error'))
+    def Update(self, p_settings, reply, error):
+        self.core.call('Update', reply, error, self.__update, p_settings)
+
+
+class CFakeActive(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_index: int, p_conn: CFakeConnection, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, f"{NM_DBUS_PATH}/ActiveConnection/{p_index}", p_core)
+        self.conn = p_conn
+        self.props[NM_DBUS_CONNECTION_ACTIVE] = {
+            'Connection': dbus.ObjectPath(p_conn.path),
+            'Id': dbus.String(p_conn.settings['connection']['id']),
+            'Type': dbus.String(p_conn.settings['connection']['type']),
+            'State': dbus.UInt32(2),
+            'Devices': dbus.Array([dbus.ObjectPath(p_conn.device.path)] if p_conn.device else [], signature='o')
+        }
+
+
+class CFakeSettings(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_config: dict, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, NM_DBUS_PATH_SETTINGS, p_core)
+        self.connections = [CFakeConnection(p_bus, i, conn, p_core) for i, conn in enumerate(p_config.get('connections', []))]
+
+    @dbus.service.method(NM_DBUS_SERVICE_SETTINGS, in_signature='', out_signature='ao', async_callbacks=('reply', 'error'))
+    def ListConnections(self, reply, error):
+        self.core.call('ListConnections', reply, error,
+                       lambda: (dbus.Array([dbus.ObjectPath(conn.path) for conn in self.connections], signature='o'),))
+
+
+class CFakeNetworkManager(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_settings: CFakeSettings, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, NM_DBUS_PATH, p_core)
+        self.__bus = p_bus
+        self.__settings = p_settings
+        self.__active = {}
+        self.__count = 0
+        self.props[NM_DBUS_SERVICE] = {'ActiveConnections': dbus.Array([], signature='o')}
+
+    def __update(self) -> None:
+        paths = dbus.Array([dbus.ObjectPath(a.path) for a in self.__active.values()], signature='o')
+        self.changed(NM_DBUS_SERVICE, {'ActiveConnections': paths})
+
+    def __activate(self, p_conn: str) -> tuple:
+        conn = next((c for c in self.__settings.connections if c.path == str(p_conn)), None)
+        if conn is None:
+            raise dbus.exceptions.DBusException(f"unknown connection {p_conn}",
+                                                name='org.freedesktop.NetworkManager.UnknownConnection')
+        for active in self.__active.values():
+            if active.conn is conn:
+                return (dbus.ObjectPath(active.path),)
+        self.__count += 1
+        active = CFakeActive(self.__bus, self.__count, conn, self.core)
+        self.__active[active.path] = active
+        self.__update()
+        return (dbus.ObjectPath(active.path),)
+
+    def __deactivate(self, p_active: str) -> tuple:
+        active = self.__active.pop(str(p_active), None)
+        if active is None:
+            raise dbus.exceptions.DBusException(f"not active {p_active}",
+                                                name='org.freedesktop.NetworkManager.ConnectionNotActive')
+        active.remove_from_connection()
+        self.__update()
+        return ()
+
+    @dbus.service.method(NM_DBUS_SERVICE, in_signature='ooo', out_signature='o', async_callbacks=('reply', 'error'))
+    def ActivateConnection(self, p_conn, p_device, p_specific, reply, error):
+        self.core.call('ActivateConnection', reply, error, self.__activate, p_conn)
+
+    @dbus.service.method(NM_DBUS_SERVICE, in_signature='o', out_signature='', async_callbacks=('reply', 'error'))
+    def DeactivateConnection(self, p_active, reply, error):
+        self.core.call('DeactivateConnection', reply, error, self.__deactivate, p_active)
+
+
+def unit_path(p_name: str) -> str:
+    escaped = ''.join([c if c.isalnum() else f"_{ord(c):02x}" for c in p_name])
+    return f"{SYSTEMD_DBUS_PATH}/unit/{escaped}"
+
+
+class CFakeUnit(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_config: dict, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, unit_path(p_config['name']), p_core)
+        self.name = p_config['name']
+        self.props[SYSTEMD_DBUS_INTERFACE_UNIT] = {
+            'Id': dbus.String(self.name),
+            'SubState': dbus.String(p_config.get('state', 'dead')),
+            'ActiveState': dbus.String('active' if p_config.get('state') == 'running' else 'inactive'),
+            'UnitFileState': dbus.String(p_config.get('enabled', 'disabled'))
+        }
+
+    def state(self, p_running: bool) -> None:
+        self.changed(SYSTEMD_DBUS_INTERFACE_UNIT, {
+            'SubState': dbus.String('running' if p_running else 'dead'),
+            'ActiveState': dbus.String('active' if p_running else 'inactive')
+        })
+
+
+class CFakeSystemd(CFakeObject):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_config: dict, p_core: CFakeCore) -> None:
+        super().__init__(p_bus, SYSTEMD_DBUS_PATH, p_core)
+        self.__bus = p_bus
+        self.__job = 0
+        self.__job_delay = float(p_config.get('job_delay', 0.05))
+        self.units = {}
+        for unit in p_config.get('units', []):
+            self.units[unit['name']] = CFakeUnit(p_bus, unit, p_core)
+
+    def __unit(self, p_name: str) -> CFakeUnit:
+        name = str(p_name)
+        if name not in self.units:
+            self.units[name] = CFakeUnit(self.__bus, {'name': name}, self.core)
+        return self.units[name]
+
+    def __run_job(self, p_unit: CFakeUnit, p_running: bool) -> dbus.ObjectPath:
+        from gi.repository import GLib
+
+        self.__job += 1
+        job_id = self.__job
+        job = dbus.ObjectPath(f"{SYSTEMD_DBUS_PATH}/job/{job_id}")
+
+        def done() -> bool:
+            p_unit.state(p_running)
+            self.JobRemoved(dbus.UInt32(job_id), job, p_unit.name, 'done')
+            return False
+
+        GLib.timeout_add(int(self.__job_delay * 1000), done)
+        return job
+
+    def __enable(self, p_names: list) -> tuple:
+        changes = []
+        for name in p_names:
+            self.__unit(name).changed(SYSTEMD_DBUS_INTERFACE_UNIT, {'UnitFileState': dbus.String('enabled')})
+            changes.append(('symlink', f"/etc/systemd/system/multi-user.target.wants/{name}", f"/lib/systemd/system/{name}"))
+        return True, dbus.Array(changes, signature='(sss)')
+
+    def __disable(self, p_names: list) -> tuple:
+        changes = []
+        for name in p_names:
+            self.__unit(name).changed(SYSTEMD_DBUS_INTERFACE_UNIT, {'UnitFileState': dbus.String('disabled')})
+            changes.append(('unlink', f"/etc/systemd/system/multi-user.target.wants/{name}", ''))
+        return (dbus.Array(changes, signature='(sss)'),)
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='s', out_signature='o', async_callbacks=('reply', 'error'))
+    def LoadUnit(self, p_name, reply, error):
+        self.core.call('LoadUnit', reply, error, lambda: (dbus.ObjectPath(self.__unit(p_name).path),))
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='s', out_signature='o', async_callbacks=('reply', 'error'))
+    def GetUnit(self, p_name, reply, error):
+        self.core.call('GetUnit', reply, error, lambda: (dbus.ObjectPath(self.__unit(p_name).path),))
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='ss', out_signature='o', async_callbacks=('reply', 'error'))
+    def StartUnit(self, p_name, p_mode, reply, error):
+        self.core.call('StartUnit', reply, error, lambda: (self.__run_job(self.__unit(p_name), True),))
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='ss', out_signature='o', async_callbacks=('reply', 'error'))
+    def StopUnit(self, p_name, p_mode, reply, error):
+        self.core.call('StopUnit', reply, error, lambda: (self.__run_job(self.__unit(p_name), False),))
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='asbb', out_signature='ba(sss)', async_callbacks=('reply', 'error'))
+    def EnableUnitFiles(self, p_names, p_runtime, p_force, reply, error):
+        self.core.call('EnableUnitFiles', reply, error, self.__enable, p_names)
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='asb', out_signature='a(sss)', async_callbacks=('reply', 'error'))
+    def DisableUnitFiles(self, p_names, p_runtime, reply, error):
+        self.core.call('DisableUnitFiles', reply, error, self.__disable, p_names)
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='', out_signature='', async_callbacks=('reply', 'error'))
+    def Reload(self, reply, error):
+        self.core.call('Reload', reply, error)
+
+    @dbus.service.method(SYSTEMD_DBUS_INTERFACE, in_signature='', out_signature='', async_callbacks=('reply', 'error'))
+    def Subscribe(self, reply, error):
+        self.core.call('Subscribe', reply, error)
+
+    @dbus.service.signal(SYSTEMD_DBUS_INTERFACE, signature='uoss')
+    def JobRemoved(self, p_id, p_job, p_unit, p_result):
+        pass
+
+
+class CFakeControl(dbus.service.Object):
+    def __init__(self, p_bus: dbus.bus.BusConnection, p_core: CFakeCore, p_manager: CFakeModemManager) -> None:
+        super().__init__(p_bus, FAKE_DBUS_PATH)
+        self.__core = p_core
+        self.__manager = p_manager
+
+    @dbus.service.method(FAKE_DBUS_INTERFACE, in_signature='', out_signature='a{su}')
+    def GetStats(self):
+        return dbus.Dictionary(self.__core.stats, signature='su')
+
+    @dbus.service.method(FAKE_DBUS_INTERFACE, in_signature='', out_signature='')
+    def ResetStats(self):
+        self.__core.reset()
+
+    @dbus.service.method(FAKE_DBUS_INTERFACE, in_signature='sd', out_signature='')
+    def SetLatency(self, p_method, p_delay):
+        self.__core.latency(str(p_method), float(p_delay))
+
+    @dbus.service.method(FAKE_DBUS_INTERFACE, in_signature='si', out_signature='')
+    def SetFailure(self, p_method, p_count):
+        self.__core.fail(str(p_method), int(p_count))
+
+    @dbus.service.method(FAKE_DBUS_INTERFACE, in_signature='usv', out_signature='')
+    def SetModemProperty(self, p_index, p_prop, p_value):
+        for modem in self.__manager.modems:
+            if modem.path.endswith(f"/{int(p_index)}"):
+                modem.changed(MM_DBUS_INTERFACE_MODEM, {str(p_prop): p_value})
+
+
+def serve(p_address: str, p_config: dict) -> None:
+    from gi.repository import GLib
+
+    DBusGMainLoop(set_as_default=True)
+    bus = dbus.bus.BusConnection(p_address)
+    core = CFakeCore(p_config)
+
+    names = [dbus.service.BusName(name, bus) for name in (MM_DBUS_SERVICE, NM_DBUS_SERVICE, SYSTEMD_DBUS_SERVICE, FAKE_DBUS_SERVICE)]
+    manager = CFakeModemManager(bus, p_config, core)
+    settings = CFakeSettings(bus, p_config, core)
+    network = CFakeNetworkManager(bus, settings, core)
+    systemd = CFakeSystemd(bus, p_config, core)
+    control = CFakeControl(bus, core, manager)
+
+    print(FAKE_READY, flush=True)
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+    del names, network, systemd, control
+
+
+def read_lines(p_proc: subprocess.Popen) -> Queue:
+    lines = Queue()
+
+    def pump() -> None:
+        for line in p_proc.stdout:
+            lines.put(line.strip())
+        lines.put(None)
+
+    threading.Thread(target=pump, name='ifee-fakebus-pipe', daemon=True).start()
+    return lines
+
+
+def read_line(p_lines: Queue, p_deadline: float) -> Union[str, None]:
+    try:
+        return p_lines.get(timeout=max(p_deadline - monotonic(), 0))
+    except Empty:
+        return None
+
+
+class CFakeBus():
+    def __init__(self, p_config: Union[dict, None] = None) -> None:
+        self.__config = dict(DEFAULT_CONFIG, **(p_config or {}))
+        self.__daemon = None
+        self.__service = None
+        self.__address = None
+        self.__environ = None
+        self.__bus = None
+
+    def __enter__(self) -> 'CFakeBus':
+        self.start()
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.stop()
+
+    @property
+    def address(self) -> Union[str, None]:
+        return self.__address
+
+    def start(self, p_timeout: float = 10) -> None:
+        deadline = monotonic() + p_timeout
+        try:
+            self.__daemon = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--print-address=1'],
+                                             stdout=subprocess.PIPE, text=True)
+        except OSError as err:
+            raise RuntimeError(f"[fakebus] dbus-daemon: {str(err)}") from err
+        self.__address = read_line(read_lines(self.__daemon), deadline)
+        if not self.__address:
+            self.stop()
+            raise RuntimeError("[fakebus] dbus-daemon did not report an address")
+
+        self.__service = subprocess.Popen([sys.executable, '-m', 'ifee.ifee_fakebus', '--address', self.__address,
+                                           '--config', json.dumps(self.__config)], stdout=subprocess.PIPE, text=True)
+        lines = read_lines(self.__service)
+        while True:
+            line = read_line(lines, deadline)
+            if line == FAKE_READY:
+                break
+            if line is None:
+                self.stop()
+                raise RuntimeError("[fakebus] fake services did not start")
+
+        self.__environ = environ.get(DBUS_ADDRESS_ENV)
+        environ[DBUS_ADDRESS_ENV] = self.__address
+        logger.debug("started on %s", self.__address)
+
+    def stop(self) -> None:
+        for proc in (self.__service, self.__daemon):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        self.__service = self.__daemon = None
+        if self.__address and environ.get(DBUS_ADDRESS_ENV) == self.__address:
+            if self.__environ is None:
+                environ.pop(DBUS_ADDRESS_ENV, None)
+            else:
+                environ[DBUS_ADDRESS_ENV] = self.__environ
+        self.__bus = None
+
+    def __control(self) -> dbus.Interface:
+        if self.__bus is None:
+            self.__bus = dbus.bus.BusConnection(self.__address)
+        return dbus.Interface(self.__bus.get_object(FAKE_DBUS_SERVICE, FAKE_DBUS_PATH), FAKE_DBUS_INTERFACE)
+
+    @property
+    def stats(self) -> dict:
+        return {str(k): int(v) for k, v in self.__control().GetStats().items()}
+
+    def reset(self) -> None:
+        self.__control().ResetStats()
+
+    def latency(self, p_method: str, p_delay: float) -> None:
+        self.__control().SetLatency(p_method, float(p_delay))
+
+    def fail(self, p_method: str, p_count: int = 1) -> None:
+        self.__control().SetFailure(p_method, int(p_count))
+
+    def modem(self, p_index: int, p_prop: str, p_value) -> None:
+        self.__control().SetModemProperty(dbus.UInt32(p_index), p_prop, p_value)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m ifee.ifee_fakebus')
+    parser.add_argument('--address', help='bus address, a private session bus is started when omitted')
+    parser.add_argument('--config', default='{}', help='json config or path to json file')
+    args = parser.parse_args()
+
+    if args.config.lstrip().startswith('{'):
+        config = json.loads(args.config)
+    else:
+        with open(args.config, 'r', encoding='UTF8') as file:
+            config = json.loads(file.read())
+
+    if args.address:
+        serve(args.address, dict(DEFAULT_CONFIG, **config))
+    else:
+        with CFakeBus(config) as fake:
+            print(f"{DBUS_ADDRESS_ENV}={fake.address}", flush=True)
+            try:
+                while True:
+                    sleep(3600)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,269 @@
+import asyncio
+import gzip
+import json
+import threading
+from os import makedirs as m_mkdir, path as m_path, replace as m_replace, fsync as m_fsync, remove as m_remove, \
+    listdir as m_listdir
+from time import time, monotonic
+from logging import getLogger
+from typing import Union, List
+from ifee.ifee_common import CSyncObj, COULD_NOT_GET, COULD_NOT_SET
+from ifee.ifee_ground import CGroundClient
+
+
+FORWARD_PATH = 'api/box/telemetry'
+FORWARD_SEGMENT = 262144
+FORWARD_AGE = 300
+FORWARD_BATCH = 500
+FORWARD_MAX = 64 * 1024 * 1024
+FORWARD_SAMPLE = 5
+FORWARD_FLUSH = 60
+SEGMENT_OPEN = '.jsonl'
+SEGMENT_SEALED = '.jsonl.gz'
+OFFSET_FILE = 'offset.json'
+
+logger = getLogger("[forward]")
+
+
+class CForwardQueue():
+    def __init__(self, p_dir: str, p_segment: int = FORWARD_SEGMENT, p_age: float = FORWARD_AGE,
+                 p_max: int = FORWARD_MAX) -> None:
+        self.__dir = p_dir
+        self.__segment = p_segment
+        self.__age = p_age
+        self.__max = p_max
+        self.__lock = threading.RLock()
+        self.__file = None
+        self.__current = None
+        self.__opened = 0.0
+
+        try:
+            m_mkdir(p_dir, mode=493, exist_ok=True)
+        except OSError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='forward', unit='queue', aux=p_dir)) from err
+
+        self.__offset = self.__load_offset()
+        for num in self.__segments(SEGMENT_OPEN):
+            self.__seal(num)
+
+    def __str__(self) -> str:
+        return ','.join([f"segments:{len(self.sealed)}", f"offset:{self.__offset['segment']}/{self.__offset['record']}"])
+
+    def __enter__(self) -> 'CForwardQueue':
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.close()
+
+    def __name(self, p_num: int, p_ext: str) -> str:
+        return m_path.join(self.__dir, f"{p_num:012d}{p_ext}")
+
+    def __segments(self, p_ext: str) -> List[int]:
+        ret = []
+        for name in m_listdir(self.__dir):
+            if name.endswith(p_ext) and name[:-len(p_ext)].isdigit():
+                ret.append(int(name[:-len(p_ext)]))
+        return sorted(ret)
+
+    def __load_offset(self) -> dict:
+        try:
+            with open(m_path.join(self.__dir, OFFSET_FILE), 'r', encoding='UTF8') as file:
+                offset = json.loads(file.read())
+            return {'segment': int(offset['segment']), 'record': int(offset['record'])}
+        except FileNotFoundError:
+            return {'segment': 0, 'record': 0}
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            logger.error("ignore offset: %s", str(err))
+            return {'segment': 0, 'record': 0}
+
+    def __save_offset(self) -> None:
+        path = m_path.join(self.__dir, OFFSET_FILE)
+        try:
+            with open(path + '.tmp', 'w', encoding='UTF8') as file:
+                file.write(json.dumps(self.__offset))
+                file.flush()
+                m_fsync(file.fileno())
+            m_replace(path + '.tmp', path)
+        except OSError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='forward', unit='offset', aux=path)) from err
+
+    def __seal(self, p_num: int) -> None:
+        raw = self.__name(p_num, SEGMENT_OPEN)
+        sealed = self.__name(p_num, SEGMENT_SEALED)
+        try:
+            with open(raw, 'rb') as src, gzip.open(sealed + '.tmp', 'wb', compresslevel=6) as dst:
+                dst.write(src.read())
+            with open(sealed + '.tmp', 'rb') as file:
+                m_fsync(file.fileno())
+            m_replace(sealed + '.tmp', sealed)
+            m_remove(raw)
+        except OSError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='forward', unit='segment', aux=sealed)) from err
+        self.__trim()
+
+    def __trim(self) -> None:
+        sealed = [(num, m_path.getsize(self.__name(num, SEGMENT_SEALED))) for num in self.__segments(SEGMENT_SEALED)]
+        total = sum(size for _, size in sealed)
+        while sealed and total > self.__max:
+            num, size = sealed.pop(0)
+            self.__remove(num)
+            total -= size
+            logger.warning("queue over %d bytes, dropped segment %d", self.__max, num)
+
+    def __rotate(self) -> None:
+        if self.__file is not None:
+            self.__file.flush()
+            m_fsync(self.__file.fileno())
+            self.__file.close()
+            self.__file = None
+            self.__seal(self.__current)
+        self.__current = None
+
+    def append(self, p_record: dict) -> None:
+        line = (json.dumps(p_record, separators=(',', ':')) + '\n').encode()
+        with self.__lock:
+            try:
+                if self.__file is None:
+                    known = self.__segments(SEGMENT_SEALED) + self.__segments(SEGMENT_OPEN)
+                    self.__current = max(known + [self.__offset['segment'] - 1]) + 1
+                    self.__file = open(self.__name(self.__current, SEGMENT_OPEN), 'ab')
+                    self.__opened = monotonic()
+                self.__file.write(line)
+                self.__file.flush()
+                if self.__file.tell() >= self.__segment or monotonic() - self.__opened >= self.__age:
+                    self.__rotate()
+            except OSError as err:
+                raise RuntimeError(COULD_NOT_SET.format(module='forward', unit='record', aux=self.__dir)) from err
+
+    def event(self, p_kind: str, p_data: Union[dict, None] = None) -> None:
+        self.append({'type': 'event', 'time': time(), 'kind': p_kind, 'data': p_data or {}})
+
+    def flush(self, p_age: float = 0) -> None:
+        with self.__lock:
+            if self.__file is not None and monotonic() - self.__opened >= p_age:
+                self.__rotate()
+
+    def close(self) -> None:
+        self.flush()
+
+    @property
+    def sealed(self) -> List[int]:
+        return self.__segments(SEGMENT_SEALED)
+
+    @property
+    def offset(self) -> dict:
+        return dict(self.__offset)
+
+    def read(self, p_num: int) -> List[dict]:
+        path = self.__name(p_num, SEGMENT_SEALED)
+        try:
+            with gzip.open(path, 'rb') as file:
+                lines = file.read().splitlines()
+        except (OSError, EOFError) as err:
+            raise RuntimeError(COULD_NOT_GET.format(module='forward', unit='segment', aux=path)) from err
+        ret = []
+        for line in lines:
+            try:
+                ret.append(json.loads(line))
+            except ValueError:
+                logger.error("skip corrupt record in segment %d", p_num)
+        return ret
+
+    def __remove(self, p_num: int) -> None:
+        try:
+            m_remove(self.__name(p_num, SEGMENT_SEALED))
+        except FileNotFoundError:
+            pass
+
+    def pending(self, p_batch: int = FORWARD_BATCH) -> Union[tuple, None]:
+        with self.__lock:
+            for num in self.sealed:
+                if num < self.__offset['segment']:
+                    self.__remove(num)
+                    continue
+                start = self.__offset['record'] if num == self.__offset['segment'] else 0
+                try:
+                    records = self.read(num)
+                except RuntimeError as err:
+                    logger.error("%s, dropped", str(err))
+                    self.__remove(num)
+                    continue
+                if start >= len(records):
+                    self.commit(num, len(records), True)
+                    continue
+                return num, start, records[start:start + p_batch], start + p_batch >= len(records)
+            return None
+
+    def commit(self, p_num: int, p_record: int, p_done: bool) -> None:
+        with self.__lock:
+            if p_done:
+                self.__offset = {'segment': p_num + 1, 'record': 0}
+                self.__save_offset()
+                self.__remove(p_num)
+            else:
+                self.__offset = {'segment': p_num, 'record': p_record}
+                self.__save_offset()
+
+
+def upload(p_queue: CForwardQueue, p_client: CGroundClient, p_box_id: str, p_path: str = FORWARD_PATH,
+           p_batch: int = FORWARD_BATCH) -> int:
+    sent = 0
+    while True:
+        pending = p_queue.pending(p_batch)
+        if pending is None:
+            return sent
+        num, start, records, done = pending
+        body = gzip.compress(json.dumps({'box': p_box_id, 'segment': num, 'offset': start, 'records': records},
+                                        separators=(',', ':')).encode())
+        res = p_client.request('POST', p_path, data=body, headers={'Content-Encoding': 'gzip'})
+        if res is None or not res.ok:
+            logger.error("upload segment %d at %d failed: %s", num, start, res.status_code if res is not None else 'no token')
+            return sent
+        p_queue.commit(num, start + len(records), done)
+        sent += len(records)
+
+
+def link_up() -> bool:
+    from ifee.ifee_health import CModemHealth
+    from ifee.ifee_uplink import CUplink
+
+    return CModemHealth().up or CUplink().route is not None
+
+
+async def forward_telemetry(p_dir: str, p_client: CGroundClient, p_box_id: str, p_path: str = FORWARD_PATH,
+                            p_sample: float = FORWARD_SAMPLE, p_batch: int = FORWARD_BATCH) -> None:
+    logger.debug("started")
+    status = CSyncObj()
+    queue = await asyncio.to_thread(CForwardQueue, p_dir)
+    last = None
+    state = {}
+    try:
+        while True:
+            up = link_up()
+            try:
+                current = {'active': status.adsb.active, 'icao': status.adsb.icao, 'link': up}
+                for kind, value in current.items():
+                    if kind in state and state[kind] != value:
+                        await asyncio.to_thread(queue.event, kind, {'from': state[kind], 'to': value})
+                state = current
+
+                sample = {'active': status.adsb.active, 'monitoring': status.monitoring.as_dict()}
+                if sample != last:
+                    last = sample
+                    await asyncio.to_thread(queue.append, dict(sample, type='telemetry', time=time(), icao=status.adsb.icao))
+            except RuntimeError as err:
+                logger.error("%s", str(err))
+
+            if up:
+                try:
+                    await asyncio.to_thread(queue.flush, FORWARD_FLUSH)
+                    sent = await asyncio.to_thread(upload, queue, p_client, p_box_id, p_path, p_batch)
+                    if sent:
+                        logger.info("uploaded %d records", sent)
+                except (RuntimeError, OSError) as err:
+                    logger.error("%s", str(err))
+
+            await asyncio.sleep(p_sample)
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        queue.close()
+        logger.info("stopped")
@@ -0,0 +1,237 @@
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from time import monotonic
+from typing import Union, List, Tuple, Dict
+from ifee.ifee_common import CSingleton
+
+
+CRC_GENERATOR = 0xFFF409
+CRC_MASK = 0xFFFFFF
+FRAME_BITS = 112
+FRAME_HEX = FRAME_BITS // 4
+DF_BITS = 5
+DEDUP_WINDOW = 1.0
+DEDUP_SIZE = 65536
+TRACE_STAGES = ('queue', 'decode', 'update', 'total')
+TRACE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def crc_table() -> Tuple[int, ...]:
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc = (crc << 1) ^ CRC_GENERATOR if crc & 0x800000 else crc << 1
+        table.append(crc & CRC_MASK)
+    return tuple(table)
+
+
+CRC_TABLE = crc_table()
+
+
+@lru_cache(maxsize=1)
+def crc_table16() -> Tuple[int, ...]:
+    table = CRC_TABLE
+    ret = []
+    for word in range(65536):
+        crc = table[word >> 8]
+        ret.append(((crc << 8) & CRC_MASK) ^ table[(crc >> 16) ^ (word & 0xFF)])
+    return tuple(ret)
+
+
+def crc24(p_data: bytes) -> int:
+    crc = 0
+    table = CRC_TABLE
+    for byte in p_data:
+        crc = ((crc << 8) & CRC_MASK) ^ table[(crc >> 16) ^ byte]
+    return crc
+
+
+def syndrome(p_frame: int) -> int:
+    table = CRC_TABLE
+    table16 = crc_table16()
+    data = p_frame >> 24
+    crc = table[data >> 80]
+    for shift in (64, 48, 32, 16, 0):
+        crc = ((crc << 16) & CRC_MASK) ^ table16[((crc >> 8) ^ (data >> shift)) & 0xFFFF]
+    return crc ^ (p_frame & CRC_MASK)
+
+
+def syndrome_table() -> Dict[int, int]:
+    return {syndrome(1 << (FRAME_BITS - 1 - bit)): bit for bit in range(DF_BITS, FRAME_BITS)}
+
+
+class CFrameStats(CSingleton):
+    def __init__(self) -> None:
+        if '_CFrameStats__counters' in self.__dict__:
+            return
+        self.__lock = threading.Lock()
+        self.__counters = {}
+
+    def add(self, p_key: str, p_val: int = 1) -> None:
+        with self.__lock:
+            self.__counters[p_key] = self.__counters.get(p_key, 0) + p_val
+
+    def as_dict(self) -> Dict[str, int]:
+        with self.__lock:
+            return dict(self.__counters)
+
+    def __str__(self) -> str:
+        return ','.join([f"{k}:{v}" for k, v in self.as_dict().items()])
+
+
+class CLatencyTrace(CSingleton):
+    def __init__(self) -> None:
+        if '_CLatencyTrace__stages' in self.__dict__:
+            return
+        self.__lock = threading.Lock()
+        self.__bounds = tuple(int(bound * 1e9) for bound in TRACE_BUCKETS)
+        self.__stages = {stage: [[0] * (len(TRACE_BUCKETS) + 1), 0, 0] for stage in TRACE_STAGES}
+
+    def __add(self, p_stage: str, p_ns: int) -> None:
+        hist = self.__stages[p_stage]
+        hist[0][bisect_left(self.__bounds, p_ns)] += 1
+        hist[1] += p_ns
+        hist[2] += 1
+
+    def record(self, p_rx: Union[int, None], p_dequeued: int, p_decoded: int, p_updated: int) -> None:
+        if p_rx is None:
+            return
+        with self.__lock:
+            self.__add('queue', p_dequeued - p_rx)
+            self.__add('decode', p_decoded - p_dequeued)
+            self.__add('update', p_updated - p_decoded)
+            self.__add('total', p_updated - p_rx)
+
+    def as_dict(self) -> Dict[str, dict]:
+        ret = {}
+        with self.__lock:
+            for stage, (counts, total, count) in self.__stages.items():
+                buckets, acc = {}, 0
+                for bound, val in zip(TRACE_BUCKETS + (float('inf'),), counts):
+                    acc += val
+                    buckets[bound] = acc
+                ret[stage] = {'buckets': buckets, 'sum': total / 1e9, 'count': count}
+        return ret
+
+
+class CFrameValidator():
+    def __init__(self, p_correct: bool = True) -> None:
+        self.__correct = p_correct
+        self.__syndromes = syndrome_table() if p_correct else {}
+        crc_table16()
+        self.__stats = CFrameStats()
+
+    @property
+    def correct(self) -> bool:
+        return self.__correct
+
+    def __check(self, p_msg: str) -> Tuple[Union[str, None], str]:
+        if len(p_msg) != FRAME_HEX:
+            return None, 'skipped'
+        try:
+            frame = int(p_msg, 16)
+        except (ValueError, TypeError):
+            return None, 'malformed'
+
+        if (frame >> (FRAME_BITS - DF_BITS)) not in (17, 18):
+            return None, 'skipped'
+
+        residual = syndrome(frame)
+        if residual == 0:
+            return p_msg, 'valid'
+
+        bit = self.__syndromes.get(residual)
+        if bit is None:
+            return None, 'dropped'
+
+        return f"{frame ^ (1 << (FRAME_BITS - 1 - bit)):0{FRAME_HEX}X}", 'corrected'
+
+    def check(self, p_msg: str) -> Union[str, None]:
+        msg, result = self.__check(p_msg)
+        self.__stats.add(result)
+        return msg
+
+    def validate(self, p_batch: List[tuple]) -> List[tuple]:
+        ret = []
+        counters = {}
+        check = self.__check
+        for frame in p_batch:
+            fixed, result = check(frame[0])
+            counters[result] = counters.get(result, 0) + 1
+            if fixed is not None:
+                ret.append((fixed,) + frame[1:])
+        for key, val in counters.items():
+            self.__stats.add(key, val)
+        return ret
+
+
+class CFrameDedup():
+    def __init__(self, p_window: float = DEDUP_WINDOW, p_size: int = DEDUP_SIZE) -> None:
+        self.__window = p_window
+        self.__size = p_size
+        self.__seen = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evicted = 0
+        self.__stats = CFrameStats()
+
+    def __str__(self) -> str:
+        return ','.join([f"size:{len(self.__seen)}", f"hits:{self.__hits}", f"misses:{self.__misses}", f"evicted:{self.__evicted}"])
+
+    def __len__(self) -> int:
+        return len(self.__seen)
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.__hits + self.__misses
+        return self.__hits / total if total else 0.0
+
+    def __expire(self, p_now: float) -> None:
+        seen = self.__seen
+        while seen and next(iter(seen.values())) <= p_now:
+            seen.popitem(last=False)
+
+    def __check(self, p_key: str, p_now: float) -> bool:
+        seen = self.__seen
+        if p_key in seen:
+            self.__hits += 1
+            return True
+        if len(seen) >= self.__size:
+            seen.popitem(last=False)
+            self.__evicted += 1
+        seen[p_key] = p_now + self.__window
+        self.__misses += 1
+        return False
+
+    def seen(self, p_msg: str, p_rx: Union[int, None] = None) -> bool:
+        now = monotonic() if p_rx is None else p_rx / 1e9
+        self.__expire(now)
+        duplicate = self.__check(p_msg.upper(), now)
+        self.__stats.add('duplicate' if duplicate else 'unique')
+        return duplicate
+
+    def filter(self, p_batch: List[tuple]) -> List[tuple]:
+        now = monotonic()
+        hits = self.__hits
+        expire = self.__expire
+        check = self.__check
+        ret = []
+        for frame in p_batch:
+            stamp = now if len(frame) < 3 or frame[2] is None else frame[2] / 1e9
+            expire(stamp)
+            if not check(frame[0].upper(), stamp):
+                ret.append(frame)
+        self.__stats.add('duplicate', self.__hits - hits)
+        self.__stats.add('unique', len(ret))
+        return ret
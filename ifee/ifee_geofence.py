@@ -0,0 +1,201 @@
+import json
+import math
+from time import monotonic
+from logging import getLogger
+from typing import Union, List, Tuple
+from ifee.ifee_common import CSingleton, COULD_NOT_GET
+from ifee.ifee_track import CTrackFilter
+
+
+GRID_CELL = 0.25
+EARTH_RADIUS = 6371000
+SPEED_OFF = 160
+SPEED_ON = 80
+ALT_OFF = 2000
+ALT_ON = 1000
+GATE_HOLD = 30
+GATE_LEAD = 10
+
+logger = getLogger("[geofence]")
+
+
+def distance(p_lat1: float, p_lon1: float, p_lat2: float, p_lon2: float) -> float:
+    lat1, lat2 = math.radians(p_lat1), math.radians(p_lat2)
+    dlat = lat2 - lat1
+    dlon = math.radians(p_lon2 - p_lon1)
+    val = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(val)))
+
+
+def load_zones(p_path: str) -> List[dict]:
+    try:
+        with open(p_path, 'r', encoding='UTF8') as file:
+            data = json.loads(file.read())
+        zones = data['zones'] if isinstance(data, dict) else data
+        return [{'name': str(zone['name']), 'lat': float(zone['lat']), 'lon': float(zone['lon']),
+                 'radius': float(zone.get('radius', 5000)), 'elevation': float(zone.get('elevation', 0))}
+                for zone in zones]
+    except (OSError, json.decoder.JSONDecodeError, KeyError, TypeError, ValueError) as err:
+        raise RuntimeError(COULD_NOT_GET.format(module='geofence', unit='zones', aux=p_path)) from err
+
+
+class CGeoIndex():
+    def __init__(self, p_zones: List[dict], p_cell: float = GRID_CELL) -> None:
+        self.__zones = list(p_zones)
+        self.__cell = p_cell
+        self.__grid = {}
+
+        for num, zone in enumerate(self.__zones):
+            dlat = math.degrees(zone['radius'] / EARTH_RADIUS)
+            dlon = dlat / max(math.cos(math.radians(zone['lat'])), 0.01)
+            for i in range(self.__key(zone['lat'] - dlat), self.__key(zone['lat'] + dlat) + 1):
+                for j in range(self.__key(zone['lon'] - dlon), self.__key(zone['lon'] + dlon) + 1):
+                    self.__grid.setdefault((i, j), []).append(num)
+
+    def __str__(self) -> str:
+        return ','.join([f"zones:{len(self.__zones)}", f"cells:{len(self.__grid)}"])
+
+    def __len__(self) -> int:
+        return len(self.__zones)
+
+    def __key(self, p_deg: float) -> int:
+        return math.floor(p_deg / self.__cell)
+
+    def lookup(self, p_lat: float, p_lon: float) -> Union[dict, None]:
+        for num in self.__grid.get((self.__key(p_lat), self.__key(p_lon)), ()):
+            zone = self.__zones[num]
+            if distance(p_lat, p_lon, zone['lat'], zone['lon']) <= zone['radius']:
+                return zone
+        return None
+
+
+class CLteGate(CSingleton):
+    def __init__(self) -> None:
+        if '_CLteGate__index' in self.__dict__:
+            return
+        self.__index = None
+        self.__speed = (SPEED_OFF, SPEED_ON)
+        self.__alt = (ALT_OFF, ALT_ON)
+        self.__hold = GATE_HOLD
+        self.__lead = GATE_LEAD
+        self.__vel_track = CTrackFilter()
+        self.__alt_track = CTrackFilter(p_gate=2000)
+        self.__vel = None
+        self.__altitude = None
+        self.__zone = None
+        self.__fixed = False
+        self.__since = None
+        self.__reason = 'init'
+        self.__transitions = 0
+
+    def setup(self, p_index: Union[CGeoIndex, None] = None, p_speed: Tuple[float, float] = (SPEED_OFF, SPEED_ON),
+              p_alt: Tuple[float, float] = (ALT_OFF, ALT_ON), p_hold: float = GATE_HOLD,
+              p_lead: float = GATE_LEAD) -> None:
+        self.__index = p_index
+        self.__speed = p_speed
+        self.__alt = p_alt
+        self.__hold = p_hold
+        self.__lead = p_lead
+        self.__vel_track.reset()
+        self.__alt_track.reset()
+        self.__since = None
+
+    def reset(self) -> None:
+        self.__vel_track.reset()
+        self.__alt_track.reset()
+        self.__vel = None
+        self.__altitude = None
+        self.__zone = None
+        self.__fixed = False
+        self.__since = None
+        self.__reason = 'init'
+
+    @property
+    def reason(self) -> str:
+        return self.__reason
+
+    @property
+    def transitions(self) -> int:
+        return self.__transitions
+
+    @property
+    def zone(self) -> Union[str, None]:
+        return self.__zone['name'] if self.__zone else None
+
+    def __blocked(self) -> Union[str, None]:
+        if self.__vel is not None and self.__vel >= self.__speed[0]:
+            return f"speed {self.__vel}kt >= {self.__speed[0]}kt"
+        if self.__index is not None and self.__fixed and self.__zone is None:
+            return "outside permitted zones"
+        if self.__zone is not None and self.__altitude is not None \
+                and self.__altitude - self.__zone['elevation'] >= self.__alt[0]:
+            return f"height {int(self.__altitude - self.__zone['elevation'])}ft >= {self.__alt[0]}ft"
+        if self.__lead > 0:
+            lead = self.__vel_track.crossing(self.__speed[0])
+            if lead is not None and lead <= self.__lead:
+                return f"speed {self.__vel}kt predicted >= {self.__speed[0]}kt in {lead:.1f}s"
+            if self.__zone is not None:
+                lead = self.__alt_track.crossing(self.__zone['elevation'] + self.__alt[0])
+                if lead is not None and lead <= self.__lead:
+                    return f"height {int(self.__altitude - self.__zone['elevation'])}ft predicted >= {self.__alt[0]}ft in {lead:.1f}s"
+        return None
+
+    def __permitted(self) -> Union[str, None]:
+        if self.__vel is None or self.__vel >= self.__speed[1]:
+            return None
+        if self.__index is not None:
+            if self.__zone is None:
+                return None
+            if self.__altitude is not None and self.__altitude - self.__zone['elevation'] >= self.__alt[1]:
+                return None
+            return f"speed {self.__vel}kt < {self.__speed[1]}kt in {self.__zone['name']}"
+        return f"speed {self.__vel}kt < {self.__speed[1]}kt"
+
+    def update(self, p_active: bool, p_time: Union[float, None] = None, p_velocity: Union[int, None] = None,
+               p_altitude: Union[int, None] = None, p_position: Union[Tuple[float, float], None] = None) -> bool:
+        now = monotonic() if p_time is None else p_time
+        if p_velocity is not None and self.__vel_track.add(now, p_velocity):
+            self.__vel = round(self.__vel_track.value)
+        if p_altitude is not None and self.__alt_track.add(now, p_altitude):
+            self.__altitude = round(self.__alt_track.value)
+        if p_position is not None and self.__index is not None:
+            self.__fixed = True
+            self.__zone = self.__index.lookup(p_position[0], p_position[1])
+
+        if p_active:
+            reason = self.__blocked()
+            self.__since = None
+            if reason is None:
+                return True
+        else:
+            reason = self.__permitted()
+            if reason is None:
+                self.__since = None
+                return False
+            if self.__since is None:
+                self.__since = now
+            if now - self.__since < self.__hold:
+                return False
+            self.__since = None
+
+        self.__reason = reason
+        self.__transitions += 1
+        return not p_active
+
+    def as_dict(self) -> dict:
+        return {'zone': self.zone, 'reason': self.__reason, 'transitions': self.__transitions,
+                'velocity': self.__vel, 'altitude': self.__altitude, 'acceleration': round(self.__vel_track.rate, 3),
+                'climb': round(self.__alt_track.rate, 3),
+                'rejected': self.__vel_track.rejected + self.__alt_track.rejected}
+
+
+def build_gate(p_zones: Union[str, None] = None, p_speed: Tuple[float, float] = (SPEED_OFF, SPEED_ON),
+               p_alt: Tuple[float, float] = (ALT_OFF, ALT_ON), p_hold: float = GATE_HOLD,
+               p_lead: float = GATE_LEAD) -> CLteGate:
+    index = None
+    if p_zones:
+        index = CGeoIndex(load_zones(p_zones))
+        logger.info("index %s", str(index))
+    gate = CLteGate()
+    gate.setup(index, p_speed, p_alt, p_hold, p_lead)
+    return gate
@@ -0,0 +1,281 @@
+import asyncio
+import base64
+import json
+import socket
+import threading
+from time import time
+from logging import getLogger
+from typing import Union, List, Dict
+import requests
+from requests.adapters import HTTPAdapter
+from ifee.ifee_common import CCacheICAO
+
+
+TOKEN_TTL = 300
+TOKEN_MARGIN = 30
+ICAO_TTL = 86400
+
+
+def token_expire(p_token: str) -> float:
+    try:
+        payload = p_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time() + TOKEN_TTL
+
+
+class CBoundAdapter(HTTPAdapter):
+    def __init__(self, p_interface: Union[str, None] = None, **p_kwargs) -> None:
+        self.interface = p_interface
+        super().__init__(**p_kwargs)
+
+    def init_poolmanager(self, *p_args, **p_kwargs) -> None:
+        if self.interface:
+            options = list(p_kwargs.get('socket_options') or [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)])
+            options.append((socket.SOL_SOCKET, socket.SO_BINDTODEVICE, self.interface.encode()))
+            p_kwargs['socket_options'] = options
+        super().init_poolmanager(*p_args, **p_kwargs)
+
+
+class CGroundClient():
+    def __init__(self, p_url: str, p_user: str, p_pass: str, p_pool: int = 8, p_timeout: int = 10) -> None:
+        self.__url = p_url.rstrip('/')
+        self.__user = p_user
+        self.__pass = p_pass
+        self.__timeout = p_timeout
+        self.__pool = p_pool
+        self.__interface = None
+        self.__token = None
+        self.__expire = 0.0
+        self.__lock = threading.Lock()
+        self.__flight_lock = threading.Lock()
+        self.__flight = 0
+        self.__retired = []
+        self.__log = getLogger("[ground]")
+
+        self.__session = requests.Session()
+        self.__mount()
+        self.__session.headers.update({'Content-Type': 'application/json'})
+
+    def __mount(self) -> None:
+        adapter = CBoundAdapter(self.__interface, pool_connections=1, pool_maxsize=self.__pool, max_retries=0)
+        with self.__flight_lock:
+            for prefix in ('http://', 'https://'):
+                old = self.__session.adapters.get(prefix)
+                self.__session.mount(prefix, adapter)
+                if old is not None and old not in self.__retired:
+                    self.__retired.append(old)
+            self.__release()
+
+    def __release(self) -> None:
+        if self.__flight == 0:
+            retired, self.__retired = self.__retired, []
+            for adapter in retired:
+                adapter.close()
+
+    def __send(self, p_method: str, p_url: str, **p_kwargs) -> requests.Response:
+        with self.__flight_lock:
+            self.__flight += 1
+        try:
+            return self.__session.request(p_method, p_url, **p_kwargs)
+        finally:
+            with self.__flight_lock:
+                self.__flight -= 1
+                self.__release()
+
+    def __str__(self) -> str:
+        return ','.join([f"url:{self.__url}", f"user:{self.__user}", f"expire:{int(self.__expire)}"])
+
+    def __enter__(self) -> 'CGroundClient':
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.close()
+
+    @property
+    def url(self) -> str:
+        return self.__url
+
+    @property
+    def pool(self) -> int:
+        return self.__pool
+
+    @property
+    def interface(self) -> Union[str, None]:
+        return self.__interface
+
+    @interface.setter
+    def interface(self, p_interface: Union[str, None]) -> None:
+        if p_interface == self.__interface:
+            return
+        self.__interface = p_interface
+        self.__mount()
+        self.__log.info("route via %s", p_interface or 'default')
+
+    @property
+    def token(self) -> Union[str, None]:
+        with self.__lock:
+            if self.__token and time() < self.__expire - TOKEN_MARGIN:
+                return self.__token
+
+            url = '/'.join([self.__url, 'api/authenticate'])
+            data = json.dumps({'username': self.__user, 'password': self.__pass})
+            try:
+                res = self.__send('POST', url, data=data, timeout=self.__timeout)
+                if not res.ok:
+                    self.__log.error("authenticate failed: %i", res.status_code)
+                    return None
+                self.__token = res.json()['token']
+            except(requests.exceptions.RequestException, json.decoder.JSONDecodeError, KeyError) as error:
+                raise RuntimeError(f"[ground] authenticate: {str(error)}") from error
+
+            self.__expire = token_expire(self.__token)
+            self.__log.debug("token refreshed, expires at %i", int(self.__expire))
+            return self.__token
+
+    def invalidate(self) -> None:
+        with self.__lock:
+            self.__token = None
+            self.__expire = 0.0
+
+    def request(self, p_method: str, p_path: str, **p_kwargs) -> Union[requests.Response, None]:
+        url = '/'.join([self.__url, p_path])
+        p_kwargs.setdefault('timeout', self.__timeout)
+
+        for _ in range(2):
+            token = self.token
+            if not token:
+                return None
+            headers = dict(p_kwargs.pop('headers', {}))
+            headers['Authorization'] = ' '.join(['Bearer', token])
+            try:
+                res = self.__send(p_method, url, headers=headers, **p_kwargs)
+            except requests.exceptions.RequestException as error:
+                raise RuntimeError(f"[ground] {p_method} {p_path}: {str(error)}") from error
+            if res.status_code != 401:
+                return res
+            self.invalidate()
+            p_kwargs['headers'] = headers
+
+        return res
+
+    def icao(self, p_box_id: str) -> Union[str, None]:
+        res = self.request('GET', '/'.join(['api/admin/box/serial', p_box_id]))
+        if res is None or not res.ok:
+            return None
+        try:
+            return res.json()['hex']
+        except(json.decoder.JSONDecodeError, KeyError) as error:
+            raise RuntimeError(f"[ground] icao {p_box_id}: {str(error)}") from error
+
+    async def aicao(self, p_box_id: str) -> Union[str, None]:
+        return await asyncio.to_thread(self.icao, p_box_id)
+
+    async def bulk(self, p_box_ids: List[str], p_limit: Union[int, None] = None) -> Dict[str, Union[str, None]]:
+        semaphore = asyncio.Semaphore(p_limit or self.__pool)
+
+        async def lookup(p_box_id: str) -> Union[str, None]:
+            async with semaphore:
+                try:
+                    return await self.aicao(p_box_id)
+                except RuntimeError as err:
+                    self.__log.error("%s", str(err))
+                    return None
+
+        box_ids = list(dict.fromkeys(p_box_ids))
+        result = await asyncio.gather(*[lookup(box_id) for box_id in box_ids])
+        return dict(zip(box_ids, result))
+
+    def close(self) -> None:
+        self.__session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_ground_client(p_url: str, p_user: str, p_pass: str) -> CGroundClient:
+    key = (p_url.rstrip('/'), p_user, p_pass)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = CGroundClient(p_url, p_user, p_pass)
+        return _clients[key]
+
+
+def route_ground_clients(p_interface: Union[str, None]) -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        client.interface = p_interface
+
+
+class CResolverICAO():
+    def __init__(self, p_cache: CCacheICAO, p_client: CGroundClient, p_ttl: int = ICAO_TTL) -> None:
+        self.__cache = p_cache
+        self.__client = p_client
+        self.__ttl = p_ttl
+        self.__tasks = {}
+        self.__log = getLogger("[icao]")
+
+    def __entry(self, p_box_id: str) -> Union[dict, None]:
+        entry = self.__cache.get(p_box_id)
+        if entry is None and self.__cache.icao and not self.__cache.entries:
+            entry = {'icao': self.__cache.icao, 'time': self.__cache.time}
+        return entry
+
+    def stale(self, p_box_id: str) -> bool:
+        entry = self.__entry(p_box_id)
+        return entry is None or time() - entry['time'] >= self.__ttl
+
+    def resolve(self, p_box_id: str) -> Union[str, None]:
+        entry = self.__entry(p_box_id)
+        if entry is None or time() - entry['time'] >= self.__ttl:
+            self.revalidate(p_box_id)
+        return entry['icao'] if entry else None
+
+    def revalidate(self, p_box_id: str) -> Union[asyncio.Task, None]:
+        task = self.__tasks.get(p_box_id)
+        if task and not task.done():
+            return task
+        try:
+            task = asyncio.get_running_loop().create_task(self.refresh(p_box_id))
+        except RuntimeError:
+            return None
+        self.__tasks[p_box_id] = task
+        task.add_done_callback(lambda _: self.__tasks.pop(p_box_id, None))
+        return task
+
+    async def refresh(self, p_box_id: str) -> Union[str, None]:
+        try:
+            icao = await self.__client.aicao(p_box_id)
+        except RuntimeError as err:
+            self.__log.error("refresh %s failed: %s", p_box_id, str(err))
+            return None
+        if not icao:
+            self.__log.error("refresh %s failed: ground has no icao", p_box_id)
+            return None
+        try:
+            await asyncio.to_thread(self.__cache.save, icao, p_box_id)
+        except RuntimeError as err:
+            self.__log.error("%s", str(err))
+        self.__log.debug("refresh %s: %s", p_box_id, icao)
+        return icao
+
+    async def refresh_many(self, p_box_ids: List[str], p_limit: Union[int, None] = None) -> Dict[str, Union[str, None]]:
+        stale = [box_id for box_id in p_box_ids if self.stale(box_id)]
+        result = await self.__client.bulk(stale, p_limit)
+        for box_id, icao in result.items():
+            if icao:
+                try:
+                    await asyncio.to_thread(self.__cache.save, icao, box_id)
+                except RuntimeError as err:
+                    self.__log.error("%s", str(err))
+        return {box_id: result.get(box_id) or (self.__cache.get(box_id) or {}).get('icao') for box_id in p_box_ids}
+
+    async def wait(self, p_box_id: str) -> Union[str, None]:
+        icao = self.resolve(p_box_id)
+        task = self.__tasks.get(p_box_id)
+        if icao is None and task:
+            icao = await task
+        return icao
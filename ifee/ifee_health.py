@@ -0,0 +1,183 @@
+import threading
+from collections import deque
+from time import monotonic
+from logging import getLogger
+from typing import Union, List, Dict
+from ifee.ifee_common import CSingleton
+
+
+HEALTH_STATES = {
+    'CONNECTED': 40,
+    'CONNECTING': 35,
+    'REGISTERED': 35,
+    'ENABLED': 30,
+    'ENABLING': 25,
+    'DISABLED': 25,
+    'SEARCHING': 20,
+    'DISABLING': 20,
+    'INITIALIZING': 10,
+    'UNKNOWN': 5,
+    'LOCKED': 0
+}
+HEALTH_HISTORY = 4
+HEALTH_LATENCY = 30
+HEALTH_FAILED = 40
+HEALTH_MARGIN = 10
+
+logger = getLogger("[health]")
+
+
+class CModemHealth(CSingleton):
+    def __init__(self) -> None:
+        if '_CModemHealth__props' in self.__dict__:
+            return
+        self.__lock = threading.Lock()
+        self.__props = {}
+        self.__activations = {}
+        self.__current = None
+        self.__up = False
+        self.__failover_start = None
+        self.__failovers = 0
+        self.__failover_last = 0.0
+        self.__failover_max = 0.0
+        self.__failover_sum = 0.0
+        self.__bus = None
+        self.__modems = {}
+
+    def __str__(self) -> str:
+        return ','.join([f"{index}:{score}" for index, score in self.scores.items()])
+
+    @property
+    def current(self) -> Union[int, None]:
+        return self.__current
+
+    @property
+    def up(self) -> bool:
+        return self.__up
+
+    def down(self) -> None:
+        self.__up = False
+
+    @property
+    def scores(self) -> Dict[int, float]:
+        with self.__lock:
+            return {index: self.__score(index) for index in self.__props}
+
+    def update(self, p_index: int, p_props: dict) -> None:
+        with self.__lock:
+            self.__props.setdefault(p_index, {}).update(p_props)
+            self.__activations.setdefault(p_index, deque(maxlen=HEALTH_HISTORY))
+
+    def remove(self, p_index: int) -> None:
+        with self.__lock:
+            self.__props.pop(p_index, None)
+            self.__activations.pop(p_index, None)
+        for path in [path for path, index in self.__modems.items() if index == p_index]:
+            del self.__modems[path]
+
+    def __changed(self, p_interface, p_changed, p_invalidated, path=None) -> None:
+        from ifee.ifee_dbus import MM_DBUS_INTERFACE_MODEM, parse_modem
+
+        index = self.__modems.get(str(path))
+        if index is None or str(p_interface) != MM_DBUS_INTERFACE_MODEM:
+            return
+        props = parse_modem(p_changed)
+        if props:
+            self.update(index, props)
+
+    def watch(self, p_paths: List[str]) -> None:
+        from dbus import Interface, DBusException
+        from ifee.ifee_dbus import get_signal_bus, parse_modem, DBUS_INTERFACE_PROPERTIES, MM_DBUS_PROXY, \
+            MM_DBUS_SERVICE, MM_DBUS_INTERFACE_MODEM
+
+        if self.__bus is None:
+            self.__bus = get_signal_bus()
+            self.__bus.add_signal_receiver(self.__changed, 'PropertiesChanged', DBUS_INTERFACE_PROPERTIES,
+                                           MM_DBUS_SERVICE, path_keyword='path')
+
+        for path in p_paths:
+            if path in self.__modems:
+                continue
+            index = int(path.split('/')[-1])
+            try:
+                props = Interface(self.__bus.get_object(MM_DBUS_PROXY, path), DBUS_INTERFACE_PROPERTIES).GetAll(MM_DBUS_INTERFACE_MODEM)
+            except DBusException as err:
+                logger.error("modem %d watch failed: %s", index, str(err))
+                continue
+            self.__modems[path] = index
+            self.update(index, parse_modem(props))
+            logger.info("modem %d watched", index)
+
+    def __score(self, p_index: int) -> float:
+        props = self.__props.get(p_index)
+        if not props or props.get('State') == 'FAILED' or props.get('FailedReason') in ('SIM_MISSING', 'SIM_ERROR'):
+            return 0.0
+
+        score = HEALTH_STATES.get(props.get('State'), 0) + 0.3 * props.get('SignalQuality', 0)
+        history = self.__activations.get(p_index)
+        if not history:
+            return round(score + 15, 1)
+
+        latencies = [latency for success, latency in history if success]
+        score += 30 * len(latencies) / len(history)
+        if latencies:
+            score -= 10 * min(sum(latencies) / len(latencies) / HEALTH_LATENCY, 1)
+        if not history[-1][0]:
+            score -= HEALTH_FAILED
+        return round(max(score, 0.0), 1)
+
+    def __failed(self, p_index: int) -> bool:
+        history = self.__activations.get(p_index)
+        return bool(history) and not history[-1][0]
+
+    def score(self, p_index: int) -> float:
+        with self.__lock:
+            return self.__score(p_index)
+
+    def select(self, p_indexes: List[int], p_prefer: Union[int, None] = None) -> Union[int, None]:
+        with self.__lock:
+            scores = {index: self.__score(index) for index in p_indexes}
+            if len(scores) > 1 and self.__current in scores and self.__failed(self.__current):
+                del scores[self.__current]
+        if not scores:
+            return None
+
+        best = max(scores, key=lambda index: (scores[index], index == p_prefer))
+        current = self.__current if self.__current in scores else None
+        if current is None and p_prefer in scores and scores[p_prefer] >= scores[best] - HEALTH_MARGIN:
+            best = p_prefer
+        elif current is not None and scores[current] > 0 and scores[current] >= scores[best] - HEALTH_MARGIN:
+            best = current
+
+        if best != self.__current:
+            if self.__current is not None:
+                self.__failovers += 1
+                if self.__failover_start is None:
+                    self.__failover_start = monotonic()
+                logger.warning("failover modem %s -> %s: %s", self.__current, best, str(scores))
+            self.__current = best
+        return best
+
+    def activation(self, p_index: int, p_success: bool, p_latency: float) -> None:
+        with self.__lock:
+            self.__activations.setdefault(p_index, deque(maxlen=HEALTH_HISTORY)).append((p_success, p_latency))
+        self.__up = p_success
+
+        if p_success and self.__failover_start is not None and p_index == self.__current:
+            latency = monotonic() - self.__failover_start
+            self.__failover_start = None
+            self.__failover_last = latency
+            self.__failover_max = max(self.__failover_max, latency)
+            self.__failover_sum += latency
+            logger.info("modem %d recovered in %.1fs", p_index, latency)
+
+    def as_dict(self) -> dict:
+        return {
+            'current': self.__current,
+            'up': self.__up,
+            'scores': self.scores,
+            'failovers': self.__failovers,
+            'failover_last': round(self.__failover_last, 3),
+            'failover_max': round(self.__failover_max, 3),
+            'failover_sum': round(self.__failover_sum, 3)
+        }
@@ -0,0 +1,126 @@
+import logging
+import threading
+from queue import SimpleQueue, Empty
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic
+from typing import Union, List
+
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+LOG_RATE = 20
+LOG_PERIOD = 10.0
+
+_listener = {}
+
+
+class CRateLimitFilter(logging.Filter):
+    def __init__(self, p_rate: int = LOG_RATE, p_period: float = LOG_PERIOD, p_level: int = logging.WARNING) -> None:
+        super().__init__()
+        self.__rate = p_rate
+        self.__period = p_period
+        self.__level = p_level
+        self.__lock = threading.Lock()
+        self.__windows = {}
+
+    def filter(self, p_record: logging.LogRecord) -> bool:
+        if p_record.levelno >= self.__level or self.__rate <= 0:
+            return True
+
+        key = (p_record.name, p_record.msg)
+        now = monotonic()
+        with self.__lock:
+            window = self.__windows.get(key)
+            if window is None or now - window[0] >= self.__period:
+                suppressed = window[2] if window else 0
+                self.__windows[key] = [now, 1, 0]
+            elif window[1] < self.__rate:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed:
+            p_record.msg = f"{p_record.msg} -- {suppressed} similar suppressed"
+        return True
+
+    def summary(self) -> List[tuple]:
+        with self.__lock:
+            ret = [(name, msg, window[2]) for (name, msg), window in self.__windows.items() if window[2]]
+            for window in self.__windows.values():
+                window[2] = 0
+        return ret
+
+
+class CQueueHandler(QueueHandler):
+    def prepare(self, p_record: logging.LogRecord) -> logging.LogRecord:
+        return p_record
+
+
+class CQueueListener(QueueListener):
+    def __init__(self, p_queue: SimpleQueue, p_handlers: List[logging.Handler], p_limiter: CRateLimitFilter,
+                 p_period: float = LOG_PERIOD) -> None:
+        super().__init__(p_queue, *p_handlers, respect_handler_level=True)
+        self.__limiter = p_limiter
+        self.__period = p_period
+        self.__flushed = monotonic()
+
+    def dequeue(self, p_block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                record = self.queue.get(p_block, timeout=self.__period)
+            except Empty:
+                record = Empty
+            if monotonic() - self.__flushed >= self.__period:
+                self.flush()
+            if record is not Empty:
+                return record
+
+    def flush(self) -> None:
+        self.__flushed = monotonic()
+        for name, msg, count in self.__limiter.summary():
+            self.handle(logging.getLogger(name).makeRecord(name, logging.WARNING, __name__, 0,
+                                                           "suppressed %d x '%s'", (count, msg), None))
+
+
+def setup_logging(p_level: Union[str, int] = 'INFO', p_format: str = LOG_FORMAT, p_rate: int = LOG_RATE,
+                  p_period: float = LOG_PERIOD, p_handlers: Union[List[logging.Handler], None] = None) -> CRateLimitFilter:
+    stop_logging()
+
+    handlers = p_handlers or [logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(p_format))
+
+    queue = SimpleQueue()
+    handler = CQueueHandler(queue)
+    limiter = CRateLimitFilter(p_rate, p_period)
+    handler.addFilter(limiter)
+
+    root = logging.getLogger()
+    _listener['previous'] = (list(root.handlers), root.level)
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(p_level.upper() if isinstance(p_level, str) else p_level)
+
+    listener = CQueueListener(queue, handlers, limiter, p_period)
+    listener.start()
+    _listener['listener'] = listener
+    _listener['handler'] = handler
+    return limiter
+
+
+def stop_logging() -> None:
+    listener = _listener.pop('listener', None)
+    handler = _listener.pop('handler', None)
+    handlers, level = _listener.pop('previous', ([], logging.WARNING))
+    if listener is None:
+        return
+    listener.stop()
+    listener.flush()
+
+    root = logging.getLogger()
+    root.removeHandler(handler)
+    for old in handlers:
+        root.addHandler(old)
+    root.setLevel(level)
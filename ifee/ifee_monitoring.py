@@ -1,6 +1,10 @@
 import asyncio
 from prometheus_client import Metric, write_to_textfile, CollectorRegistry
 from ifee.ifee_common import CSyncObj
+from ifee.ifee_profiler import CProfiler
+from ifee.ifee_frames import CFrameStats, CLatencyTrace
+from ifee.ifee_signal import CSignalSampler
+from ifee.ifee_health import CModemHealth
 
 
 class CAircraftCollector():
@@ -38,11 +42,60 @@ class CAircraftCollector():
             yield metric_lan
 
 
-async def collect_aircraft(p_file_path: str = '/var/lib/prom/aircraft.prom') -> None:
+class CFrameCollector():
+    def __init__(self) -> None:
+        super().__init__()
+        self.__stats = CFrameStats()
+
+    def collect(self) -> None:
+        metrics = self.__stats.as_dict()
+
+        metric_fr = Metric('adsb_frames', 'ADS-B frames by validation result', 'counter')
+        for result, value in metrics.items():
+            metric_fr.add_sample('adsb_frames_total', labels={'result': result}, value=value)
+        yield metric_fr
+
+
+class CTrafficCollector():
+    def __init__(self) -> None:
+        from ifee.ifee_decoder import CTrafficTable
+
+        super().__init__()
+        self.__traffic = CTrafficTable()
+
+    def collect(self) -> None:
+        metric_tr = Metric('adsb_traffic_aircraft', 'Aircraft tracked by the ground receiver', 'gauge')
+        metric_tr.add_sample('adsb_traffic_aircraft', value=len(self.__traffic))
+        yield metric_tr
+
+
+class CLatencyCollector():
+    def __init__(self) -> None:
+        super().__init__()
+        self.__trace = CLatencyTrace()
+
+    def collect(self) -> None:
+        metrics = self.__trace.as_dict()
+
+        metric_lt = Metric('adsb_latency_seconds', 'ADS-B frame latency from receive by pipeline stage', 'histogram')
+        for stage, hist in metrics.items():
+            for bound, value in hist['buckets'].items():
+                le = '+Inf' if bound == float('inf') else str(bound)
+                metric_lt.add_sample('adsb_latency_seconds_bucket', labels={'stage': stage, 'le': le}, value=value)
+            metric_lt.add_sample('adsb_latency_seconds_sum', labels={'stage': stage}, value=hist['sum'])
+            metric_lt.add_sample('adsb_latency_seconds_count', labels={'stage': stage}, value=hist['count'])
+        yield metric_lt
+
+
+async def collect_aircraft(p_file_path: str = '/var/lib/prom/aircraft.prom', p_traffic: bool = False) -> None:
     try:
         while True:
             registry = CollectorRegistry()
             registry.register(CAircraftCollector())
+            registry.register(CFrameCollector())
+            registry.register(CLatencyCollector())
+            if p_traffic:
+                registry.register(CTrafficCollector())
             write_to_textfile(p_file_path, registry)
             await asyncio.sleep(10)
     except PermissionError as err:
@@ -79,11 +132,170 @@ class CMetricCollector():
         yield metric_tp
 
 
+class CHealthCollector():
+    def __init__(self) -> None:
+        super().__init__()
+        self.__health = CModemHealth()
+
+    def collect(self) -> None:
+        metrics = self.__health.as_dict()
+
+        metric_hs = Metric('modem_health', 'Modem health score', 'gauge')
+        for index, score in metrics['scores'].items():
+            metric_hs.add_sample('modem_health', labels={'modem': str(index)}, value=score)
+        yield metric_hs
+
+        metric_cur = Metric('modem_active', 'Modem selected by watchdog', 'gauge')
+        for index in metrics['scores']:
+            metric_cur.add_sample('modem_active', labels={'modem': str(index)}, value=int(index == metrics['current']))
+        yield metric_cur
+
+        metric_fo = Metric('modem_failovers', 'Modem failovers', 'counter')
+        metric_fo.add_sample('modem_failovers_total', value=metrics['failovers'], labels={})
+        yield metric_fo
+
+        metric_fl = Metric('modem_failover_seconds', 'Modem last failover latency seconds', 'gauge')
+        metric_fl.add_sample('modem_failover_seconds', value=metrics['failover_last'], labels={})
+        yield metric_fl
+
+        metric_fm = Metric('modem_failover_seconds_max', 'Modem longest failover latency seconds', 'gauge')
+        metric_fm.add_sample('modem_failover_seconds_max', value=metrics['failover_max'], labels={})
+        yield metric_fm
+
+        metric_fs = Metric('modem_failover_duration_seconds', 'Modem failover latency seconds spent', 'counter')
+        metric_fs.add_sample('modem_failover_duration_seconds_total', value=metrics['failover_sum'], labels={})
+        yield metric_fs
+
+
+class CUplinkCollector():
+    def __init__(self) -> None:
+        from ifee.ifee_uplink import CUplink
+
+        super().__init__()
+        self.__uplink = CUplink()
+
+    def collect(self) -> None:
+        metrics = self.__uplink.as_dict()
+
+        metric_rtt = Metric('uplink_rtt_seconds', 'Uplink round trip time', 'gauge')
+        metric_tp = Metric('uplink_throughput_bytes', 'Uplink throughput bytes per second', 'gauge')
+        metric_rt = Metric('uplink_route', 'Uplink used for bulk transfers', 'gauge')
+        for name, link in metrics['links'].items():
+            labels = {'link': name, 'interface': link['interface']}
+            if link['rtt'] is not None:
+                metric_rtt.add_sample('uplink_rtt_seconds', labels=labels, value=link['rtt'])
+            if link['throughput'] is not None:
+                metric_tp.add_sample('uplink_throughput_bytes', labels=labels, value=link['throughput'])
+            metric_rt.add_sample('uplink_route', labels=labels, value=int(name == metrics['route']))
+        yield metric_rtt
+        yield metric_tp
+        yield metric_rt
+
+
 async def collect_metrics(p_file_path: str = '/var/lib/prom/kontron.prom') -> None:
     try:
         while True:
             registry = CollectorRegistry()
             registry.register(CMetricCollector())
+            registry.register(CHealthCollector())
+            registry.register(CUplinkCollector())
+            write_to_textfile(p_file_path, registry)
+            await asyncio.sleep(10)
+    except PermissionError as err:
+        raise RuntimeError(f"[collect] {str(err)}") from err
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        pass
+
+
+class CProfileCollector():
+    def __init__(self) -> None:
+        super().__init__()
+        self.__profiler = CProfiler()
+
+    def collect(self) -> None:
+        metrics = self.__profiler.as_dict()
+
+        metric_lag = Metric('loop_lag', 'Event loop lag seconds', 'gauge')
+        metric_lag.add_sample('loop_lag', value=metrics['lag'], labels={})
+        yield metric_lag
+
+        metric_lmax = Metric('loop_lag_max', 'Event loop maximum lag seconds', 'gauge')
+        metric_lmax.add_sample('loop_lag_max', value=metrics['lag_max'], labels={})
+        yield metric_lmax
+
+        metric_lavg = Metric('loop_lag_avg', 'Event loop average lag seconds', 'gauge')
+        metric_lavg.add_sample('loop_lag_avg', value=metrics['lag_avg'], labels={})
+        yield metric_lavg
+
+        metric_st = Metric('loop_stalls', 'Event loop stalls over threshold', 'counter')
+        metric_st.add_sample('loop_stalls_total', value=metrics['stalls'], labels={})
+        yield metric_st
+
+        metric_cpu = Metric('task_cpu', 'Task CPU time seconds', 'counter')
+        for name, task in metrics['tasks'].items():
+            metric_cpu.add_sample('task_cpu_total', labels={'task': name}, value=task['cpu'])
+        yield metric_cpu
+
+        metric_wall = Metric('task_wall', 'Task time on event loop seconds', 'counter')
+        for name, task in metrics['tasks'].items():
+            metric_wall.add_sample('task_wall_total', labels={'task': name}, value=task['wall'])
+        yield metric_wall
+
+        metric_max = Metric('task_step_max', 'Task longest single step seconds', 'gauge')
+        for name, task in metrics['tasks'].items():
+            metric_max.add_sample('task_step_max', labels={'task': name}, value=task['max_step'])
+        yield metric_max
+
+
+async def collect_profile(p_file_path: str = '/var/lib/prom/profile.prom') -> None:
+    try:
+        while True:
+            registry = CollectorRegistry()
+            registry.register(CProfileCollector())
+            write_to_textfile(p_file_path, registry)
+            await asyncio.sleep(10)
+    except PermissionError as err:
+        raise RuntimeError(f"[collect] {str(err)}") from err
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        pass
+
+
+class CSignalCollector():
+    def __init__(self) -> None:
+        super().__init__()
+        self.__sampler = CSignalSampler()
+
+    def collect(self) -> None:
+        metrics = self.__sampler.as_dict()
+
+        for key, desc in (('rssi', 'received signal strength dBm'), ('rsrp', 'reference signal received power dBm'),
+                          ('rsrq', 'reference signal received quality dB'), ('sinr', 'signal to noise ratio dB')):
+            metric = Metric(f"modem_{key}", f"Modem {desc}", 'gauge')
+            metric_min = Metric(f"modem_{key}_min", f"Modem {desc} window minimum", 'gauge')
+            metric_avg = Metric(f"modem_{key}_avg", f"Modem {desc} window average", 'gauge')
+            for index, stats in metrics.items():
+                if key not in stats:
+                    continue
+                labels = {'modem': str(index), 'tech': stats['latest']['tech']}
+                if key in stats['latest']:
+                    metric.add_sample(f"modem_{key}", labels=labels, value=stats['latest'][key])
+                metric_min.add_sample(f"modem_{key}_min", labels=labels, value=stats[key]['min'])
+                metric_avg.add_sample(f"modem_{key}_avg", labels=labels, value=stats[key]['avg'])
+            yield metric
+            yield metric_min
+            yield metric_avg
+
+        metric_sm = Metric('modem_signal_samples', 'Modem signal samples in window', 'gauge')
+        for index, stats in metrics.items():
+            metric_sm.add_sample('modem_signal_samples', labels={'modem': str(index)}, value=stats['samples'])
+        yield metric_sm
+
+
+async def collect_signal(p_file_path: str = '/var/lib/prom/signal.prom') -> None:
+    try:
+        while True:
+            registry = CollectorRegistry()
+            registry.register(CSignalCollector())
             write_to_textfile(p_file_path, registry)
             await asyncio.sleep(10)
     except PermissionError as err:
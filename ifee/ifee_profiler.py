@@ -0,0 +1,183 @@
+import asyncio
+import json
+import sys
+import threading
+import traceback
+from collections import deque
+from collections.abc import Coroutine
+from os import makedirs as m_mkdir, path as m_path, replace as m_replace
+from time import monotonic, thread_time, time
+from logging import getLogger
+from typing import Union
+from ifee.ifee_common import CSingleton, COULD_NOT_SET
+
+
+logger = getLogger("[profiler]")
+
+
+class CTimedCoroutine(Coroutine):
+    def __init__(self, p_coro: Coroutine, p_name: str, p_profiler: 'CProfiler') -> None:
+        self.__coro = p_coro
+        self.__name = p_name
+        self.__profiler = p_profiler
+        self.__task = None
+
+    def __step(self, p_func, *p_args):
+        if self.__task is None:
+            task = asyncio.current_task()
+            self.__task = task.get_name() if task and not task.get_name().startswith('Task-') else self.__name
+        previous = self.__profiler.running
+        self.__profiler.running = self.__task
+        cpu = thread_time()
+        wall = monotonic()
+        try:
+            return p_func(*p_args)
+        finally:
+            self.__profiler.account(self.__task, thread_time() - cpu, monotonic() - wall)
+            self.__profiler.running = previous
+
+    def send(self, p_val):
+        return self.__step(self.__coro.send, p_val)
+
+    def throw(self, *p_args):
+        return self.__step(self.__coro.throw, *p_args)
+
+    def close(self) -> None:
+        self.__coro.close()
+
+    def __await__(self):
+        return self.__coro.__await__()
+
+
+class CProfiler(CSingleton):
+    def __init__(self) -> None:
+        if '_CProfiler__tasks' in self.__dict__:
+            return
+        self.__tasks = {}
+        self.__stalls = deque(maxlen=32)
+        self.__lock = threading.Lock()
+        self.__loop_thread = None
+        self.__heartbeat = monotonic()
+        self.__sampled = False
+        self.__lag = 0.0
+        self.__lag_max = 0.0
+        self.__lag_count = 0
+        self.__lag_sum = 0.0
+        self.__stall_count = 0
+        self.running = None
+
+    def __getattr__(self, p_key: str) -> Union[int, float, None]:
+        match p_key:
+            case "lag":
+                return self.__lag
+            case "lag_max":
+                return self.__lag_max
+            case "stall_count":
+                return self.__stall_count
+            case _:
+                return None
+
+    def account(self, p_name: str, p_cpu: float, p_wall: float) -> None:
+        with self.__lock:
+            task = self.__tasks.setdefault(p_name, {'cpu': 0.0, 'wall': 0.0, 'steps': 0, 'max_step': 0.0})
+            task['cpu'] += p_cpu
+            task['wall'] += p_wall
+            task['steps'] += 1
+            if p_wall > task['max_step']:
+                task['max_step'] = p_wall
+
+    def install(self, p_loop: Union[asyncio.AbstractEventLoop, None] = None) -> None:
+        loop = p_loop or asyncio.get_running_loop()
+        previous = loop.get_task_factory()
+        if getattr(previous, 'profiler', None) is self:
+            return
+        self.__loop_thread = threading.get_ident()
+
+        def factory(p_loop, p_coro, **p_kwargs):
+            name = getattr(p_coro, '__qualname__', type(p_coro).__name__)
+            coro = CTimedCoroutine(p_coro, name, self)
+            if previous is not None:
+                return previous(p_loop, coro, **p_kwargs)
+            return asyncio.Task(coro, loop=p_loop, **p_kwargs)
+
+        factory.profiler = self
+        loop.set_task_factory(factory)
+
+    def beat(self, p_lag: float, p_threshold: float) -> None:
+        with self.__lock:
+            self.__heartbeat = monotonic()
+            self.__lag = p_lag
+            self.__lag_max = max(self.__lag_max, p_lag)
+            self.__lag_count += 1
+            self.__lag_sum += p_lag
+            if self.__sampled and self.__stalls:
+                self.__stalls[-1]['lag'] = round(p_lag, 6)
+            elif p_lag >= p_threshold:
+                self.__stall_count += 1
+                self.__stalls.append({'time': time(), 'lag': round(p_lag, 6), 'task': self.running, 'stack': []})
+            self.__sampled = False
+
+    def sample(self, p_limit: float) -> None:
+        with self.__lock:
+            late = monotonic() - self.__heartbeat
+            if self.__sampled or late < p_limit or self.__loop_thread is None:
+                return
+            self.__sampled = True
+            frame = sys._current_frames().get(self.__loop_thread)
+            stack = traceback.format_stack(frame) if frame else []
+            self.__stall_count += 1
+            self.__stalls.append({'time': time(), 'lag': round(late, 6), 'task': self.running, 'stack': stack})
+        logger.warning("event loop stalled for %.3fs in %s", late, self.running)
+
+    def as_dict(self) -> dict:
+        with self.__lock:
+            ret = {}
+            ret['lag'] = self.__lag
+            ret['lag_max'] = self.__lag_max
+            ret['lag_avg'] = self.__lag_sum / self.__lag_count if self.__lag_count else 0.0
+            ret['stalls'] = self.__stall_count
+            ret['tasks'] = {k: dict(v) for k, v in self.__tasks.items()}
+            ret['last_stalls'] = list(self.__stalls)
+            return ret
+
+    def dump(self, p_path: str) -> None:
+        tmp = p_path + '.tmp'
+        try:
+            m_mkdir(m_path.dirname(p_path) or '.', mode=493, exist_ok=True)
+            with open(tmp, 'w', encoding='UTF8') as dump:
+                dump.write(json.dumps(self.as_dict(), indent=2))
+            m_replace(tmp, p_path)
+        except OSError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='profiler', unit='dump', aux=p_path)) from err
+
+
+async def monitor_loop(p_interval: float = 0.1, p_threshold: float = 0.25,
+                       p_dump_path: Union[str, None] = None, p_dump_delay: int = 10) -> None:
+    profiler = CProfiler()
+    profiler.install()
+    stop = threading.Event()
+
+    def watcher() -> None:
+        while not stop.wait(p_interval / 2):
+            profiler.sample(p_interval + p_threshold)
+
+    thread = threading.Thread(target=watcher, name='ifee-loop-watcher', daemon=True)
+    thread.start()
+    logger.debug("started")
+
+    last_dump = monotonic()
+    try:
+        while True:
+            start = monotonic()
+            await asyncio.sleep(p_interval)
+            profiler.beat(max(0.0, monotonic() - start - p_interval), p_threshold)
+
+            if p_dump_path and monotonic() - last_dump >= p_dump_delay:
+                profiler.dump(p_dump_path)
+                last_dump = monotonic()
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        logger.info("stopped")
+    finally:
+        stop.set()
+        if p_dump_path:
+            profiler.dump(p_dump_path)
@@ -0,0 +1,165 @@
+import asyncio
+import errno
+import os
+from os import path as m_path
+from glob import glob
+from logging import getLogger
+from typing import Union, List, Tuple
+from ifee.ifee_common import CSyncObj, CBattery, CTemperature
+
+
+SENSORS_ROOT = '/sys/class'
+SENSORS_DELAY = 5
+SENSORS_SLOT = 32
+
+logger = getLogger("[sensors]")
+
+
+def read_text(p_path: str) -> Union[str, None]:
+    try:
+        with open(p_path, 'r', encoding='UTF8') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+class CSensorSampler():
+    def __init__(self, p_root: str = SENSORS_ROOT) -> None:
+        self.__root = p_root
+        self.__fds = []
+        self.__temperatures = []
+        self.__batteries = []
+        self.__mains = []
+        self.__bat = []
+        self.__tmp = []
+        self.__buffer = bytearray()
+        self.__views = []
+        self.__stale = True
+
+    def __str__(self) -> str:
+        return ','.join([f"fds:{len(self.__fds)}", f"batteries:{len(self.__batteries)}",
+                         f"temperatures:{len(self.__temperatures)}", f"mains:{len(self.__mains)}"])
+
+    def __enter__(self) -> 'CSensorSampler':
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.close()
+
+    def __open(self, p_path: str) -> Union[int, None]:
+        try:
+            self.__fds.append(os.open(p_path, os.O_RDONLY))
+        except OSError as err:
+            logger.debug("skip %s: %s", p_path, str(err))
+            return None
+        return len(self.__fds) - 1
+
+    def close(self) -> None:
+        for fd in self.__fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.__fds = []
+        self.__temperatures = []
+        self.__batteries = []
+        self.__mains = []
+        self.__stale = True
+
+    def discover(self) -> None:
+        self.close()
+
+        for hwmon in sorted(glob(m_path.join(self.__root, 'hwmon', 'hwmon*'))):
+            name = read_text(m_path.join(hwmon, 'name')) or m_path.basename(hwmon)
+            for sensor in sorted(glob(m_path.join(hwmon, 'temp*_input'))):
+                base = m_path.basename(sensor)[:-len('_input')]
+                label = read_text(m_path.join(hwmon, base + '_label')) or base
+                slot = self.__open(sensor)
+                if slot is not None:
+                    self.__temperatures.append((slot, CTemperature(f"{name}_{label}".replace(' ', '_'), 0.0)))
+
+        index = 0
+        for supply in sorted(glob(m_path.join(self.__root, 'power_supply', '*'))):
+            match read_text(m_path.join(supply, 'type')):
+                case 'Battery':
+                    slots = tuple(self.__open(m_path.join(supply, name)) if m_path.exists(m_path.join(supply, name)) else None
+                                  for name in ('capacity', 'power_now', 'current_now', 'voltage_now'))
+                    if slots[0] is not None:
+                        self.__batteries.append((slots, CBattery(index, 0, 0)))
+                        index += 1
+                case 'Mains' | 'USB':
+                    slot = self.__open(m_path.join(supply, 'online'))
+                    if slot is not None:
+                        self.__mains.append(slot)
+                case _:
+                    pass
+
+        self.__bat = [bat for _, bat in self.__batteries]
+        self.__tmp = [tmp for _, tmp in self.__temperatures]
+        self.__buffer = bytearray(SENSORS_SLOT * len(self.__fds))
+        view = memoryview(self.__buffer)
+        self.__views = [view[i * SENSORS_SLOT:(i + 1) * SENSORS_SLOT] for i in range(len(self.__fds))]
+        self.__stale = False
+        logger.info("discovered %s", str(self))
+
+    def __read(self) -> List[Union[int, None]]:
+        ret = []
+        buffer = self.__buffer
+        for slot, (fd, view) in enumerate(zip(self.__fds, self.__views)):
+            try:
+                size = os.preadv(fd, [view], 0)
+            except OSError as err:
+                if err.errno == errno.ENODEV:
+                    self.__stale = True
+                ret.append(None)
+                continue
+            try:
+                ret.append(int(buffer[slot * SENSORS_SLOT:slot * SENSORS_SLOT + size]))
+            except ValueError:
+                ret.append(None)
+        return ret
+
+    @staticmethod
+    def __value(p_values: List[Union[int, None]], p_slot: Union[int, None]) -> Union[int, None]:
+        return None if p_slot is None else p_values[p_slot]
+
+    def sample(self) -> Tuple[List[CBattery], List[CTemperature], Union[bool, None]]:
+        if self.__stale:
+            self.discover()
+        values = self.__read()
+
+        for slot, tmp in self.__temperatures:
+            if values[slot] is not None:
+                tmp.value = values[slot] / 1000
+
+        for (capacity, power, current, voltage), bat in self.__batteries:
+            if values[capacity] is not None:
+                bat.level = values[capacity]
+            power_now = self.__value(values, power)
+            if power_now is None and None not in (self.__value(values, current), self.__value(values, voltage)):
+                power_now = values[current] * values[voltage] / 1e6
+            if power_now is not None:
+                bat.power = power_now / 1e6
+
+        mains = [values[slot] for slot in self.__mains if values[slot] is not None]
+        pwr = any(mains) if mains else None
+        return self.__bat, self.__tmp, pwr
+
+
+async def sample_sensors(p_root: str = SENSORS_ROOT, p_delay: float = SENSORS_DELAY) -> None:
+    logger.debug("started")
+    status = CSyncObj()
+    sampler = CSensorSampler(p_root)
+    try:
+        while True:
+            bat, tmp, pwr = await asyncio.to_thread(sampler.sample)
+            if status.monitoring.bat is not bat:
+                status.monitoring.bat = bat
+            if status.monitoring.tmp is not tmp:
+                status.monitoring.tmp = tmp
+            if pwr is not None and pwr != status.monitoring.pwr:
+                status.monitoring.pwr = pwr
+            await asyncio.sleep(p_delay)
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        sampler.close()
+        logger.info("stopped")
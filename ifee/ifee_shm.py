@@ -0,0 +1,534 @@
+import math
+import struct
+import threading
+from os import getpid, kill as m_kill
+from time import sleep, monotonic
+from queue import Queue, Empty, Full
+from multiprocessing import shared_memory, resource_tracker
+from typing import Union, List, Callable
+from ifee.ifee_common import COULD_NOT_SET, COULD_NOT_GET, CSingleton, CSyncObj, CBattery, CTemperature, CPosition
+
+
+SHM_NAME = 'ifee'
+SHM_MAGIC = b'IFEE'
+SHM_VERSION = 1
+SHM_SPIN = 1000
+SHM_TIMEOUT = 1.0
+
+MAX_BATTERIES = 8
+MAX_TEMPERATURES = 16
+NAME_SIZE = 32
+ICAO_SIZE = 8
+FRAME_SIZE = 14
+QUEUE_SLOTS = 4096
+
+SEQ = struct.Struct('<Q')
+HEADER = struct.Struct('<4sHH')
+CONTROL = struct.Struct('<bb')
+ADSB = struct.Struct(f"<{ICAO_SIZE}s?")
+TRACK = struct.Struct('<iidd')
+SENSORS = struct.Struct('<?BB')
+BATTERY = struct.Struct('<idi')
+TEMPERATURE = struct.Struct(f"<{NAME_SIZE}sd")
+QUEUE = struct.Struct('<QQq')
+FRAME = struct.Struct(f"<B{FRAME_SIZE}sqqq")
+
+CONTROL_OFFSET = HEADER.size
+ADSB_OFFSET = CONTROL_OFFSET + SEQ.size + CONTROL.size
+TRACK_OFFSET = ADSB_OFFSET + SEQ.size + ADSB.size
+SENSORS_OFFSET = TRACK_OFFSET + SEQ.size + TRACK.size
+BATTERY_OFFSET = SENSORS.size
+TEMPERATURE_OFFSET = BATTERY_OFFSET + MAX_BATTERIES * BATTERY.size
+SHM_SIZE = SENSORS_OFFSET + SEQ.size + TEMPERATURE_OFFSET + MAX_TEMPERATURES * TEMPERATURE.size
+QUEUE_SIZE = QUEUE.size + QUEUE_SLOTS * FRAME.size
+SHM_TOTAL = SHM_SIZE + QUEUE_SIZE
+
+
+def tristate(p_val: Union[bool, None]) -> int:
+    return -1 if p_val is None else int(p_val)
+
+
+class CShmSection():
+    def __init__(self, p_buf: memoryview, p_offset: int, p_size: int) -> None:
+        self.__buf = p_buf
+        self.__offset = p_offset
+        self.__base = p_offset + SEQ.size
+        self.__size = p_size
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def seq(self) -> int:
+        return SEQ.unpack_from(self.__buf, self.__offset)[0]
+
+    def read(self, p_func: Callable[[memoryview, int], object]):
+        deadline = None
+        spin = 0
+        while True:
+            seq = SEQ.unpack_from(self.__buf, self.__offset)[0]
+            if not seq & 1:
+                ret = p_func(self.__buf, self.__base)
+                if SEQ.unpack_from(self.__buf, self.__offset)[0] == seq:
+                    return ret
+            spin += 1
+            if spin < SHM_SPIN:
+                sleep(0)
+                continue
+            if deadline is None:
+                deadline = monotonic() + SHM_TIMEOUT
+            elif monotonic() > deadline:
+                raise RuntimeError(COULD_NOT_GET.format(module='shm', unit='section', aux=f"seq {seq} held by writer"))
+            sleep(0.0001)
+
+    def write(self, p_func: Callable[[memoryview, int], None]) -> None:
+        seq = SEQ.unpack_from(self.__buf, self.__offset)[0] | 1
+        SEQ.pack_into(self.__buf, self.__offset, seq)
+        try:
+            p_func(self.__buf, self.__base)
+        finally:
+            SEQ.pack_into(self.__buf, self.__offset, seq + 1)
+
+    def get(self, p_struct: struct.Struct, p_offset: int = 0) -> tuple:
+        return self.read(lambda buf, base: p_struct.unpack_from(buf, base + p_offset))
+
+    def set(self, p_fmt: str, p_offset: int, *p_vals) -> None:
+        self.write(lambda buf, base: struct.pack_into(p_fmt, buf, base + p_offset, *p_vals))
+
+    def dump(self) -> bytes:
+        return self.read(lambda buf, base: bytes(buf[base:base + self.__size]))
+
+    def load(self, p_data: bytes) -> None:
+        def func(p_buf: memoryview, p_base: int) -> None:
+            p_buf[p_base:p_base + self.__size] = p_data[:self.__size]
+        self.write(func)
+
+
+def pid_alive(p_pid: int) -> bool:
+    try:
+        m_kill(p_pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class CShmFrameQueue():
+    def __init__(self, p_buf: memoryview, p_init: bool = False) -> None:
+        if len(p_buf) < QUEUE_SIZE:
+            raise RuntimeError(f"[shm] queue of {len(p_buf)} bytes, {QUEUE_SIZE} required")
+        self.__buf = p_buf
+        self.__message = None
+        self.__lock = threading.Lock()
+        self.__producer = False
+        if p_init:
+            QUEUE.pack_into(p_buf, 0, 0, 0, 0)
+
+    def __claim(self) -> None:
+        pid = getpid()
+        owner = struct.unpack_from('<q', self.__buf, 16)[0]
+        if owner not in (0, pid) and pid_alive(owner):
+            raise RuntimeError(f"[shm] frame queue is fed by process {owner}, only one producer process is allowed")
+        struct.pack_into('<q', self.__buf, 16, pid)
+        self.__producer = True
+
+    def release(self) -> None:
+        if self.__producer and struct.unpack_from('<q', self.__buf, 16)[0] == getpid():
+            struct.pack_into('<q', self.__buf, 16, 0)
+        self.__buf.release()
+
+    def qsize(self) -> int:
+        head, tail, _ = QUEUE.unpack_from(self.__buf, 0)
+        return head - tail
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def put_nowait(self, p_msg) -> None:
+        data = bytes.fromhex(p_msg.msg)[:FRAME_SIZE]
+        with self.__lock:
+            if not self.__producer:
+                self.__claim()
+            head, tail, _ = QUEUE.unpack_from(self.__buf, 0)
+            if head - tail >= QUEUE_SLOTS:
+                raise Full
+            FRAME.pack_into(self.__buf, QUEUE.size + (head % QUEUE_SLOTS) * FRAME.size, len(data), data,
+                            int(p_msg.time), int(p_msg.rx), -1 if p_msg.ticks is None else int(p_msg.ticks))
+            struct.pack_into('<Q', self.__buf, 0, head + 1)
+
+    def put(self, p_msg, p_block: bool = True, p_timeout: Union[float, None] = None) -> None:
+        deadline = None if p_timeout is None else monotonic() + p_timeout
+        while True:
+            try:
+                return self.put_nowait(p_msg)
+            except Full:
+                if not p_block or (deadline is not None and monotonic() > deadline):
+                    raise
+                sleep(0.001)
+
+    def get_nowait(self):
+        with self.__lock:
+            head, tail, _ = QUEUE.unpack_from(self.__buf, 0)
+            if head == tail:
+                raise Empty
+            size, data, ts, rx, mlat = FRAME.unpack_from(self.__buf, QUEUE.size + (tail % QUEUE_SLOTS) * FRAME.size)
+            struct.pack_into('<Q', self.__buf, 8, tail + 1)
+        if self.__message is None:
+            from ifee.ifee_adsb import CMessageADSB
+            self.__message = CMessageADSB
+        return self.__message(data[:size].hex().upper(), ts, None if mlat < 0 else mlat, rx)
+
+
+class CShmControl():
+    def __init__(self, p_section: CShmSection) -> None:
+        self.__section = p_section
+
+    @property
+    def wifi(self) -> Union[bool, None]:
+        val = self.__section.get(CONTROL)[0]
+        return None if val < 0 else bool(val)
+
+    @wifi.setter
+    def wifi(self, p_state: Union[bool, None]) -> None:
+        try:
+            assert isinstance(p_state, Union[bool, None])
+            self.__section.set('<b', 0, tristate(p_state))
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='wifi', unit='state', aux='')) from err
+
+    @property
+    def modem(self) -> Union[bool, None]:
+        val = self.__section.get(CONTROL)[1]
+        return None if val < 0 else bool(val)
+
+    @modem.setter
+    def modem(self, p_state: Union[bool, None]) -> None:
+        try:
+            assert isinstance(p_state, Union[bool, None])
+            self.__section.set('<b', 1, tristate(p_state))
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='modem', unit='state', aux='')) from err
+
+    def __str__(self) -> str:
+        return ','.join([f"{k}:{v}" for k, v in self.as_dict().items()])
+
+    def as_dict(self) -> dict:
+        wifi, modem = self.__section.get(CONTROL)
+        ret = {}
+        if modem >= 0:
+            ret['modem'] = bool(modem)
+        if wifi >= 0:
+            ret['wifi'] = bool(wifi)
+        return ret
+
+
+class CShmADSB():
+    def __init__(self, p_section: CShmSection) -> None:
+        self.__section = p_section
+        self.msg = Queue()
+
+    @property
+    def icao(self) -> Union[str, None]:
+        icao = self.__section.get(ADSB)[0].rstrip(b'\0')
+        return icao.decode('ascii') if icao else None
+
+    @icao.setter
+    def icao(self, p_val: Union[str, None]) -> None:
+        try:
+            assert isinstance(p_val, Union[str, None])
+            data = (p_val or '').encode('ascii')
+            assert len(data) <= ICAO_SIZE
+            self.__section.set(f"<{ICAO_SIZE}s", 0, data)
+        except (AssertionError, UnicodeEncodeError) as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='value', aux='')) from err
+
+    @property
+    def active(self) -> bool:
+        return self.__section.get(ADSB)[1]
+
+    @active.setter
+    def active(self, p_val: bool) -> None:
+        try:
+            assert isinstance(p_val, bool)
+            self.__section.set('<?', ICAO_SIZE, p_val)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='adsb', unit='status', aux='')) from err
+
+
+class CShmBattery():
+    def __init__(self, p_section: CShmSection, p_slot: int) -> None:
+        self.__section = p_section
+        self.__offset = BATTERY_OFFSET + p_slot * BATTERY.size
+
+    @property
+    def index(self) -> int:
+        return self.__section.get(BATTERY, self.__offset)[0]
+
+    @property
+    def power(self) -> Union[int, float]:
+        return round(self.__section.get(BATTERY, self.__offset)[1], 2)
+
+    @power.setter
+    def power(self, p_val: Union[int, float]) -> None:
+        try:
+            assert isinstance(p_val, Union[int, float])
+            self.__section.set('<d', self.__offset + 4, float(p_val))
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='power', aux='')) from err
+
+    @property
+    def level(self) -> int:
+        return self.__section.get(BATTERY, self.__offset)[2]
+
+    @level.setter
+    def level(self, p_val: int) -> None:
+        try:
+            assert isinstance(p_val, int)
+            self.__section.set('<i', self.__offset + 12, p_val)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='battery', unit='level', aux='')) from err
+
+    def __str__(self) -> str:
+        return ','.join([f"{k}:{v}" for k, v in self.as_dict().items()])
+
+    def as_dict(self) -> dict:
+        index, power, level = self.__section.get(BATTERY, self.__offset)
+        return {'index': index, 'power': power, 'level': level}
+
+
+class CShmTemperature():
+    def __init__(self, p_section: CShmSection, p_slot: int) -> None:
+        self.__section = p_section
+        self.__offset = TEMPERATURE_OFFSET + p_slot * TEMPERATURE.size
+
+    @property
+    def name(self) -> str:
+        return self.__section.get(TEMPERATURE, self.__offset)[0].rstrip(b'\0').decode('UTF8', 'replace')
+
+    @property
+    def value(self) -> Union[float, int]:
+        return round(self.__section.get(TEMPERATURE, self.__offset)[1], 2)
+
+    @value.setter
+    def value(self, p_val: Union[float, int]) -> None:
+        try:
+            assert isinstance(p_val, (float, int))
+            self.__section.set('<d', self.__offset + NAME_SIZE, float(p_val))
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='temperature', unit='value', aux='')) from err
+
+    def __str__(self) -> str:
+        return ','.join([f"{k}:{v}" for k, v in self.as_dict().items()])
+
+    def as_dict(self) -> dict:
+        name, value = self.__section.get(TEMPERATURE, self.__offset)
+        return {'name': name.rstrip(b'\0').decode('UTF8', 'replace'), 'value': value}
+
+
+class CShmMonitoring():
+    def __init__(self, p_track: CShmSection, p_sensors: CShmSection) -> None:
+        self.__track = p_track
+        self.__sensors = p_sensors
+        self.__bat = [CShmBattery(p_sensors, slot) for slot in range(MAX_BATTERIES)]
+        self.__tmp = [CShmTemperature(p_sensors, slot) for slot in range(MAX_TEMPERATURES)]
+
+    @property
+    def pwr(self) -> bool:
+        return self.__sensors.get(SENSORS)[0]
+
+    @pwr.setter
+    def pwr(self, p_val: bool) -> None:
+        try:
+            assert isinstance(p_val, bool)
+            self.__sensors.set('<?', 0, p_val)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='power unit', unit='state', aux='')) from err
+
+    @property
+    def bat(self) -> List[CShmBattery]:
+        return self.__bat[:self.__sensors.get(SENSORS)[1]]
+
+    @bat.setter
+    def bat(self, p_val: List[CBattery]) -> None:
+        try:
+            assert isinstance(p_val, list) and len(p_val) <= MAX_BATTERIES
+            items = [bat.as_dict() for bat in p_val]
+        except (AssertionError, AttributeError) as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='batteries', unit='states', aux='')) from err
+
+        def func(p_buf: memoryview, p_base: int) -> None:
+            for slot, item in enumerate(items):
+                BATTERY.pack_into(p_buf, p_base + BATTERY_OFFSET + slot * BATTERY.size,
+                                  int(item['index']), float(item['power']), int(item['level']))
+            struct.pack_into('<B', p_buf, p_base + 1, len(items))
+        self.__sensors.write(func)
+
+    @property
+    def tmp(self) -> List[CShmTemperature]:
+        return self.__tmp[:self.__sensors.get(SENSORS)[2]]
+
+    @tmp.setter
+    def tmp(self, p_val: List[CTemperature]) -> None:
+        try:
+            assert isinstance(p_val, list) and len(p_val) <= MAX_TEMPERATURES
+            items = [tmp.as_dict() for tmp in p_val]
+        except (AssertionError, AttributeError) as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='temperatures', unit='values', aux='')) from err
+
+        def func(p_buf: memoryview, p_base: int) -> None:
+            for slot, item in enumerate(items):
+                TEMPERATURE.pack_into(p_buf, p_base + TEMPERATURE_OFFSET + slot * TEMPERATURE.size,
+                                      str(item['name']).encode('UTF8')[:NAME_SIZE], float(item['value']))
+            struct.pack_into('<B', p_buf, p_base + 2, len(items))
+        self.__sensors.write(func)
+
+    @property
+    def vel(self) -> int:
+        return self.__track.get(TRACK)[0]
+
+    @vel.setter
+    def vel(self, p_val: int) -> None:
+        try:
+            assert isinstance(p_val, int)
+            self.__track.set('<i', 0, p_val)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='velocity', unit='speed', aux='')) from err
+
+    @property
+    def alt(self) -> int:
+        return self.__track.get(TRACK)[1]
+
+    @alt.setter
+    def alt(self, p_val: int) -> None:
+        try:
+            assert isinstance(p_val, int)
+            self.__track.set('<i', 4, p_val)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='altitude', unit='value', aux='')) from err
+
+    @property
+    def pos(self) -> CPosition:
+        _, _, lat, lon = self.__track.get(TRACK)
+        return CPosition(None if math.isnan(lat) else lat, None if math.isnan(lon) else lon)
+
+    @pos.setter
+    def pos(self, p_val: CPosition) -> None:
+        try:
+            assert isinstance(p_val, CPosition)
+            lat = math.nan if p_val.lat is None else float(p_val.lat)
+            lon = math.nan if p_val.lon is None else float(p_val.lon)
+            self.__track.set('<dd', 8, lat, lon)
+        except AssertionError as err:
+            raise RuntimeError(COULD_NOT_SET.format(module='position', unit='lotitude, longitude', aux='')) from err
+
+    def as_dict(self) -> dict:
+        vel, alt, lat, lon = self.__track.get(TRACK)
+        pwr = self.pwr
+        ret = {}
+        ret['powerunit'] = int(pwr)
+        ret['batteries'] = [bat.as_dict() for bat in self.bat]
+        ret['temperature'] = [tmp.as_dict() for tmp in self.tmp]
+        ret['velocity'] = vel
+        ret['altitude'] = alt
+        ret['position'] = {'lat': None if math.isnan(lat) else lat, 'lon': None if math.isnan(lon) else lon}
+        return ret
+
+    def __str__(self) -> str:
+        return str(self.as_dict())
+
+
+class CSyncView():
+    def __init__(self, p_buf: Union[memoryview, bytearray], p_init: bool = False) -> None:
+        buf = memoryview(p_buf)
+        if len(buf) < SHM_SIZE:
+            raise RuntimeError(f"[shm] buffer of {len(buf)} bytes, {SHM_SIZE} required")
+
+        if p_init:
+            HEADER.pack_into(buf, 0, SHM_MAGIC, SHM_VERSION, 0)
+        else:
+            magic, version, _ = HEADER.unpack_from(buf, 0)
+            if magic != SHM_MAGIC or version != SHM_VERSION:
+                raise RuntimeError(f"[shm] incompatible layout {magic!r} v{version}")
+
+        self.__buf = buf
+        self.__sections = {
+            'control': CShmSection(buf, CONTROL_OFFSET, CONTROL.size),
+            'adsb': CShmSection(buf, ADSB_OFFSET, ADSB.size),
+            'track': CShmSection(buf, TRACK_OFFSET, TRACK.size),
+            'sensors': CShmSection(buf, SENSORS_OFFSET, TEMPERATURE_OFFSET + MAX_TEMPERATURES * TEMPERATURE.size)
+        }
+        self.control = CShmControl(self.__sections['control'])
+        self.adsb = CShmADSB(self.__sections['adsb'])
+        self.monitoring = CShmMonitoring(self.__sections['track'], self.__sections['sensors'])
+
+        if p_init:
+            self.control.wifi = True
+            self.control.modem = True
+            self.adsb.active = True
+            self.monitoring.pwr = True
+            self.monitoring.pos = CPosition()
+
+    @property
+    def sections(self) -> dict:
+        return dict(self.__sections)
+
+    def dump(self) -> bytes:
+        return HEADER.pack(SHM_MAGIC, SHM_VERSION, 0) + b''.join(
+            [SEQ.pack(0) + section.dump() for section in self.__sections.values()])
+
+    def release(self) -> None:
+        self.control = self.adsb = self.monitoring = None
+        self.__sections = {}
+        self.__buf.release()
+
+
+class CSharedSyncObj(CSyncView):
+    def __init__(self, p_name: str = SHM_NAME, p_create: bool = False) -> None:
+        self.__owner = False
+        try:
+            if p_create:
+                try:
+                    self.__shm = shared_memory.SharedMemory(name=p_name, create=True, size=SHM_TOTAL)
+                    self.__owner = True
+                except FileExistsError:
+                    self.__shm = shared_memory.SharedMemory(name=p_name)
+            else:
+                self.__shm = shared_memory.SharedMemory(name=p_name)
+            resource_tracker.unregister(self.__shm._name, 'shared_memory')
+            if self.__shm.size < SHM_TOTAL:
+                self.__shm.close()
+                raise ValueError(f"stale segment of {self.__shm.size} bytes")
+        except (OSError, ValueError) as err:
+            raise RuntimeError(f"[shm] {p_name}: {str(err)}") from err
+
+        try:
+            super().__init__(self.__shm.buf[:SHM_SIZE], self.__owner)
+        except RuntimeError as err:
+            self.__shm.close()
+            raise RuntimeError(f"[shm] {p_name}: {str(err)}") from err
+        self.adsb.msg = CShmFrameQueue(self.__shm.buf[SHM_SIZE:SHM_TOTAL], self.__owner)
+
+    def __str__(self) -> str:
+        return ','.join([f"name:{self.__shm.name}", f"size:{self.__shm.size}", f"owner:{self.__owner}"])
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    def close(self) -> None:
+        self.adsb.msg.release()
+        self.release()
+        self.__shm.close()
+
+    def unlink(self) -> None:
+        if self.__owner:
+            resource_tracker.register(self.__shm._name, 'shared_memory')
+            self.__shm.unlink()
+
+
+def attach_shared_state(p_name: str = SHM_NAME, p_create: bool = False) -> CSharedSyncObj:
+    state = CSharedSyncObj(p_name, p_create)
+    CSingleton._instances[CSyncObj] = state
+    return state
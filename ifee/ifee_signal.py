@@ -0,0 +1,164 @@
+import asyncio
+import threading
+from collections import deque
+from time import time
+from logging import getLogger
+from typing import Union, List, Dict
+from ifee.ifee_common import CSingleton
+
+
+SIGNAL_RATE = 1
+SIGNAL_SIZE = 300
+SIGNAL_RESCAN = 30
+SIGNAL_TECHS = ('Nr5g', 'Lte', 'Umts', 'Gsm', 'Evdo', 'Cdma')
+SIGNAL_KEYS = {'rssi': 'rssi', 'rsrp': 'rsrp', 'rsrq': 'rsrq', 'snr': 'sinr', 'sinr': 'sinr'}
+
+logger = getLogger("[signal]")
+
+
+def parse_signal(p_props: dict) -> Union[dict, None]:
+    for tech in SIGNAL_TECHS:
+        values = p_props.get(tech)
+        if not values:
+            continue
+        ret = {'tech': tech.lower()}
+        for key, val in dict(values).items():
+            name = SIGNAL_KEYS.get(str(key))
+            if name and name not in ret:
+                ret[name] = float(val)
+        if len(ret) > 1:
+            return ret
+    return None
+
+
+class CSignalSampler(CSingleton):
+    def __init__(self) -> None:
+        if '_CSignalSampler__history' in self.__dict__:
+            return
+        self.__rate = SIGNAL_RATE
+        self.__size = SIGNAL_SIZE
+        self.__lock = threading.Lock()
+        self.__history = {}
+        self.__modems = {}
+        self.__bus = None
+        self.__receiver = None
+
+    def __str__(self) -> str:
+        return ','.join([f"{index}:{len(samples)}" for index, samples in self.__history.items()])
+
+    @property
+    def rate(self) -> int:
+        return self.__rate
+
+    def setup(self, p_rate: int = SIGNAL_RATE, p_size: int = SIGNAL_SIZE) -> None:
+        with self.__lock:
+            self.__rate = p_rate
+            if p_size != self.__size:
+                self.__size = p_size
+                self.__history = {k: deque(v, maxlen=p_size) for k, v in self.__history.items()}
+
+    def add(self, p_index: int, p_props: dict, p_time: Union[float, None] = None) -> None:
+        sample = parse_signal(p_props)
+        if sample is None:
+            return
+        sample['time'] = p_time or time()
+        with self.__lock:
+            if p_index not in self.__history:
+                self.__history[p_index] = deque(maxlen=self.__size)
+            self.__history[p_index].append(sample)
+
+    def latest(self, p_index: int) -> Union[dict, None]:
+        with self.__lock:
+            samples = self.__history.get(p_index)
+            return dict(samples[-1]) if samples else None
+
+    def history(self, p_index: int) -> List[dict]:
+        with self.__lock:
+            return [dict(sample) for sample in self.__history.get(p_index, ())]
+
+    def as_dict(self) -> Dict[int, dict]:
+        ret = {}
+        with self.__lock:
+            items = [(index, list(samples)) for index, samples in self.__history.items()]
+        for index, samples in items:
+            if not samples:
+                continue
+            stats = {'latest': dict(samples[-1]), 'samples': len(samples)}
+            for key in ('rssi', 'rsrp', 'rsrq', 'sinr'):
+                values = [s[key] for s in samples if key in s]
+                if values:
+                    stats[key] = {'min': min(values), 'max': max(values), 'avg': sum(values) / len(values)}
+            ret[index] = stats
+        return ret
+
+    def __changed(self, p_interface, p_changed, p_invalidated, path=None) -> None:
+        from ifee.ifee_dbus import MM_DBUS_INTERFACE_SIGNAL
+
+        index = self.__modems.get(str(path))
+        if index is None or str(p_interface) != MM_DBUS_INTERFACE_SIGNAL:
+            return
+        self.add(index, p_changed)
+
+    def scan(self) -> List[int]:
+        from dbus import Interface, DBusException
+        from ifee.ifee_dbus import get_signal_bus, DBUS_INTERFACE_PROPERTIES, MM_DBUS_PROXY, MM_DBUS_PATH, \
+            MM_DBUS_SERVICE, MM_DBUS_INTERFACE, MM_DBUS_INTERFACE_SIGNAL
+
+        if self.__bus is None:
+            self.__bus = get_signal_bus()
+            self.__receiver = self.__bus.add_signal_receiver(self.__changed, 'PropertiesChanged', DBUS_INTERFACE_PROPERTIES,
+                                                             MM_DBUS_SERVICE, path_keyword='path')
+        try:
+            manager = Interface(self.__bus.get_object(MM_DBUS_PROXY, MM_DBUS_PATH), MM_DBUS_INTERFACE)
+            paths = [str(path) for path in manager.GetManagedObjects()]
+        except DBusException as err:
+            raise RuntimeError(f"[signal] get modems: {str(err)}") from err
+
+        for path in paths:
+            if path in self.__modems:
+                continue
+            index = int(path.split('/')[-1])
+            proxy = self.__bus.get_object(MM_DBUS_PROXY, path)
+            try:
+                Interface(proxy, MM_DBUS_INTERFACE_SIGNAL).Setup(self.__rate)
+                props = Interface(proxy, DBUS_INTERFACE_PROPERTIES).GetAll(MM_DBUS_INTERFACE_SIGNAL)
+            except DBusException as err:
+                logger.error("modem %d setup failed: %s", index, str(err))
+                continue
+            self.__modems[path] = index
+            self.add(index, props)
+            logger.info("modem %d sampled every %ds", index, self.__rate)
+
+        for path in set(self.__modems) - set(paths):
+            logger.info("modem %d removed", self.__modems.pop(path))
+        return list(self.__modems.values())
+
+    def stop(self) -> None:
+        from dbus import Interface, DBusException
+        from ifee.ifee_dbus import MM_DBUS_PROXY, MM_DBUS_INTERFACE_SIGNAL
+
+        if self.__bus is None:
+            return
+        for path, index in self.__modems.items():
+            try:
+                Interface(self.__bus.get_object(MM_DBUS_PROXY, path), MM_DBUS_INTERFACE_SIGNAL).Setup(0)
+            except DBusException as err:
+                logger.error("modem %d stop failed: %s", index, str(err))
+        if self.__receiver is not None:
+            self.__receiver.remove()
+        self.__modems = {}
+        self.__receiver = None
+        self.__bus = None
+
+
+async def sample_signal(p_rate: int = SIGNAL_RATE, p_size: int = SIGNAL_SIZE, p_rescan: float = SIGNAL_RESCAN) -> None:
+    logger.debug("started")
+    sampler = CSignalSampler()
+    sampler.setup(p_rate, p_size)
+    try:
+        while True:
+            await asyncio.to_thread(sampler.scan)
+            await asyncio.sleep(p_rescan)
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        await asyncio.to_thread(sampler.stop)
+        logger.info("stopped")
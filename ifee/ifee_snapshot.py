@@ -0,0 +1,121 @@
+import asyncio
+import struct
+from os import makedirs as m_mkdir, path as m_path, replace as m_replace, fsync as m_fsync
+from time import time
+from logging import getLogger
+from typing import Union
+from ifee.ifee_common import CSyncObj, CBattery, CTemperature, CPosition, COULD_NOT_GET, COULD_NOT_SET
+from ifee.ifee_shm import CSyncView, SHM_SIZE
+
+
+SNAPSHOT_MAGIC = b'IFSN'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_AGE = 300
+CONTROL_AGE = 86400
+ICAO_AGE = 86400
+
+SNAPSHOT = struct.Struct('<4sHHd')
+
+logger = getLogger("[snapshot]")
+
+
+def pack_state(p_status=None) -> bytes:
+    status = p_status or CSyncObj()
+    if isinstance(status, CSyncView):
+        return status.dump()
+
+    view = CSyncView(bytearray(SHM_SIZE), True)
+    view.control.wifi = status.control.wifi
+    view.control.modem = status.control.modem
+    view.adsb.icao = status.adsb.icao
+    view.adsb.active = status.adsb.active
+    view.monitoring.pwr = status.monitoring.pwr
+    view.monitoring.vel = int(status.monitoring.vel)
+    view.monitoring.alt = int(status.monitoring.alt)
+    view.monitoring.pos = status.monitoring.pos
+    view.monitoring.bat = list(status.monitoring.bat)
+    view.monitoring.tmp = list(status.monitoring.tmp)
+    ret = view.dump()
+    view.release()
+    return ret
+
+
+def save_state(p_path: str, p_data: Union[bytes, None] = None) -> bytes:
+    data = p_data if p_data is not None else pack_state()
+    tmp = p_path + '.tmp'
+    try:
+        m_mkdir(m_path.dirname(p_path) or '.', mode=493, exist_ok=True)
+        with open(tmp, 'wb') as snapshot:
+            snapshot.write(SNAPSHOT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, time()) + data)
+            snapshot.flush()
+            m_fsync(snapshot.fileno())
+        m_replace(tmp, p_path)
+    except OSError as err:
+        raise RuntimeError(COULD_NOT_SET.format(module='snapshot', unit='state', aux=p_path)) from err
+    return data
+
+
+def restore_state(p_path: str, p_max_age: float = SNAPSHOT_AGE, p_control_age: float = CONTROL_AGE,
+                  p_icao_age: float = ICAO_AGE) -> dict:
+    try:
+        with open(p_path, 'rb') as snapshot:
+            data = snapshot.read()
+    except FileNotFoundError:
+        return {}
+    except OSError as err:
+        raise RuntimeError(COULD_NOT_GET.format(module='snapshot', unit='state', aux=p_path)) from err
+
+    try:
+        magic, version, _, saved = SNAPSHOT.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"incompatible snapshot {magic!r} v{version}")
+        view = CSyncView(bytearray(data[SNAPSHOT.size:]))
+    except (struct.error, ValueError, RuntimeError) as err:
+        logger.error("ignore snapshot %s: %s", p_path, str(err))
+        return {}
+
+    status = CSyncObj()
+    age = time() - saved
+    ret = {'age': round(age, 3)}
+
+    if 0 <= age <= p_control_age:
+        if view.control.wifi is not None:
+            status.control.wifi = view.control.wifi
+        if view.control.modem is not None:
+            status.control.modem = view.control.modem
+        ret['control'] = view.control.as_dict()
+
+    if 0 <= age <= p_icao_age and not status.adsb.icao and view.adsb.icao:
+        status.adsb.icao = view.adsb.icao
+        ret['icao'] = view.adsb.icao
+
+    if 0 <= age <= p_max_age:
+        status.adsb.active = view.adsb.active
+        status.monitoring.vel = view.monitoring.vel
+        status.monitoring.alt = view.monitoring.alt
+        pos = view.monitoring.pos
+        if pos.lat is not None and pos.lon is not None:
+            status.monitoring.pos = CPosition(pos.lat, pos.lon)
+        status.monitoring.pwr = view.monitoring.pwr
+        status.monitoring.bat = [CBattery(b['index'], b['power'], b['level']) for b in [bat.as_dict() for bat in view.monitoring.bat]]
+        status.monitoring.tmp = [CTemperature(t['name'], t['value']) for t in [tmp.as_dict() for tmp in view.monitoring.tmp]]
+        ret['active'] = view.adsb.active
+        ret['monitoring'] = view.monitoring.as_dict()
+
+    view.release()
+    logger.info("restored %s", str(ret))
+    return ret
+
+
+async def snapshot_state(p_path: str, p_delay: float = 5) -> None:
+    logger.debug("started")
+    last = None
+    try:
+        while True:
+            data = pack_state()
+            if data != last:
+                last = await asyncio.to_thread(save_state, p_path, data)
+            await asyncio.sleep(p_delay)
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        save_state(p_path)
+        logger.info("stopped")
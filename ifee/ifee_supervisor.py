@@ -0,0 +1,324 @@
+import asyncio
+import json
+import signal
+from dataclasses import dataclass, fields
+from os import remove as m_remove
+from logging import getLogger
+from time import monotonic
+from typing import Union, Callable, Coroutine, Dict
+from ifee.ifee_common import CSyncObj, CCacheICAO, COULD_NOT_GET
+
+
+logger = getLogger("[supervisor]")
+
+
+@dataclass
+class CSupervisorConfig():
+    modem:          int               = 0
+    lte:            str               = 'lte'
+    vpn:            str               = 'vpn'
+    lte_host:       str               = '8.8.8.8'
+    vpn_host:       str               = '10.0.0.1'
+    wifi:           str               = 'wifi'
+    uplink:         bool              = False
+    uplink_host:    str               = '8.8.8.8'
+    uplink_url:     Union[str, None]  = None
+    uplink_bytes:   int               = 262144
+    uplink_delay:   float             = 30
+    icao:           Union[str, None]  = None
+    box_id:         Union[str, None]  = None
+    ground_url:     Union[str, None]  = None
+    ground_user:    Union[str, None]  = None
+    ground_pass:    Union[str, None]  = None
+    icao_cache:     str               = '/var/lib/ifee/icao.json'
+    icao_ttl:       int               = 86400
+    icao_refresh:   float             = 600
+    forward:        Union[str, None]  = None
+    forward_path:   str               = 'api/box/telemetry'
+    forward_sample: float             = 5
+    forward_batch:  int               = 500
+    aircraft_prom:  str               = '/var/lib/prom/aircraft.prom'
+    metrics_prom:   str               = '/var/lib/prom/kontron.prom'
+    watchdog:       bool              = True
+    adsb:           bool              = True
+    decode_process: bool              = False
+    decode_workers: int               = 1
+    decode_all:     bool              = False
+    crc_correct:    bool              = True
+    dedup_window:   float             = 1.0
+    gate_zones:     Union[str, None]  = None
+    gate_speed_off: float             = 160
+    gate_speed_on:  float             = 80
+    gate_alt_off:   float             = 2000
+    gate_alt_on:    float             = 1000
+    gate_hold:      float             = 30
+    gate_lead:      float             = 10
+    profile:        bool              = False
+    profile_prom:   str               = '/var/lib/prom/profile.prom'
+    profile_dump:   Union[str, None]  = None
+    sensors:        bool              = False
+    sensors_root:   str               = '/sys/class'
+    sensors_delay:  float             = 5
+    signal:         bool              = False
+    signal_rate:    int               = 1
+    signal_size:    int               = 300
+    signal_prom:    str               = '/var/lib/prom/signal.prom'
+    backoff_min:    float             = 1
+    backoff_max:    float             = 60
+    shutdown_delay: float             = 15
+    snapshot:       Union[str, None]  = None
+    snapshot_delay: float             = 5
+    snapshot_age:   float             = 300
+    shm_name:       Union[str, None]  = None
+    shm_create:     bool              = True
+    log_level:      str               = 'INFO'
+    log_rate:       int               = 20
+    log_period:     float             = 10
+
+    @classmethod
+    def load(cls, p_path: Union[str, None] = None, **p_overrides) -> 'CSupervisorConfig':
+        data = {}
+        if p_path:
+            try:
+                with open(p_path, 'r', encoding='UTF8') as config:
+                    data = json.loads(config.read())
+            except (OSError, json.decoder.JSONDecodeError) as err:
+                raise RuntimeError(COULD_NOT_GET.format(module='supervisor', unit='config', aux=p_path)) from err
+
+        names = {f.name for f in fields(cls)}
+        unknown = set(data) - names
+        if unknown:
+            raise RuntimeError(f"[supervisor] unknown config keys: {','.join(sorted(unknown))}")
+        data.update({k: v for k, v in p_overrides.items() if v is not None and k in names})
+        return cls(**data)
+
+
+class CSupervisor():
+    def __init__(self, p_config: CSupervisorConfig) -> None:
+        self.__config = p_config
+        self.__jobs = {}
+        self.__tasks = {}
+        self.__stop = None
+        self.__restarts = {}
+        self.__running = {}
+        self.__restart = set()
+        self.__resolver = None
+
+    def __str__(self) -> str:
+        return ','.join([f"{name}:{self.__restarts.get(name, 0)}" for name in self.__jobs])
+
+    @property
+    def restarts(self) -> Dict[str, int]:
+        return dict(self.__restarts)
+
+    def add(self, p_name: str, p_factory: Callable[[], Coroutine]) -> None:
+        self.__jobs[p_name] = p_factory
+
+    def restart(self, p_name: str) -> None:
+        job = self.__running.get(p_name)
+        if job and not job.done():
+            self.__restart.add(p_name)
+            job.cancel()
+
+    async def __supervise(self, p_name: str, p_factory: Callable[[], Coroutine]) -> None:
+        backoff = self.__config.backoff_min
+        while not self.__stop.is_set():
+            started = monotonic()
+            try:
+                self.__running[p_name] = asyncio.create_task(p_factory())
+                await self.__running[p_name]
+                if self.__stop.is_set():
+                    break
+                if p_name in self.__restart:
+                    self.__restart.discard(p_name)
+                    logger.info("%s restarted", p_name)
+                    continue
+                logger.warning("%s exited", p_name)
+            except asyncio.CancelledError:
+                if p_name not in self.__restart or self.__stop.is_set():
+                    break
+                self.__restart.discard(p_name)
+                logger.info("%s restarted", p_name)
+                continue
+            except Exception as err:
+                logger.exception("%s failed: %s", p_name, str(err))
+
+            if monotonic() - started > self.__config.backoff_max:
+                backoff = self.__config.backoff_min
+
+            self.__restarts[p_name] = self.__restarts.get(p_name, 0) + 1
+            logger.info("restart %s in %.1fs", p_name, backoff)
+            try:
+                await asyncio.wait_for(self.__stop.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.__config.backoff_max)
+
+    def __resolve_icao(self) -> None:
+        status = CSyncObj()
+        config = self.__config
+
+        if config.icao:
+            status.adsb.icao = config.icao
+            return
+
+        if not (config.box_id and config.ground_url):
+            return
+
+        icao = self.__icao_resolver().resolve(config.box_id)
+        if icao and icao != status.adsb.icao:
+            status.adsb.icao = icao
+            logger.info("icao: %s", icao)
+
+    def __icao_resolver(self) -> 'CResolverICAO':
+        from ifee.ifee_ground import CResolverICAO, get_ground_client
+
+        config = self.__config
+        if self.__resolver is None:
+            try:
+                cache = CCacheICAO(config.icao_cache)
+            except RuntimeError as err:
+                logger.error("%s, discard icao cache", str(err))
+                m_remove(config.icao_cache)
+                cache = CCacheICAO(config.icao_cache)
+            client = get_ground_client(config.ground_url, config.ground_user or '', config.ground_pass or '')
+            self.__resolver = CResolverICAO(cache, client, config.icao_ttl)
+        return self.__resolver
+
+    async def __refresh_icao(self) -> None:
+        logger.debug("icao refresh started")
+        status = CSyncObj()
+        config = self.__config
+        resolver = self.__icao_resolver()
+
+        try:
+            while True:
+                await asyncio.sleep(config.icao_refresh)
+                if not resolver.stale(config.box_id):
+                    continue
+                icao = await resolver.refresh(config.box_id)
+                if icao and icao != status.adsb.icao:
+                    logger.info("icao: %s -> %s", status.adsb.icao, icao)
+                    status.adsb.icao = icao
+                    self.restart('parse_adsb')
+        except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+            logger.debug("icao refresh stopped")
+
+    async def __parse_adsb(self) -> None:
+        self.__resolve_icao()
+
+        if self.__config.decode_process or self.__config.decode_all:
+            from ifee.ifee_decoder import parse_adsb_process
+            await parse_adsb_process(self.__config.decode_workers, p_correct=self.__config.crc_correct,
+                                     p_dedup=self.__config.dedup_window, p_all=self.__config.decode_all)
+        else:
+            from ifee.ifee_adsb import parse_adsb
+            await parse_adsb(self.__config.crc_correct, self.__config.dedup_window)
+
+    def __setup(self) -> None:
+        config = self.__config
+
+        if config.profile:
+            from ifee.ifee_profiler import monitor_loop
+            from ifee.ifee_monitoring import collect_profile
+            self.add('profiler', lambda: monitor_loop(p_dump_path=config.profile_dump))
+            self.add('collect_profile', lambda: collect_profile(config.profile_prom))
+
+        if config.snapshot:
+            from ifee.ifee_snapshot import snapshot_state
+            self.add('snapshot', lambda: snapshot_state(config.snapshot, config.snapshot_delay))
+
+        if config.watchdog:
+            from ifee.ifee_watchdog import watch_dog
+            self.add('watch_dog', lambda: watch_dog(config.modem, config.lte, config.vpn, config.lte_host, config.vpn_host))
+
+        if config.forward and config.box_id and config.ground_url:
+            from ifee.ifee_forward import forward_telemetry
+            from ifee.ifee_ground import get_ground_client
+            client = get_ground_client(config.ground_url, config.ground_user or '', config.ground_pass or '')
+            self.add('forward', lambda: forward_telemetry(config.forward, client, config.box_id, config.forward_path,
+                                                          config.forward_sample, config.forward_batch))
+
+        if config.uplink:
+            from ifee.ifee_uplink import manage_uplink
+            self.add('uplink', lambda: manage_uplink(config.lte, config.wifi, config.uplink_host, config.uplink_url,
+                                                     config.uplink_bytes, config.uplink_delay))
+
+        if config.sensors:
+            from ifee.ifee_sensors import sample_sensors
+            self.add('sensors', lambda: sample_sensors(config.sensors_root, config.sensors_delay))
+
+        if config.signal:
+            from ifee.ifee_signal import sample_signal
+            from ifee.ifee_monitoring import collect_signal
+            self.add('signal', lambda: sample_signal(config.signal_rate, config.signal_size))
+            self.add('collect_signal', lambda: collect_signal(config.signal_prom))
+
+        if config.adsb:
+            from ifee.ifee_geofence import build_gate
+            build_gate(config.gate_zones, (config.gate_speed_off, config.gate_speed_on),
+                       (config.gate_alt_off, config.gate_alt_on), config.gate_hold,
+                       config.gate_lead)
+            self.add('parse_adsb', self.__parse_adsb)
+            if not config.icao and config.box_id and config.ground_url:
+                self.add('refresh_icao', self.__refresh_icao)
+
+        from ifee.ifee_monitoring import collect_aircraft, collect_metrics
+        self.add('collect_aircraft', lambda: collect_aircraft(config.aircraft_prom, config.decode_all))
+        self.add('collect_metrics', lambda: collect_metrics(config.metrics_prom))
+
+    def stop(self) -> None:
+        if self.__stop and not self.__stop.is_set():
+            logger.info("shutdown requested")
+            self.__stop.set()
+
+    async def run(self) -> None:
+        self.__stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        shared = None
+        if self.__config.shm_name:
+            from ifee.ifee_shm import attach_shared_state
+            shared = attach_shared_state(self.__config.shm_name, self.__config.shm_create)
+            logger.info("shared state: %s", str(shared))
+
+        if self.__config.snapshot:
+            from ifee.ifee_snapshot import restore_state
+            try:
+                restore_state(self.__config.snapshot, self.__config.snapshot_age, p_icao_age=self.__config.icao_ttl)
+            except RuntimeError as err:
+                logger.error("%s", str(err))
+
+        if not self.__jobs:
+            self.__setup()
+
+        if self.__config.profile:
+            from ifee.ifee_profiler import CProfiler
+            CProfiler().install()
+
+        logger.info("started: %s", ','.join(self.__jobs))
+        for name, factory in self.__jobs.items():
+            self.__tasks[name] = asyncio.create_task(self.__supervise(name, factory), name=name)
+
+        await self.__stop.wait()
+
+        for task in self.__tasks.values():
+            task.cancel()
+        _, pending = await asyncio.wait(self.__tasks.values(), timeout=self.__config.shutdown_delay)
+        for task in pending:
+            logger.error("%s did not stop in %.1fs", task.get_name(), self.__config.shutdown_delay)
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        if shared:
+            shared.unlink()
+        logger.info("stopped")
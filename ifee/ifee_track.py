@@ -0,0 +1,107 @@
+from collections import deque
+from typing import Union
+import numpy as np
+
+
+TRACK_WINDOW = 20
+TRACK_SPAN = 30
+TRACK_MIN = 4
+TRACK_GATE = 25
+TRACK_SIGMA = 4
+TRACK_REJECT = 3
+
+
+class CTrackFilter():
+    def __init__(self, p_window: int = TRACK_WINDOW, p_span: float = TRACK_SPAN, p_gate: float = TRACK_GATE,
+                 p_sigma: float = TRACK_SIGMA) -> None:
+        self.__span = p_span
+        self.__gate = p_gate
+        self.__sigma = p_sigma
+        self.__times = deque(maxlen=p_window)
+        self.__values = deque(maxlen=p_window)
+        self.__value = None
+        self.__rate = 0.0
+        self.__spread = 0.0
+        self.__time = None
+        self.__streak = 0
+        self.__rejected = 0
+
+    def __str__(self) -> str:
+        return ','.join([f"value:{self.__value}", f"rate:{round(self.__rate, 3)}", f"rejected:{self.__rejected}"])
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    @property
+    def value(self) -> Union[float, None]:
+        return self.__value
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    @property
+    def rejected(self) -> int:
+        return self.__rejected
+
+    def reset(self) -> None:
+        self.__times.clear()
+        self.__values.clear()
+        self.__value = None
+        self.__rate = 0.0
+        self.__spread = 0.0
+        self.__time = None
+        self.__streak = 0
+
+    def predict(self, p_time: float) -> Union[float, None]:
+        if self.__value is None:
+            return None
+        return self.__value + self.__rate * (p_time - self.__time)
+
+    def __fit(self) -> None:
+        times = np.fromiter(self.__times, dtype=np.float64, count=len(self.__times))
+        values = np.fromiter(self.__values, dtype=np.float64, count=len(self.__values))
+        offsets = times - times.mean()
+        denom = float(offsets @ offsets)
+        rate = float(offsets @ (values - values.mean())) / denom if denom > 0 else 0.0
+        fitted = values.mean() + rate * offsets
+        self.__rate = rate
+        self.__value = float(fitted[-1])
+        self.__spread = 1.4826 * float(np.median(np.abs(values - fitted)))
+        self.__time = float(times[-1])
+
+    def add(self, p_time: float, p_val: float) -> bool:
+        while self.__times and p_time - self.__times[0] > self.__span:
+            self.__times.popleft()
+            self.__values.popleft()
+
+        if len(self.__values) >= TRACK_MIN:
+            residual = abs(p_val - self.predict(p_time))
+            if residual > max(self.__gate, self.__sigma * self.__spread):
+                self.__streak += 1
+                if self.__streak < TRACK_REJECT:
+                    self.__rejected += 1
+                    return False
+                self.reset()
+        self.__streak = 0
+
+        self.__times.append(p_time)
+        self.__values.append(p_val)
+        if len(self.__values) < TRACK_MIN:
+            self.__value, self.__rate, self.__time = p_val, 0.0, p_time
+            return True
+        self.__fit()
+        return True
+
+    def crossing(self, p_threshold: float) -> Union[float, None]:
+        if self.__value is None or len(self.__values) < TRACK_MIN:
+            return None
+        if self.__value >= p_threshold:
+            return 0.0
+        if self.__rate <= 0:
+            return None
+        return (p_threshold - self.__value) / self.__rate
+
+    def as_dict(self) -> dict:
+        return {'value': self.__value, 'rate': round(self.__rate, 3), 'samples': len(self.__values),
+                'rejected': self.__rejected}
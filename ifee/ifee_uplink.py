@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from time import time, perf_counter
+from logging import getLogger
+from typing import Union, Dict
+import ping3
+import requests
+from ifee.ifee_common import CSingleton, CSyncObj
+from ifee.ifee_ground import CBoundAdapter, route_ground_clients
+
+
+UPLINK_DELAY = 30
+UPLINK_MARGIN = 0.2
+PROBE_BYTES = 262144
+PROBE_TIMEOUT = 5
+
+logger = getLogger("[uplink]")
+
+
+def probe_rtt(p_host: str, p_interface: str) -> Union[float, None]:
+    try:
+        rtt = ping3.ping(p_host, timeout=1, interface=p_interface)
+    except (ping3.errors.PingError, PermissionError, OSError) as err:
+        logger.debug("ping %s via %s failed: %s", p_host, p_interface, str(err))
+        return None
+    return float(rtt) if rtt else None
+
+
+def probe_throughput(p_url: str, p_interface: str, p_bytes: int = PROBE_BYTES) -> Union[float, None]:
+    received = 0
+    with requests.Session() as session:
+        adapter = CBoundAdapter(p_interface, pool_connections=1, pool_maxsize=1, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        try:
+            start = perf_counter()
+            with session.get(p_url, stream=True, timeout=PROBE_TIMEOUT) as res:
+                res.raise_for_status()
+                for chunk in res.iter_content(65536):
+                    received += len(chunk)
+                    if received >= p_bytes:
+                        break
+            elapsed = perf_counter() - start
+        except (requests.exceptions.RequestException, OSError) as err:
+            logger.debug("probe %s via %s failed: %s", p_url, p_interface, str(err))
+            return None
+    return received / elapsed if received and elapsed > 0 else None
+
+
+def probe_link(p_interface: str, p_host: str, p_url: Union[str, None] = None, p_bytes: int = PROBE_BYTES) -> dict:
+    return {
+        'interface': p_interface,
+        'rtt': probe_rtt(p_host, p_interface),
+        'throughput': probe_throughput(p_url, p_interface, p_bytes) if p_url else None,
+        'time': time()
+    }
+
+
+class CUplink(CSingleton):
+    def __init__(self) -> None:
+        if '_CUplink__links' in self.__dict__:
+            return
+        self.__lock = threading.Lock()
+        self.__links = {}
+        self.__route = None
+
+    def __str__(self) -> str:
+        return ','.join([f"{name}:{link['interface']}" for name, link in self.links.items()] + [f"route:{self.__route}"])
+
+    @property
+    def route(self) -> Union[str, None]:
+        return self.__route
+
+    @property
+    def links(self) -> Dict[str, dict]:
+        with self.__lock:
+            return {name: dict(link) for name, link in self.__links.items()}
+
+    def update(self, p_links: Dict[str, dict]) -> None:
+        with self.__lock:
+            self.__links = {name: dict(link) for name, link in p_links.items()}
+
+    @staticmethod
+    def __rank(p_link: dict) -> tuple:
+        return (p_link['throughput'] or 0.0, -(p_link['rtt'] or float('inf')))
+
+    def select(self) -> Union[str, None]:
+        with self.__lock:
+            links = {name: link for name, link in self.__links.items() if link['rtt'] or link['throughput']}
+        if not links:
+            self.__route = None
+            return None
+
+        best = max(links, key=lambda name: self.__rank(links[name]))
+        current = links.get(self.__route)
+        if current and best != self.__route:
+            if links[best]['throughput'] and current['throughput']:
+                better = links[best]['throughput'] > current['throughput'] * (1 + UPLINK_MARGIN)
+            else:
+                better = (links[best]['rtt'] or float('inf')) * (1 + UPLINK_MARGIN) < (current['rtt'] or float('inf'))
+            if not better:
+                best = self.__route
+
+        if best != self.__route:
+            logger.info("route %s -> %s", self.__route, best)
+            self.__route = best
+        return best
+
+    def as_dict(self) -> dict:
+        return {'route': self.__route, 'links': self.links}
+
+
+def link_interfaces(p_links: dict) -> Dict[str, str]:
+    ret = {}
+    for name, conn in p_links.items():
+        try:
+            interface = conn.interface
+        except RuntimeError as err:
+            logger.error("%s", str(err))
+            continue
+        if interface:
+            ret[name] = interface
+    return ret
+
+
+async def manage_uplink(p_lte: str, p_wifi: str, p_host: str, p_url: Union[str, None] = None,
+                        p_bytes: int = PROBE_BYTES, p_delay: float = UPLINK_DELAY) -> None:
+    from ifee.ifee_dbus import CNetworkManager
+
+    logger.debug("started")
+    n_manager = CNetworkManager()
+    status = CSyncObj()
+    uplink = CUplink()
+    missing = False
+
+    try:
+        while True:
+            try:
+                wifi = await asyncio.to_thread(n_manager.get, p_wifi)
+                lte = await asyncio.to_thread(n_manager.get, p_lte)
+            except RuntimeError as err:
+                logger.error("%s", str(err))
+                await asyncio.sleep(p_delay)
+                continue
+            if not wifi and not missing:
+                logger.error("wifi connection %s does not exist, probing lte only", p_wifi)
+            missing = not wifi
+
+            allowed = bool(status.adsb.active)
+            use_wifi = allowed and bool(status.control.wifi) and not missing
+            if wifi:
+                try:
+                    await asyncio.to_thread(setattr, wifi, 'connect', use_wifi)
+                except RuntimeError as err:
+                    logger.error("%s", str(err))
+                    use_wifi = False
+
+            links = {}
+            if use_wifi:
+                links['wifi'] = wifi
+            if allowed and lte:
+                links['lte'] = lte
+            interfaces = await asyncio.to_thread(link_interfaces, links)
+
+            results = await asyncio.gather(*[asyncio.to_thread(probe_link, iface, p_host, p_url, p_bytes)
+                                             for iface in interfaces.values()])
+            uplink.update(dict(zip(interfaces, results)))
+            route = uplink.select()
+            route_ground_clients(interfaces.get(route))
+            logger.debug("%s", str(uplink))
+
+            await asyncio.sleep(p_delay)
+    except(asyncio.CancelledError, KeyboardInterrupt, SystemExit):
+        route_ground_clients(None)
+        logger.info("stopped")
@@ -1,9 +1,11 @@
 import asyncio
+from time import monotonic
 from logging import getLogger
 import ping3
 from ping3 import ping
 from ifee.ifee_dbus import CConnection, CModemManager, CNetworkManager
 from ifee.ifee_common import CSyncObj
+from ifee.ifee_health import CModemHealth
 
 
 logger = getLogger("[watchdog]")
@@ -15,19 +17,16 @@ async def activate_conn(p_conn: CConnection, p_ping_host: str, p_wait_delay: int
         while not p_conn.connect:
             await asyncio.sleep(p_wait_delay)
     except RuntimeError:
-        msg = f"[watchdog] activate {str(p_conn)} connection failed"
-        logger.error(msg)
+        logger.error("[watchdog] activate %s connection failed", p_conn)
         return False
 
     for _ in range(3):
         try:
             ping_res = ping(p_ping_host, timeout=1)
-            msg = f"ping {p_ping_host} successfull: {float(ping_res)}"
-            logger.debug(msg)
+            logger.debug("ping %s successfull: %s", p_ping_host, float(ping_res))
             return True
         except (ping3.errors.PingError, PermissionError, OSError) as err:
-            msg = f"ping {p_ping_host} failed: {str(err)}"
-            logger.error(msg)
+            logger.error("ping %s failed: %s", p_ping_host, err)
             await asyncio.sleep(p_wait_delay)
 
     return False
@@ -41,6 +40,7 @@ async def watch_dog(p_modem: int, p_lte: str, p_vpn: str, p_lte_host: str, p_vpn
     n_manager = CNetworkManager()
 
     status = CSyncObj()
+    health = CModemHealth()
 
     wait_delay = 5
     loop_delay = 1
@@ -61,27 +61,37 @@ async def watch_dog(p_modem: int, p_lte: str, p_vpn: str, p_lte_host: str, p_vpn
                 await asyncio.sleep(wait_delay)
                 continue
 
-            modem = next((m for m in modems if m.index == p_modem), modems[0])
+            for index in set(health.scores) - {m.index for m in modems}:
+                health.remove(index)
+            health.watch([m.path for m in modems])
+
+            previous = health.current
+            index = health.select([m.index for m in modems], p_modem)
+            modem = next(m for m in modems if m.index == index)
             modem.connection = p_lte
 
             check = (status.adsb.active, status.control.modem)
-            msg = f"state -- ADS-B: {check[0]}, control: {check[1]}"
-            logger.debug(msg)
+            logger.debug("state -- ADS-B: %s, control: %s", check[0], check[1])
 
             match check:
                 case (True, True):
-                    modem.enable()
-
-                    activate = await activate_conn(lte, p_lte_host, wait_delay)
-                    if not activate:
-                        modem.disable()
-                        continue
-
-                    activate = await activate_conn(vpn, p_vpn_host, wait_delay)
+                    if previous not in (None, index):
+                        old = next((m for m in modems if m.index == previous), None)
+                        if old:
+                            old.connection = p_lte
+                            old.disable()
+
+                    started = monotonic()
+                    activate = modem.enable()
+                    activate = activate and await activate_conn(lte, p_lte_host, wait_delay)
+                    activate = activate and await activate_conn(vpn, p_vpn_host, wait_delay)
+                    health.activation(index, activate, monotonic() - started)
                     if not activate:
                         modem.disable()
+                        await asyncio.sleep(wait_delay)
                         continue
                 case _:
+                    health.down()
                     vpn.connect = False
                     await asyncio.sleep(wait_delay)
 
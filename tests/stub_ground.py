@@ -0,0 +1,102 @@
+import base64
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+
+
+def make_token(p_exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': p_exp}).encode()).decode().rstrip('=')
+    return '.'.join(['e30', payload, 'sig'])
+
+
+class CStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *p_args) -> None:
+        pass
+
+    def __reply(self, p_code: int, p_data: dict = None) -> None:
+        body = json.dumps(p_data or {}).encode()
+        self.send_response(p_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __record(self) -> bytes:
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with stub.lock:
+            stub.requests.append((self.command, self.path))
+            stub.peers.add(self.client_address)
+        return body
+
+    def __authorized(self) -> bool:
+        stub = self.server.stub
+        with stub.lock:
+            if stub.reject:
+                stub.reject -= 1
+                return False
+        return self.headers.get('Authorization') == f"Bearer {stub.token}"
+
+    def do_POST(self) -> None:
+        stub = self.server.stub
+        body = self.__record()
+        if self.path == '/api/authenticate':
+            with stub.lock:
+                stub.token = make_token(time() + stub.ttl)
+                stub.logins += 1
+            return self.__reply(200, {'token': stub.token})
+
+        if not self.__authorized():
+            return self.__reply(401)
+        if self.path == '/api/box/telemetry':
+            with stub.lock:
+                if stub.fail:
+                    stub.fail -= 1
+                    return self.__reply(503)
+                stub.batches.append(json.loads(gzip.decompress(body)))
+            return self.__reply(200)
+        return self.__reply(404)
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        self.__record()
+        if not self.__authorized():
+            return self.__reply(401)
+        box_id = self.path.rsplit('/', 1)[-1]
+        if self.path.startswith('/api/admin/box/serial/') and box_id in stub.boxes:
+            return self.__reply(200, {'hex': stub.boxes[box_id]})
+        return self.__reply(404)
+
+
+class CStubGround():
+    def __init__(self, p_boxes: dict = None, p_ttl: float = 3600) -> None:
+        self.lock = threading.Lock()
+        self.boxes = dict(p_boxes or {})
+        self.ttl = p_ttl
+        self.token = None
+        self.logins = 0
+        self.reject = 0
+        self.fail = 0
+        self.requests = []
+        self.peers = set()
+        self.batches = []
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), CStubHandler)
+        self.__server.daemon_threads = True
+        self.__server.stub = self
+        self.__thread = threading.Thread(target=self.__server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.__server.server_address[1]}"
+
+    def __enter__(self) -> 'CStubGround':
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *p_args) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
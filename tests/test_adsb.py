@@ -0,0 +1,67 @@
+import unittest
+from ifee.ifee_adsb import CDecoderADSB, CMessageADSB, CPR_FRESH, MLAT_HZ, mlat_ns
+
+
+EVEN = '8D40621D58C382D690C8AC2863A7'
+ODD = '8D40621D58C386435CC412692AD6'
+VELOCITY = '8D485020994409940838175B284F'
+SECOND = 1000000000
+
+
+class TestMlat(unittest.TestCase):
+    def test_ticks_to_ns(self):
+        self.assertEqual(mlat_ns(MLAT_HZ), SECOND)
+        self.assertEqual(mlat_ns(3 * MLAT_HZ // 2), 3 * SECOND // 2)
+
+    def test_message_frame(self):
+        msg = CMessageADSB(EVEN, 100, MLAT_HZ, 5 * SECOND)
+        self.assertEqual((msg.ticks, msg.mlat, msg.rx), (MLAT_HZ, SECOND, 5 * SECOND))
+        self.assertEqual(msg.frame, (EVEN, 100, 5 * SECOND, SECOND))
+        self.assertIsNone(CMessageADSB(EVEN, 100).mlat)
+
+
+class TestCprPairs(unittest.TestCase):
+    def test_fresh_pair(self):
+        decoder = CDecoderADSB()
+        self.assertIsNone(decoder.decode(ODD, 100, 100 * SECOND))
+        result = decoder.decode(EVEN, 100, 100 * SECOND + SECOND // 2)
+        self.assertAlmostEqual(result['position'][0], 52.2572, places=3)
+        self.assertAlmostEqual(result['position'][1], 3.9194, places=3)
+        self.assertEqual(result['altitude'], 38000)
+        self.assertEqual(decoder.stale, 0)
+
+    def test_stale_pair_rejected(self):
+        decoder = CDecoderADSB()
+        decoder.decode(EVEN, 100, 100 * SECOND)
+        self.assertIsNone(decoder.decode(ODD, 111, 100 * SECOND + CPR_FRESH + 1))
+        self.assertEqual(decoder.stale, 1)
+
+    def test_stale_keeps_newer_frame(self):
+        decoder = CDecoderADSB()
+        decoder.decode(EVEN, 100, 100 * SECOND)
+        decoder.decode(ODD, 111, 111 * SECOND)
+        result = decoder.decode(EVEN, 112, 112 * SECOND)
+        self.assertIsNotNone(result)
+        self.assertIn('position', result)
+
+    def test_same_second_paired_by_ns(self):
+        decoder = CDecoderADSB(p_fresh=SECOND // 10)
+        decoder.decode(EVEN, 100, 100 * SECOND)
+        self.assertIsNone(decoder.decode(ODD, 100, 100 * SECOND + SECOND // 2))
+        self.assertEqual(decoder.stale, 1)
+
+    def test_mlat_clock_preferred(self):
+        decoder = CDecoderADSB()
+        decoder.decode(EVEN, 100, 100 * SECOND, 7 * SECOND)
+        result = decoder.decode(ODD, 130, 130 * SECOND, 7 * SECOND + SECOND // 2)
+        self.assertIn('position', result)
+        self.assertEqual(decoder.stale, 0)
+
+    def test_icao_filter(self):
+        decoder = CDecoderADSB('40621D')
+        self.assertIsNone(decoder.decode(VELOCITY, 100))
+        self.assertIn('velocity', CDecoderADSB().decode(VELOCITY, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
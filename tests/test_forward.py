@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from os import path
+from ifee.ifee_forward import CForwardQueue, upload
+from ifee.ifee_ground import CGroundClient
+from tests.stub_ground import CStubGround
+
+
+def fill(p_queue: CForwardQueue, p_count: int, p_start: int = 0) -> None:
+    for num in range(p_start, p_start + p_count):
+        p_queue.append({'type': 'telemetry', 'num': num})
+
+
+class TestForwardQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_seal_on_flush(self):
+        with CForwardQueue(self.dir) as queue:
+            fill(queue, 3)
+            self.assertEqual(queue.sealed, [])
+            queue.flush()
+            self.assertEqual(len(queue.sealed), 1)
+            self.assertEqual([r['num'] for r in queue.read(queue.sealed[0])], [0, 1, 2])
+
+    def test_partial_commit(self):
+        with CForwardQueue(self.dir) as queue:
+            fill(queue, 5)
+            queue.flush()
+            num, start, records, done = queue.pending(2)
+            self.assertEqual((start, [r['num'] for r in records], done), (0, [0, 1], False))
+            queue.commit(num, start + len(records), done)
+            num, start, records, done = queue.pending(2)
+            self.assertEqual((start, [r['num'] for r in records], done), (2, [2, 3], False))
+            queue.commit(num, start + len(records), done)
+            num, start, records, done = queue.pending(2)
+            self.assertEqual((start, [r['num'] for r in records], done), (4, [4], True))
+            queue.commit(num, start + len(records), done)
+            self.assertIsNone(queue.pending(2))
+            self.assertEqual(queue.sealed, [])
+            self.assertEqual(queue.offset, {'segment': num + 1, 'record': 0})
+
+    def test_restart_mid_segment(self):
+        with CForwardQueue(self.dir) as queue:
+            fill(queue, 5)
+            queue.flush()
+            num, start, records, done = queue.pending(3)
+            queue.commit(num, start + len(records), done)
+
+        with CForwardQueue(self.dir) as queue:
+            self.assertEqual(queue.offset, {'segment': num, 'record': 3})
+            _, start, records, done = queue.pending(3)
+            self.assertEqual((start, [r['num'] for r in records], done), (3, [3, 4], True))
+
+    def test_restart_seals_open_segment(self):
+        queue = CForwardQueue(self.dir)
+        fill(queue, 2)
+        del queue
+
+        with CForwardQueue(self.dir) as queue:
+            self.assertEqual(len(queue.sealed), 1)
+            fill(queue, 1, 2)
+            queue.flush()
+            self.assertEqual(len(queue.sealed), 2)
+            self.assertGreater(queue.sealed[1], queue.sealed[0])
+
+    def test_size_limit_drops_oldest(self):
+        with tempfile.TemporaryDirectory() as probe, CForwardQueue(probe, p_segment=1) as queue:
+            fill(queue, 1)
+            size = path.getsize(path.join(probe, f"{queue.sealed[0]:012d}.jsonl.gz"))
+
+        with CForwardQueue(self.dir, p_segment=1, p_max=size + size // 2) as queue:
+            fill(queue, 3)
+            self.assertEqual(len(queue.sealed), 1)
+            self.assertEqual(queue.read(queue.sealed[0])[0]['num'], 2)
+            self.assertEqual(queue.pending()[2][0]['num'], 2)
+
+    def test_event(self):
+        with CForwardQueue(self.dir) as queue:
+            queue.event('link', {'from': False, 'to': True})
+            queue.flush()
+            record = queue.read(queue.sealed[0])[0]
+            self.assertEqual((record['type'], record['kind'], record['data']['to']), ('event', 'link', True))
+
+
+class TestForwardUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_upload_batches(self):
+        with CStubGround() as stub, CGroundClient(stub.url, 'user', 'pass') as client, CForwardQueue(self.dir) as queue:
+            fill(queue, 5)
+            queue.flush()
+            self.assertEqual(upload(queue, client, 'B1', p_batch=2), 5)
+            self.assertEqual([batch['offset'] for batch in stub.batches], [0, 2, 4])
+            self.assertEqual([r['num'] for batch in stub.batches for r in batch['records']], list(range(5)))
+            self.assertTrue(all(batch['box'] == 'B1' for batch in stub.batches))
+            self.assertIsNone(queue.pending())
+
+    def test_upload_resumes_after_failure(self):
+        with CStubGround() as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            with CForwardQueue(self.dir) as queue:
+                fill(queue, 5)
+                queue.flush()
+                stub.fail = 1
+                self.assertEqual(upload(queue, client, 'B1', p_batch=2), 0)
+                self.assertEqual(stub.batches, [])
+
+            with CForwardQueue(self.dir) as queue:
+                self.assertEqual(upload(queue, client, 'B1', p_batch=2), 5)
+                self.assertEqual([batch['offset'] for batch in stub.batches], [0, 2, 4])
+
+    def test_upload_resumes_mid_segment(self):
+        with CStubGround() as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            with CForwardQueue(self.dir) as queue:
+                fill(queue, 5)
+                queue.flush()
+                num, start, records, done = queue.pending(2)
+                queue.commit(num, start + len(records), done)
+
+            with CForwardQueue(self.dir) as queue:
+                self.assertEqual(upload(queue, client, 'B1', p_batch=2), 3)
+                self.assertEqual([batch['offset'] for batch in stub.batches], [2, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from ifee.ifee_frames import CFrameValidator, CFrameDedup, crc24, syndrome, FRAME_BITS, FRAME_HEX
+
+
+FRAMES = (
+    '8D40621D58C382D690C8AC2863A7',
+    '8D485020994409940838175B284F',
+    '8DA05F219B06B6AF189400CBC33F',
+    '8D4840D6202CC371C32CE0576098'
+)
+
+
+def flip(p_msg: str, *p_bits: int) -> str:
+    frame = int(p_msg, 16)
+    for bit in p_bits:
+        frame ^= 1 << (FRAME_BITS - 1 - bit)
+    return f"{frame:0{FRAME_HEX}X}"
+
+
+class TestCrc(unittest.TestCase):
+    def test_parity(self):
+        for msg in FRAMES:
+            data = bytes.fromhex(msg)
+            self.assertEqual(crc24(data[:-3]), int.from_bytes(data[-3:], 'big'))
+            self.assertEqual(syndrome(int(msg, 16)), 0)
+
+    def test_syndrome_detects_error(self):
+        for msg in FRAMES:
+            self.assertNotEqual(syndrome(int(flip(msg, 40), 16)), 0)
+
+
+class TestFrameValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = CFrameValidator()
+
+    def test_valid(self):
+        for msg in FRAMES:
+            self.assertEqual(self.validator.check(msg), msg)
+
+    def test_single_bit_corrected(self):
+        for msg in FRAMES:
+            for bit in (5, 8, 32, 87, 88, 111):
+                self.assertEqual(self.validator.check(flip(msg, bit)), msg)
+
+    def test_double_bit_dropped(self):
+        for msg in FRAMES:
+            self.assertIsNone(self.validator.check(flip(msg, 20, 60)))
+
+    def test_correction_disabled(self):
+        self.assertIsNone(CFrameValidator(False).check(flip(FRAMES[0], 40)))
+
+    def test_skipped(self):
+        self.assertIsNone(self.validator.check(FRAMES[0][:14]))
+        self.assertIsNone(self.validator.check('5D' + FRAMES[0][2:]))
+        self.assertIsNone(self.validator.check('ZZ' + FRAMES[0][2:]))
+
+    def test_validate_batch(self):
+        batch = [(FRAMES[0], 1, 100), (flip(FRAMES[1], 50), 2, 200), (flip(FRAMES[2], 10, 70), 3, 300)]
+        self.assertEqual(self.validator.validate(batch), [(FRAMES[0], 1, 100), (FRAMES[1], 2, 200)])
+
+
+class TestFrameDedup(unittest.TestCase):
+    def test_duplicate_within_window(self):
+        dedup = CFrameDedup(1.0)
+        self.assertFalse(dedup.seen(FRAMES[0], 0))
+        self.assertTrue(dedup.seen(FRAMES[0].lower(), 500000000))
+        self.assertFalse(dedup.seen(FRAMES[1], 600000000))
+        self.assertEqual((dedup.hits, dedup.misses), (1, 2))
+
+    def test_window_expiry(self):
+        dedup = CFrameDedup(1.0)
+        self.assertFalse(dedup.seen(FRAMES[0], 0))
+        self.assertTrue(dedup.seen(FRAMES[0], 999000000))
+        self.assertFalse(dedup.seen(FRAMES[0], 1000000000))
+        self.assertEqual(len(dedup), 1)
+
+    def test_expiry_drops_old_entries(self):
+        dedup = CFrameDedup(1.0)
+        for num, msg in enumerate(FRAMES):
+            dedup.seen(msg, num * 100000000)
+        dedup.seen(FRAMES[0], 1250000000)
+        self.assertEqual(len(dedup), 2)
+
+    def test_size_bound(self):
+        dedup = CFrameDedup(60.0, p_size=2)
+        for msg in FRAMES[:3]:
+            dedup.seen(msg, 0)
+        self.assertEqual(len(dedup), 2)
+        self.assertFalse(dedup.seen(FRAMES[0], 0))
+
+    def test_filter_uses_frame_stamp(self):
+        dedup = CFrameDedup(1.0)
+        batch = [(FRAMES[0], 0, 0), (FRAMES[0], 0, 500000000), (FRAMES[0], 1, 1500000000), (FRAMES[1], 1, 1600000000)]
+        self.assertEqual(dedup.filter(batch), [batch[0], batch[2], batch[3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
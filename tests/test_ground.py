@@ -0,0 +1,110 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from os import path
+from time import time
+from ifee.ifee_common import CCacheICAO
+from ifee.ifee_ground import CGroundClient, CResolverICAO, token_expire
+from tests.stub_ground import CStubGround, make_token
+
+
+class TestGroundClient(unittest.TestCase):
+    def test_token_expire(self):
+        self.assertEqual(token_expire(make_token(1234.0)), 1234.0)
+
+    def test_token_cached(self):
+        with CStubGround({'B1': 'ABC123'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            self.assertEqual(client.icao('B1'), 'ABC123')
+            self.assertEqual(client.icao('B1'), 'ABC123')
+            self.assertEqual(stub.logins, 1)
+
+    def test_token_near_expiry_refreshed(self):
+        with CStubGround({'B1': 'ABC123'}, p_ttl=10) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            client.icao('B1')
+            client.icao('B1')
+            self.assertEqual(stub.logins, 2)
+
+    def test_reauth_on_401(self):
+        with CStubGround({'B1': 'ABC123'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            client.icao('B1')
+            stub.reject = 1
+            self.assertEqual(client.icao('B1'), 'ABC123')
+            self.assertEqual(stub.logins, 2)
+
+    def test_unknown_box(self):
+        with CStubGround() as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            self.assertIsNone(client.icao('B2'))
+
+    def test_connection_reused(self):
+        with CStubGround({'B1': 'ABC123'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            for _ in range(5):
+                client.icao('B1')
+            self.assertEqual(len(stub.requests), 6)
+            self.assertEqual(len(stub.peers), 1)
+
+
+class TestResolverICAO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = path.join(self.tmp.name, 'icao.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_roundtrip(self):
+        CCacheICAO(self.path).save('ABC123', 'B1')
+        cache = CCacheICAO(self.path)
+        self.assertEqual((cache.icao, cache.get('B1')['icao'], cache.get('B2')), ('ABC123', 'ABC123', None))
+        self.assertFalse(path.exists(self.path + '.tmp'))
+
+    def test_fresh_served_from_cache(self):
+        CCacheICAO(self.path).save('ABC123', 'B1')
+        with CStubGround({'B1': 'DEF456'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            resolver = CResolverICAO(CCacheICAO(self.path), client)
+
+            async def run():
+                return resolver.resolve('B1'), await resolver.refresh_many(['B1'])
+
+            self.assertEqual(asyncio.run(run()), ('ABC123', {'B1': 'ABC123'}))
+            self.assertEqual(stub.requests, [])
+
+    def test_stale_revalidated(self):
+        CCacheICAO(self.path).save('ABC123', 'B1')
+        with CStubGround({'B1': 'DEF456'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            cache = CCacheICAO(self.path)
+            resolver = CResolverICAO(cache, client, p_ttl=0)
+
+            async def run():
+                icao = resolver.resolve('B1')
+                await resolver.revalidate('B1')
+                return icao
+
+            self.assertEqual(asyncio.run(run()), 'ABC123')
+            self.assertEqual(cache.get('B1')['icao'], 'DEF456')
+            self.assertEqual(CCacheICAO(self.path).get('B1')['icao'], 'DEF456')
+
+    def test_wait_fetches_missing(self):
+        with CStubGround({'B1': 'DEF456'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            resolver = CResolverICAO(CCacheICAO(self.path), client)
+            self.assertEqual(asyncio.run(resolver.wait('B1')), 'DEF456')
+
+    def test_legacy_fallback(self):
+        with open(self.path, 'w', encoding='UTF8') as cache:
+            cache.write(json.dumps({'icao': 'ABC123', 'time': int(time())}))
+        resolver = CResolverICAO(CCacheICAO(self.path), None)
+        self.assertEqual(resolver.resolve('B1'), 'ABC123')
+        self.assertFalse(resolver.stale('B1'))
+
+    def test_no_fallback_across_boxes(self):
+        CCacheICAO(self.path).save('ABC123', 'B1')
+        with CStubGround({'B1': 'ABC123', 'B2': 'DEF456'}) as stub, CGroundClient(stub.url, 'user', 'pass') as client:
+            resolver = CResolverICAO(CCacheICAO(self.path), client)
+            self.assertTrue(resolver.stale('B2'))
+            result = asyncio.run(resolver.refresh_many(['B1', 'B2']))
+            self.assertEqual(result, {'B1': 'ABC123', 'B2': 'DEF456'})
+            self.assertEqual([req for req in stub.requests if req[0] == 'GET'], [('GET', '/api/admin/box/serial/B2')])
+
+
+if __name__ == '__main__':
+    unittest.main()